@@ -6,30 +6,60 @@ for each insight tag, explaining why that insight was assigned based on the
 customer's emails and reviews.
 """
 
+import argparse
 import json
 import os
-import time
-from openai import OpenAI
 from dotenv import load_dotenv
+from llm_cache import add_cache_arguments, configure_cache_from_args, get_cache
+from llm_client import chat_completion, client_options
+from rate_limiter import RateLimiter
+from checkpoint import add_checkpoint_arguments, fingerprint, iter_keyed_diners, open_journal_from_args
+from data_io import RecordWriter, iter_records
+from dry_run import add_dry_run_arguments, start_dry_run
+from global_budget import BudgetExceededError
+from detailed_format import group_insight_targets, is_justification_key, iter_insight_targets
+from prompt_context import build_justification_context
+from pipeline_metrics import add_metrics_arguments, get_metrics, write_metrics_from_args
+from model_routing import add_routing_arguments, configure_routing_from_args, escalate, get_router
+from retry_policy import add_retry_arguments, configure_retries_from_args
+from service_scheduler import ScheduledRun, add_schedule_arguments, dashboard_publisher, schedule_from_args
+from venues import add_venue_arguments, configure_venue_from_args
+from structured_output import StructuredOutputError, parse_structured
 
 # Load environment variables
 load_dotenv()
 
-def create_justification_prompt(customer_data, insight_type, insight_value):
+DETAILED_INFO_PATH = "src/detailed_info.json"
+
+# Answers longer than this were cut off or ignored the one-sentence instruction
+MAX_JUSTIFICATION_WORDS = 40
+
+# Same pacing as the former fixed 0.5 s sleep between calls; cached answers are not throttled
+JUSTIFICATION_REQUESTS_PER_MINUTE = 120
+
+# Insights that get justifications, in the order they are processed
+INSIGHT_TYPES = [
+    "customer_values",
+    "is_new_customer",
+    "special_accommodations",
+    "staff_interaction_preferences",
+    "taste_preferences",
+    "personal_interests"
+]
+
+def build_customer_context(customer_data):
+    """
+    Render the reviews and emails sections shared by every justification prompt,
+    trimmed to the context token budget. Build it once per customer and pass it
+    to the prompt builders below.
+    """
+    context = build_justification_context(customer_data)
+    return context.reviews_text, context.emails_text
+
+def create_justification_prompt(customer_data, insight_type, insight_value, context=None):
     """Create a prompt to generate justification for a specific insight."""
     
-    # Gather context from customer data
-    reviews_context = ""
-    if customer_data.get("reviews"):
-        reviews_context = "Customer Reviews:\n"
-        for review in customer_data["reviews"]:
-            reviews_context += f"- {review['restaurant_name']} ({review['rating']}/5): {review['content']}\n"
-    
-    emails_context = ""
-    if customer_data.get("emails"):
-        emails_context = "Customer Emails:\n"
-        for email in customer_data["emails"]:
-            emails_context += f"- Subject: {email['subject']}\n  Content: {email['combined_thread']}\n"
+    reviews_context, emails_context = context or build_customer_context(customer_data)
     
     prompt = f"""Based on the following customer information, provide a brief one-sentence justification for why this insight was assigned:
 
@@ -46,136 +76,396 @@ Justification:"""
     
     return prompt
 
-def add_justifications_to_insights(customer_data, client):
-    """Add justifications to all insights for a customer."""
+def create_batch_justification_prompt(customer_data, items, context=None):
+    """Create a prompt asking for the justifications of several insights in one JSON answer."""
+    
+    reviews_context, emails_context = context or build_customer_context(customer_data)
+    
+    insight_lines = "\n".join(f"- {insight_key}: {display_value}" for insight_key, _, display_value in items)
+    
+    # Spell out the exact JSON skeleton so the answer maps straight back onto the insights
+    skeleton = {}
+    for insight_key, tag, _ in items:
+        if tag is None:
+            skeleton[insight_key] = "justification"
+        else:
+            skeleton.setdefault(insight_key, {})[tag] = "justification"
     
-    # Check if customer has reservations with insights
-    if not customer_data.get("reservations"):
-        return customer_data
+    prompt = f"""Based on the following customer information, provide a brief one-sentence justification for why each of these insights was assigned:
+
+{reviews_context}
+
+{emails_context}
+
+Insights:
+{insight_lines}
+
+For each insight, provide a concise, factual sentence explaining what specific evidence from their reviews or emails led to it. Keep each under 25 words and focus on the most relevant evidence.
+
+Respond only with valid JSON using exactly these keys:
+{json.dumps(skeleton, indent=2, ensure_ascii=False)}"""
     
-    for reservation in customer_data["reservations"]:
-        if "notes" not in reservation or "customer_insights" not in reservation["notes"]:
+    return prompt
+
+def build_justification_request(prompt):
+    """Full chat completion request for a single justification (also used for batch files)."""
+    messages = [{"role": "user", "content": prompt}]
+    return {
+        "model": get_router().route("justifications", messages).model,
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": 50
+    }
+
+def build_batched_justification_request(prompt, item_count):
+    """Full chat completion request for a batched justification prompt."""
+    messages = [{"role": "user", "content": prompt}]
+    return {
+        "model": get_router().route("justifications", messages).model,
+        "messages": messages,
+        "temperature": 0.1,
+        # Budget the same 50 tokens per justification as the per-tag calls
+        "max_tokens": 50 * item_count + 50,
+        "response_format": {"type": "json_object"}
+    }
+
+def is_valid_justification(text):
+    """A usable justification is a non-empty sentence that fits the output budget."""
+    return bool(text) and len(text.split()) <= MAX_JUSTIFICATION_WORDS
+
+def request_justification(client, prompt, limiter=None):
+    """Ask the model for a single justification sentence, retrying on a stronger tier if the answer is unusable."""
+    request = build_justification_request(prompt)
+    justification = chat_completion(client, limiter, "justifications", **request)
+    if not is_valid_justification(justification):
+        escalated = escalate("justifications", request)
+        if escalated:
+            justification = chat_completion(client, limiter, "justifications", **escalated)
+    return justification
+
+def iter_insight_items(insights):
+    """
+    Yield (insight_key, tag, display_value) for every insight that needs a justification.
+    tag is the list entry for list insights and None for single-valued insights.
+    """
+    for insight_key in INSIGHT_TYPES:
+        if insight_key not in insights or not insights[insight_key]:
             continue
-            
-        insights = reservation["notes"]["customer_insights"]
         
-        # Process each insight type
-        insight_types = [
-            ("customer_values", "customer_values"),
-            ("is_new_customer", "is_new_customer"), 
-            ("special_accommodations", "special_accommodations"),
-            ("staff_interaction_preferences", "staff_interaction_preferences"),
-            ("taste_preferences", "taste_preferences"),
-            ("personal_interests", "personal_interests")
-        ]
+        value = insights[insight_key]
+        if insight_key == "is_new_customer":
+            # Handle boolean insight
+            yield insight_key, None, "New Customer" if value else "Returning Customer"
+        elif isinstance(value, list):
+            # Handle list insights (tags)
+            for tag in value:
+                yield insight_key, tag, tag
+        else:
+            # Handle string insights
+            yield insight_key, None, value
+
+def fallback_justification(insight_key, tag):
+    """Generic justification used when the API call fails."""
+    if tag is not None:
+        return f"Based on customer feedback about {tag.lower()}."
+    if insight_key == "is_new_customer":
+        return "Based on customer communication patterns and history."
+    return "Based on customer communication and preferences."
+
+def generate_justification(client, customer_data, insight_key, tag, display_value, limiter=None, failures=None, context=None):
+    """
+    Generate the justification for one insight, falling back to a generic sentence on errors.
+    Failed insights are appended to the optional failures list.
+    """
+    prompt = create_justification_prompt(customer_data, insight_key, display_value, context)
+    
+    try:
+        return request_justification(client, prompt, limiter)
+    except BudgetExceededError:
+        raise
+    except Exception as e:
+        if tag is None:
+            print(f"Error generating justification for {insight_key}: {e}")
+        else:
+            print(f"Error generating justification for {insight_key} - {tag}: {e}")
+        if failures is not None:
+            failures.append((insight_key, tag))
+        get_metrics().record_fallback("justifications", insight_key)
+        return fallback_justification(insight_key, tag)
+
+def request_batched_justifications(client, customer_data, items, limiter=None, context=None):
+    """
+    Ask for every justification of a reservation in one structured-JSON call.
+    Returns {(insight_key, tag): justification} for the items the model answered.
+    """
+    prompt = create_batch_justification_prompt(customer_data, items, context)
+    
+    try:
+        response_text = chat_completion(client, limiter, "justifications", **build_batched_justification_request(prompt, len(items)))
+    except BudgetExceededError:
+        raise
+    except Exception as e:
+        print(f"Error generating batched justifications for {customer_data.get('name', 'Unknown')}: {e}")
+        return {}
+    
+    return parse_batched_justifications(response_text, items)
+
+def parse_batched_justifications(response_text, items):
+    """Map a batched JSON answer onto {(insight_key, tag): justification}, skipping anything missing."""
+    try:
+        # Missing items are requested one by one, so a broken answer is not sent back for repair
+        answer = parse_structured(response_text, "justifications")
+    except StructuredOutputError:
+        return {}
+    
+    results = {}
+    for insight_key, tag, _ in items:
+        entry = answer.get(insight_key)
+        if tag is None:
+            justification = entry
+        elif isinstance(entry, dict):
+            justification = entry.get(tag)
+            if justification is None:
+                # Tolerate the model changing the capitalisation of a tag
+                lowered = {str(key).lower(): text for key, text in entry.items()}
+                justification = lowered.get(tag.lower())
+        else:
+            justification = None
         
-        for insight_key, insight_name in insight_types:
-            if insight_key in insights and insights[insight_key]:
-                
-                if insight_key == "is_new_customer":
-                    # Handle boolean insight
-                    insight_value = "New Customer" if insights[insight_key] else "Returning Customer"
-                    prompt = create_justification_prompt(customer_data, insight_name, insight_value)
-                    
-                    try:
-                        response = client.chat.completions.create(
-                            model="gpt-4o-mini-2024-07-18",
-                            messages=[{"role": "user", "content": prompt}],
-                            temperature=0.1,
-                            max_tokens=50
-                        )
-                        justification = response.choices[0].message.content.strip()
-                        insights[f"{insight_key}_justification"] = justification
-                        time.sleep(0.5)  # Rate limiting
-                        
-                    except Exception as e:
-                        print(f"Error generating justification for {insight_key}: {e}")
-                        insights[f"{insight_key}_justification"] = "Based on customer communication patterns and history."
-                
-                elif isinstance(insights[insight_key], list):
-                    # Handle list insights (tags)
-                    justifications = {}
-                    for value in insights[insight_key]:
-                        prompt = create_justification_prompt(customer_data, insight_name, value)
-                        
-                        try:
-                            response = client.chat.completions.create(
-                                model="gpt-4o-mini-2024-07-18",
-                                messages=[{"role": "user", "content": prompt}],
-                                temperature=0.1,
-                                max_tokens=50
-                            )
-                            justification = response.choices[0].message.content.strip()
-                            justifications[value] = justification
-                            time.sleep(0.5)  # Rate limiting
-                            
-                        except Exception as e:
-                            print(f"Error generating justification for {insight_key} - {value}: {e}")
-                            justifications[value] = f"Based on customer feedback about {value.lower()}."
-                    
-                    insights[f"{insight_key}_justifications"] = justifications
-                
-                else:
-                    # Handle string insights
-                    prompt = create_justification_prompt(customer_data, insight_name, insights[insight_key])
-                    
-                    try:
-                        response = client.chat.completions.create(
-                            model="gpt-4o-mini-2024-07-18",
-                            messages=[{"role": "user", "content": prompt}],
-                            temperature=0.1,
-                            max_tokens=50
-                        )
-                        justification = response.choices[0].message.content.strip()
-                        insights[f"{insight_key}_justification"] = justification
-                        time.sleep(0.5)  # Rate limiting
-                        
-                    except Exception as e:
-                        print(f"Error generating justification for {insight_key}: {e}")
-                        insights[f"{insight_key}_justification"] = "Based on customer communication and preferences."
+        if isinstance(justification, str) and justification.strip():
+            results[(insight_key, tag)] = justification.strip()
     
+    return results
+
+def add_justifications_to_insights(customer_data, client, limiter=None, batched=False, failures=None):
+    """
+    Add justifications to all insights for a customer. Normalized diners are
+    justified once; reservations carrying identical copies of the same insights
+    share one set of justifications.
+    """
+    
+    # The reviews/emails context is the same for every prompt about this customer
+    context = None
+    
+    for _, insights_group in group_insight_targets(customer_data):
+        insights = insights_group[0]
+        items = list(iter_insight_items(insights))
+        if not items:
+            continue
+        context = context or build_customer_context(customer_data)
+        
+        results = {}
+        if batched:
+            results = request_batched_justifications(client, customer_data, items, limiter, context)
+            missing = len(items) - len(results)
+            if missing:
+                print(f"Batched answer missing {missing}/{len(items)} justifications, requesting them individually")
+                for insight_key, tag, _ in items:
+                    if (insight_key, tag) not in results:
+                        get_metrics().record_fallback("justifications", "batched_missing")
+        
+        # Per-tag calls for everything the batched answer did not cover
+        for insight_key, tag, display_value in items:
+            if (insight_key, tag) not in results:
+                results[(insight_key, tag)] = generate_justification(
+                    client, customer_data, insight_key, tag, display_value, limiter, failures, context
+                )
+        
+        for insights in insights_group:
+            apply_justification_results(insights, items, results)
+    
+    return customer_data
+
+def apply_justification_results(insights, items, results):
+    """
+    Write {(insight_key, tag): justification} results into the *_justification(s) keys.
+    Tag dictionaries are rebuilt so stale tags from earlier runs are dropped.
+    """
+    list_justifications = {}
+    for insight_key, tag, _ in items:
+        if (insight_key, tag) not in results:
+            continue
+        justification = results[(insight_key, tag)]
+        if tag is None:
+            insights[f"{insight_key}_justification"] = justification
+        else:
+            list_justifications.setdefault(insight_key, {})[tag] = justification
+    
+    for insight_key, justifications in list_justifications.items():
+        insights[f"{insight_key}_justifications"] = justifications
+
+def justification_fingerprint(customer_data):
+    """Fingerprint of everything the justifications depend on, ignoring existing justifications."""
+    stored_insights = [
+        {key: value for key, value in insights.items() if not is_justification_key(key)}
+        for _, insights in iter_insight_targets(customer_data)
+    ]
+    
+    return fingerprint(
+        customer_data.get("reviews", []),
+        customer_data.get("emails", []),
+        stored_insights,
+        get_router().signature("justifications")
+    )
+
+def extract_justifications(customer_data):
+    """Collect the justification keys of every stored set of insights, for the checkpoint journal."""
+    return [
+        {key: value for key, value in insights.items() if is_justification_key(key)}
+        for _, insights in iter_insight_targets(customer_data)
+    ]
+
+def apply_justifications(customer_data, saved):
+    """Restore justifications recorded by extract_justifications()."""
+    for (_, insights), justifications in zip(iter_insight_targets(customer_data), saved):
+        insights.update(justifications)
     return customer_data
 
+def justify_diners(diners, sink, client, limiter=None, batched=False, journal=None, total=None):
+    """
+    Add justifications to every diner and pass them to sink in input order.
+    diners may be any iterable, so streamed datasets are processed one diner at a time.
+    Returns the number of diners processed.
+    """
+    keys = []
+    
+    # Process each customer
+    for i, (key, customer) in enumerate(iter_keyed_diners(diners), 1):
+        keys.append(key)
+        progress = f"{i}/{total}" if total else str(i)
+        
+        customer_fingerprint = justification_fingerprint(customer)
+        saved = journal.lookup(key, customer_fingerprint) if journal else None
+        if saved is not None:
+            print(f"Skipping {customer['name']} ({progress}) - unchanged since last run")
+            sink(apply_justifications(customer, saved))
+            continue
+        
+        print(f"Processing {customer['name']} ({progress})")
+        
+        # Add justifications to insights
+        failures = []
+        customer = add_justifications_to_insights(customer, client, limiter, batched=batched, failures=failures)
+        
+        # Customers with fallback justifications are retried on the next run
+        if journal and not failures:
+            journal.record(key, customer_fingerprint, extract_justifications(customer))
+        
+        sink(customer)
+    
+    if journal:
+        journal.compact(keep_keys=keys)
+        print(journal.summary())
+    
+    return len(keys)
+
 def main():
     """Main function to add justifications to the dataset."""
     
+    parser = argparse.ArgumentParser(description="Add justifications to the insights in src/detailed_info.json")
+    parser.add_argument("--batched", action="store_true",
+                        help="Request all justifications of a reservation in a single JSON call")
+    parser.add_argument("--input", default=DETAILED_INFO_PATH,
+                        help="Detailed info to read, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--output", default=None,
+                        help="Where to write the result (default: overwrite the input)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read and write diners incrementally to keep memory flat on large datasets")
+    add_cache_arguments(parser)
+    add_checkpoint_arguments(parser, "add_justifications")
+    add_retry_arguments(parser)
+    add_routing_arguments(parser)
+    add_venue_arguments(parser)
+    add_schedule_arguments(parser)
+    parser.add_argument("--publish-dir", default=None,
+                        help="With --schedule, publish dashboard shards of finished dates in the horizon here (e.g. public/data)")
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    args = parser.parse_args()
+    configure_cache_from_args(args)
+    configure_retries_from_args(args)
+    configure_routing_from_args(args)
+    configure_venue_from_args(args)
+    if args.schedule and args.stream:
+        parser.error("--schedule orders the whole dataset and cannot be combined with --stream")
+    input_path = args.input
+    output_path = args.output or args.input
+    
+    if args.dry_run:
+        client = start_dry_run(args, requests_per_minute=JUSTIFICATION_REQUESTS_PER_MINUTE)
+        try:
+            justify_diners(iter_records(input_path, "diners"), lambda customer: None, client, None, args.batched)
+        except FileNotFoundError:
+            print(f"Error: {input_path} not found. Please run generate_insights.py first.")
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Error: Invalid JSON in {input_path}: {e}")
+            return
+        print(client.estimate.report())
+        return
+    
     # Check for API key
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY not found in environment variables.")
         print("Please create a .env file with your OpenAI API key.")
         return
     
-    # Initialize OpenAI client
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    # Initialize OpenAI client; the SDK is imported here so dry runs never load it
+    from openai import OpenAI
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), **client_options())
+    limiter = RateLimiter(requests_per_minute=JUSTIFICATION_REQUESTS_PER_MINUTE, tokens_per_minute=None)
+    journal = open_journal_from_args(args)
+    
+    if args.stream:
+        print(f"Streaming justifications from {input_path} to {output_path}...")
+        try:
+            with RecordWriter(output_path, "diners") as writer:
+                justify_diners(iter_records(input_path, "diners"), writer.write, client, limiter, args.batched, journal)
+        except FileNotFoundError:
+            print(f"Error: {input_path} not found. Please run generate_insights.py first.")
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Error: Invalid JSON in {input_path}: {e}")
+            return
+        print(f"✓ Successfully added justifications to {output_path} ({writer.count} customers)")
+        print(get_cache().summary())
+        write_metrics_from_args(args)
+        return
     
     # Load existing detailed info
     try:
-        with open("src/detailed_info.json", "r", encoding="utf-8") as f:
+        with open(input_path, "r", encoding="utf-8") as f:
             data = json.load(f)
     except FileNotFoundError:
-        print("Error: src/detailed_info.json not found. Please run generate_insights.py first.")
+        print(f"Error: {input_path} not found. Please run generate_insights.py first.")
         return
     except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in src/detailed_info.json: {e}")
+        print(f"Error: Invalid JSON in {input_path}: {e}")
         return
     
     print(f"Adding justifications for {len(data['diners'])} customers...")
     
-    # Process each customer
-    for i, customer in enumerate(data["diners"]):
-        print(f"Processing {customer['name']} ({i+1}/{len(data['diners'])})")
-        
-        # Add justifications to insights
-        data["diners"][i] = add_justifications_to_insights(customer, client)
+    schedule = schedule_from_args(args)
+    if schedule:
+        run = ScheduledRun(data["diners"], schedule,
+                           dashboard_publisher(args.publish_dir) if args.publish_dir else None)
+        justify_diners(run.diners, run.sink, client, limiter, args.batched, journal, total=len(run.diners))
+        data["diners"] = run.results()
+    else:
+        justified = []
+        justify_diners(data["diners"], justified.append, client, limiter, args.batched, journal, total=len(data["diners"]))
+        data["diners"] = justified
     
     # Save updated data
     try:
-        with open("src/detailed_info.json", "w", encoding="utf-8") as f:
+        with open(output_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
-        print(f"✓ Successfully added justifications to src/detailed_info.json")
+        print(f"✓ Successfully added justifications to {output_path}")
+        print(get_cache().summary())
+        write_metrics_from_args(args)
         
     except Exception as e:
         print(f"Error saving file: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Offline Batch Jobs for Insights and Justifications
+Renders every insight or justification prompt into an OpenAI Batch API
+request file (JSONL with stable custom_ids), submits and fetches batch jobs,
+and ingests the results file back into detailed_info.json. Nightly backfills
+can then go through the cheaper, higher-throughput batch channel instead of
+the interactive rate limits. The `simulate` command is a local stand-in for
+the batch service that writes a results file without any API calls.
+
+Typical flow:
+    python batch_jobs.py render-insights --requests insights_requests.jsonl
+    python batch_jobs.py submit insights_requests.jsonl
+    python batch_jobs.py fetch <batch_id> --results insights_results.jsonl
+    python batch_jobs.py ingest-insights --results insights_results.jsonl
+"""
+
+import argparse
+import json
+import os
+from dotenv import load_dotenv
+
+from add_justifications import (
+    DETAILED_INFO_PATH, apply_justification_results, build_batched_justification_request, build_customer_context,
+    build_justification_request, create_batch_justification_prompt, create_justification_prompt,
+    iter_insight_items, parse_batched_justifications
+)
+from data_io import RecordWriter, iter_jsonl, write_json_atomic
+from detailed_format import group_insight_targets
+from generate_insights import (
+    DATASET_PATH, OUTPUT_PATH, build_enhanced_diner, build_insights_request, parse_insights_response
+)
+from llm_cache import get_cache
+from llm_standin import build_chat_completion, standin_content
+
+# Load environment variables
+load_dotenv()
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+
+def insight_custom_id(diner_index):
+    return f"insights:{diner_index}"
+
+
+def justification_custom_id(diner_index, target, insight_key, tag_index=None):
+    # target is a reservation index, or "diner" for normalized diner-level insights.
+    # Tags are referenced by position because their text may contain any character
+    suffix = "-" if tag_index is None else str(tag_index)
+    return f"justify:{diner_index}:{target}:{insight_key}:{suffix}"
+
+
+def batched_justification_custom_id(diner_index, target):
+    return f"justify-batch:{diner_index}:{target}"
+
+
+def batch_request_line(custom_id, body):
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_insight_requests(data):
+    """Yield (custom_id, body) for every diner's insight prompt."""
+    for diner_index, diner in enumerate(data.get("diners", [])):
+        yield insight_custom_id(diner_index), build_insights_request(diner)
+
+
+def iter_insight_groups(data):
+    """
+    Yield (diner_index, target, diner, insights_group, items) for every distinct
+    set of insights; identical copies on several reservations are requested once.
+    """
+    for diner_index, diner in enumerate(data.get("diners", [])):
+        for target, insights_group in group_insight_targets(diner):
+            items = list(iter_insight_items(insights_group[0]))
+            if items:
+                yield diner_index, target, diner, insights_group, items
+
+
+def iter_justification_requests(data, batched=False):
+    """Yield (custom_id, body) for every justification prompt, or one per set of insights when batched."""
+    for diner_index, target, diner, _, items in iter_insight_groups(data):
+        context = build_customer_context(diner)
+        if batched:
+            prompt = create_batch_justification_prompt(diner, items, context)
+            yield (batched_justification_custom_id(diner_index, target),
+                   build_batched_justification_request(prompt, len(items)))
+            continue
+
+        tag_positions = {}
+        for insight_key, tag, display_value in items:
+            tag_index = None
+            if tag is not None:
+                tag_index = tag_positions.get(insight_key, 0)
+                tag_positions[insight_key] = tag_index + 1
+            prompt = create_justification_prompt(diner, insight_key, display_value, context)
+            yield (justification_custom_id(diner_index, target, insight_key, tag_index),
+                   build_justification_request(prompt))
+
+
+def write_requests(requests, path):
+    """Write (custom_id, body) pairs as a batch request file."""
+    with RecordWriter(path, "requests") as writer:
+        for custom_id, body in requests:
+            writer.write(batch_request_line(custom_id, body))
+    return writer.count
+
+
+def load_results(path):
+    """
+    Read a batch results file into {custom_id: response text}.
+    Failed or malformed lines are reported and left out.
+    """
+    results = {}
+    failed = 0
+    for line in iter_jsonl(path):
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error") or response.get("status_code") != 200 or not body.get("choices"):
+            failed += 1
+            continue
+        content = body["choices"][0].get("message", {}).get("content")
+        if content is not None:
+            results[line["custom_id"]] = content.strip()
+    if failed:
+        print(f"Warning: {failed} requests in {path} failed and were skipped")
+    return results
+
+
+def seed_cache(requests, results):
+    """Store batch answers in the response cache so interactive re-runs do not pay for them again."""
+    cache = get_cache()
+    for custom_id, body in requests:
+        if custom_id in results:
+            cache.put(body, results[custom_id])
+
+
+def ingest_insights(data, results, normalized=False):
+    """Build the enhanced detailed_info structure from insight batch results."""
+    enhanced_data = {"diners": []}
+    missing = 0
+    for diner_index, diner in enumerate(data.get("diners", [])):
+        text = results.get(insight_custom_id(diner_index))
+        insights = parse_insights_response(text, diner.get("name", "Unknown")) if text is not None else None
+        if insights is None:
+            missing += 1
+        enhanced_data["diners"].append(build_enhanced_diner(diner, insights or {}, normalized))
+    return enhanced_data, missing
+
+
+def ingest_justifications(data, results, batched=False):
+    """Write justification batch results into detailed_info in place; returns the number of missing items."""
+    missing = 0
+    for diner_index, target, diner, insights_group, items in iter_insight_groups(data):
+        if batched:
+            text = results.get(batched_justification_custom_id(diner_index, target))
+            item_results = parse_batched_justifications(text, items) if text is not None else {}
+        else:
+            item_results = {}
+            tag_positions = {}
+            for insight_key, tag, _ in items:
+                tag_index = None
+                if tag is not None:
+                    tag_index = tag_positions.get(insight_key, 0)
+                    tag_positions[insight_key] = tag_index + 1
+                text = results.get(justification_custom_id(diner_index, target, insight_key, tag_index))
+                if text:
+                    item_results[(insight_key, tag)] = text
+
+        missing += len(items) - len(item_results)
+        for insights in insights_group:
+            apply_justification_results(insights, items, item_results)
+    return missing
+
+
+def simulate(requests_path, results_path):
+    """Local stand-in for the batch service: answer every request and write a results file."""
+    with RecordWriter(results_path, "results") as writer:
+        for index, line in enumerate(iter_jsonl(requests_path)):
+            body = line["body"]
+            writer.write({
+                "id": f"batch_req_standin_{index}",
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": f"standin_{index}",
+                    "body": build_chat_completion(body, standin_content(body))
+                },
+                "error": None
+            })
+    return writer.count
+
+
+def get_client():
+    from openai import OpenAI
+
+    if not os.getenv("OPENAI_API_KEY"):
+        raise SystemExit("Error: OPENAI_API_KEY not found in environment variables.")
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def submit(requests_path):
+    """Upload a request file and create a batch job."""
+    client = get_client()
+    with open(requests_path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+        metadata={"source_file": os.path.basename(requests_path)}
+    )
+    return batch
+
+
+def fetch(batch_id, results_path):
+    """Download the results of a finished batch job; returns the batch object."""
+    client = get_client()
+    batch = client.batches.retrieve(batch_id)
+    if batch.status == "completed" and batch.output_file_id:
+        content = client.files.content(batch.output_file_id)
+        with open(results_path, "w", encoding="utf-8") as f:
+            f.write(content.text)
+    return batch
+
+
+def main():
+    """Command line entry point for the batch workflow."""
+    parser = argparse.ArgumentParser(description="Render, submit, fetch and ingest OpenAI batch jobs for the pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("render-insights", help="Write one insight request per diner")
+    command.add_argument("--input", default=DATASET_PATH)
+    command.add_argument("--requests", default="insights_requests.jsonl")
+
+    command = commands.add_parser("render-justifications", help="Write justification requests for detailed_info")
+    command.add_argument("--input", default=DETAILED_INFO_PATH)
+    command.add_argument("--requests", default="justification_requests.jsonl")
+    command.add_argument("--batched", action="store_true", help="One request per set of insights instead of per tag")
+
+    command = commands.add_parser("submit", help="Upload a request file and start a batch job")
+    command.add_argument("requests")
+
+    command = commands.add_parser("fetch", help="Check a batch job and download its results when complete")
+    command.add_argument("batch_id")
+    command.add_argument("--results", required=True)
+
+    command = commands.add_parser("simulate", help="Write a results file locally with stand-in answers")
+    command.add_argument("requests")
+    command.add_argument("--results", required=True)
+
+    command = commands.add_parser("ingest-insights", help="Build detailed_info from insight results")
+    command.add_argument("--input", default=DATASET_PATH)
+    command.add_argument("--results", required=True)
+    command.add_argument("--output", default=OUTPUT_PATH)
+    command.add_argument("--normalized", action="store_true", help="Store insights once per diner")
+
+    command = commands.add_parser("ingest-justifications", help="Add justification results to detailed_info")
+    command.add_argument("--input", default=DETAILED_INFO_PATH)
+    command.add_argument("--results", required=True)
+    command.add_argument("--output", default=None, help="Default: overwrite the input")
+    command.add_argument("--batched", action="store_true", help="Results come from render-justifications --batched")
+
+    args = parser.parse_args()
+
+    if args.command == "render-insights":
+        count = write_requests(iter_insight_requests(load_json(args.input)), args.requests)
+        print(f"✓ Wrote {count} insight requests to {args.requests}")
+
+    elif args.command == "render-justifications":
+        count = write_requests(iter_justification_requests(load_json(args.input), args.batched), args.requests)
+        print(f"✓ Wrote {count} justification requests to {args.requests}")
+
+    elif args.command == "submit":
+        batch = submit(args.requests)
+        print(f"✓ Submitted batch {batch.id} (status: {batch.status})")
+
+    elif args.command == "fetch":
+        batch = fetch(args.batch_id, args.results)
+        counts = batch.request_counts
+        print(f"Batch {batch.id}: {batch.status} ({counts.completed}/{counts.total} completed, {counts.failed} failed)")
+        if batch.status == "completed":
+            print(f"✓ Results saved to {args.results}")
+
+    elif args.command == "simulate":
+        count = simulate(args.requests, args.results)
+        print(f"✓ Wrote {count} stand-in results to {args.results}")
+
+    elif args.command == "ingest-insights":
+        data = load_json(args.input)
+        results = load_results(args.results)
+        seed_cache(iter_insight_requests(data), results)
+        enhanced_data, missing = ingest_insights(data, results, args.normalized)
+        write_json_atomic(args.output, enhanced_data)
+        print(f"✓ Saved insights for {len(enhanced_data['diners'])} diners to {args.output}")
+        if missing:
+            print(f"Warning: {missing} diners had no usable result and were left without insights")
+
+    elif args.command == "ingest-justifications":
+        data = load_json(args.input)
+        results = load_results(args.results)
+        seed_cache(iter_justification_requests(data, args.batched), results)
+        missing = ingest_justifications(data, results, args.batched)
+        output = args.output or args.input
+        write_json_atomic(output, data)
+        print(f"✓ Saved justifications to {output}")
+        if missing:
+            print(f"Warning: {missing} justifications were missing; re-run add_justifications.py to fill them in")
+
+
+if __name__ == "__main__":
+    main()
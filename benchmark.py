@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+Measures the pipeline scripts offline: a synthetic dataset is generated at the
+requested scale, a local mock chat completions server stands in for the API,
+and each script runs as a subprocess against it. For every script the report
+lists wall time, API calls (by status code), tokens sent and received, and
+peak RSS, so throughput regressions show up without a live key.
+
+Usage:
+    python benchmark.py --diners 500 --latency-ms 200 --async --concurrency 16
+    python benchmark.py --scripts pipeline --rate-limit-rate 0.05 --report bench.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_openai_server import start_server
+from synthetic_data import write_dataset
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Benchmarked scripts in pipeline order; each reads the previous one's output
+SCRIPTS = ["insights", "justifications", "dishes", "pipeline"]
+DEFAULT_SCRIPTS = ["insights", "justifications", "dishes"]
+
+
+def parse_scripts(value):
+    selected = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = set(selected) - set(SCRIPTS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown script(s): {', '.join(sorted(unknown))} (choose from {', '.join(SCRIPTS)})")
+    return selected
+
+
+def build_command(script, args, paths):
+    """Command line for one benchmarked script."""
+    cache = ["--cache-path", paths["cache"]] if args.cache else ["--no-cache"]
+
+    if script == "insights":
+        command = ["generate_insights.py", "--input", paths["dataset"], "--output", paths["detailed"]]
+        if args.use_async:
+            command += ["--async", "--concurrency", str(args.concurrency)]
+    elif script == "justifications":
+        command = ["add_justifications.py", "--input", paths["detailed"], "--output", paths["justified"]]
+        if args.batched:
+            command.append("--batched")
+    elif script == "dishes":
+        command = ["extract_dishes.py", "--input", paths["justified"], "--output", paths["dishes"]]
+        if args.llm_tiebreak:
+            command.append("--llm-tiebreak")
+    else:
+        command = ["pipeline.py", "--input", paths["dataset"],
+                   "--detailed-output", paths["pipeline_detailed"], "--dishes-output", paths["pipeline_dishes"],
+                   "--dashboard-dir", paths["pipeline_dashboard"]]
+        if args.use_async:
+            command += ["--async", "--concurrency", str(args.concurrency)]
+        if args.batched:
+            command.append("--batched")
+        if args.llm_tiebreak:
+            command.append("--llm-tiebreak")
+
+    return [sys.executable, os.path.join(REPO_DIR, command[0])] + command[1:] + cache + ["--no-checkpoint"]
+
+
+def run_measured(command, env, log_path):
+    """Run a command and return (exit code, wall seconds, peak RSS in MB)."""
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, env=env, cwd=REPO_DIR, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 returns the resource usage of exactly this child
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return process.returncode, wall, peak_rss
+
+
+def run_benchmark(args):
+    """Generate the data, run every selected script against the mock server and return the results."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dining-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    paths = {name: os.path.join(workdir, filename) for name, filename in {
+        "dataset": "dataset.json",
+        "detailed": "detailed_info.json",
+        "justified": "detailed_info.justified.json",
+        "dishes": "dishes.json",
+        "pipeline_detailed": "pipeline_detailed_info.json",
+        "pipeline_dishes": "pipeline_dishes.json",
+        "pipeline_dashboard": "pipeline_dashboard",
+        "cache": "llm_cache.sqlite3"
+    }.items()}
+
+    if args.dataset:
+        paths["dataset"] = os.path.abspath(args.dataset)
+        print(f"Using dataset {paths['dataset']}")
+    else:
+        start = time.perf_counter()
+        count = write_dataset(
+            paths["dataset"], args.diners,
+            reviews=args.reviews, emails=args.emails, reservations=args.reservations,
+            orders=args.orders, seed=args.seed
+        )
+        print(f"✓ Generated {count} synthetic diners in {time.perf_counter() - start:.1f}s ({paths['dataset']})")
+
+    server = start_server(
+        latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after_ms=args.retry_after_ms, seed=args.seed,
+        malformed_rate=args.malformed_rate
+    )
+    print(f"✓ Mock server running at {server.base_url}")
+
+    env = dict(os.environ, OPENAI_BASE_URL=server.base_url, OPENAI_API_KEY="mock", LLM_CACHE_PATH=paths["cache"])
+    results = []
+    try:
+        for script in args.scripts:
+            server.stats.reset()
+            command = build_command(script, args, paths)
+            log_path = os.path.join(workdir, f"{script}.log")
+            print(f"\nRunning {script}: {' '.join(os.path.basename(part) if part.startswith(REPO_DIR) else part for part in command[1:])}")
+
+            exit_code, wall, peak_rss = run_measured(command, env, log_path)
+            stats = server.stats.snapshot()
+            result = {
+                "script": script,
+                "exit_code": exit_code,
+                "wall_seconds": round(wall, 3),
+                "calls": stats["calls"],
+                "status_counts": stats["status_counts"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "calls_per_second": round(stats["calls"] / wall, 2) if wall else None,
+                "peak_rss_mb": round(peak_rss, 1),
+                "log": log_path
+            }
+            results.append(result)
+            print(f"  {wall:.1f}s, {stats['calls']} calls, {stats['prompt_tokens']} prompt tokens, peak RSS {peak_rss:.0f} MB")
+            if exit_code != 0:
+                print(f"  Warning: {script} exited with code {exit_code}, see {log_path}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("report", "workdir")},
+        "workdir": workdir,
+        "results": results
+    }
+
+
+def print_report(report):
+    print("\nBenchmark results")
+    print("=================")
+    print(f"{'script':<15} {'wall s':>8} {'calls':>7} {'calls/s':>8} {'prompt tok':>11} {'compl tok':>10} {'RSS MB':>7}  status codes")
+    for result in report["results"]:
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(result["status_counts"].items()))
+        print(f"{result['script']:<15} {result['wall_seconds']:>8.1f} {result['calls']:>7} "
+              f"{result['calls_per_second'] or 0:>8.1f} {result['prompt_tokens']:>11} "
+              f"{result['completion_tokens']:>10} {result['peak_rss_mb']:>7.0f}  {statuses}")
+
+
+def main():
+    """Command line entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline scripts against a local mock API")
+    parser.add_argument("--scripts", type=parse_scripts, default=DEFAULT_SCRIPTS,
+                        help=f"Comma-separated scripts to run, from {', '.join(SCRIPTS)} (default: {','.join(DEFAULT_SCRIPTS)})")
+    parser.add_argument("--workdir", default=None, help="Where datasets, outputs and logs go (default: a new temp dir)")
+    parser.add_argument("--report", default=None, help="Also write the results as JSON to this file")
+
+    group = parser.add_argument_group("dataset")
+    group.add_argument("--dataset", default=None, help="Benchmark an existing dataset instead of generating one")
+    group.add_argument("--diners", type=int, default=200, help="Synthetic diners (default: %(default)s)")
+    group.add_argument("--reviews", type=int, default=2, help="Reviews per diner (default: %(default)s)")
+    group.add_argument("--emails", type=int, default=1, help="Emails per diner (default: %(default)s)")
+    group.add_argument("--reservations", type=int, default=1, help="Reservations per diner (default: %(default)s)")
+    group.add_argument("--orders", type=int, default=2, help="Orders per reservation (default: %(default)s)")
+    group.add_argument("--seed", type=int, default=0, help="Seed for the data and fault injection (default: %(default)s)")
+
+    group = parser.add_argument_group("mock server")
+    group.add_argument("--latency-ms", type=float, default=50, help="Mean response latency (default: %(default)s)")
+    group.add_argument("--latency-jitter-ms", type=float, default=10, help="Latency standard deviation (default: %(default)s)")
+    group.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses (default: %(default)s)")
+    group.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429 responses (default: %(default)s)")
+    group.add_argument("--retry-after-ms", type=int, default=200, help="Retry-After sent with 429s (default: %(default)s)")
+    group.add_argument("--malformed-rate", type=float, default=0.0,
+                       help="Fraction of answers cut off or wrapped in extra text (default: %(default)s)")
+
+    group = parser.add_argument_group("script options")
+    group.add_argument("--async", dest="use_async", action="store_true", help="Run the insights stage concurrently")
+    group.add_argument("--concurrency", type=int, default=8, help="Async concurrency (default: %(default)s)")
+    group.add_argument("--batched", action="store_true", help="Batch justifications per diner")
+    group.add_argument("--llm-tiebreak", action="store_true", help="Use the LLM table tiebreaker")
+    group.add_argument("--cache", action="store_true",
+                       help="Keep the LLM cache between scripts (default: every call goes to the mock server)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
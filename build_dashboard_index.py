@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Build the Dashboard Data
+Precomputes the views the dashboard used to derive on every render and splits
+them into one shard per reservation date: the date's reservations, pre-shaped
+with their guest's reviews and emails, priority score and needs counts and
+ranked by priority, its parties with their tables, and its dishes grouped by
+dietary exceptions. A small manifest lists the dates and their counts. The
+dashboard loads the manifest at startup and fetches a shard only when its date
+is shown, so startup cost stays flat however much history accumulates.
+
+Run it after extract_dishes.py (pipeline.py does it automatically):
+    python build_dashboard_index.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from data_io import iter_records, write_json_atomic
+from detailed_format import iter_denormalized
+from reservation_query import DISHES_PATH, order_total
+
+DETAILED_INFO_PATH = "src/detailed_info.json"
+# Served by the React dev server and copied into the production build as-is
+OUTPUT_DIR = "public/data"
+MANIFEST_NAME = "manifest.json"
+SHARDS_DIR = "dates"
+
+# Priority weights (formerly calculatePriority() in src/App.js)
+POINTS_PER_DOLLAR = 2
+POINTS_PER_ACCOMMODATION = 50
+POINTS_PER_DIETARY_TAG = 30
+LONG_EMAIL_CHARS = 200
+VERY_LONG_EMAIL_CHARS = 400
+POINTS_PER_EMAIL_THRESHOLD = 25
+POINTS_PER_HIGH_MAINTENANCE_VALUE = 15
+HIGH_MAINTENANCE_VALUES = ["personalized service", "confidential atmosphere", "enthusiastic staff"]
+
+# Spelling variants shown as one dish in the chef's dish view
+DISH_NAME_ALIASES = [(re.compile(r"^Boeuf\b", re.IGNORECASE), "Beef")]
+
+
+def average_email_length(diner):
+    emails = diner.get("emails") or []
+    if not emails:
+        return 0
+    return sum(len(email.get("combined_thread", "")) for email in emails) / len(emails)
+
+
+def priority_score(reservation, email_length):
+    """Priority of a reservation: spend, accommodations, dietary tags, email complexity and demanding values."""
+    insights = (reservation.get("notes") or {}).get("customer_insights") or {}
+    orders = reservation.get("orders", [])
+
+    score = sum(order.get("price", 0) for order in orders) * POINTS_PER_DOLLAR
+    score += len(insights.get("special_accommodations") or []) * POINTS_PER_ACCOMMODATION
+    score += sum(len(order.get("dietary_tags", [])) for order in orders) * POINTS_PER_DIETARY_TAG
+
+    # Longer emails usually carry more special requests
+    if email_length > LONG_EMAIL_CHARS:
+        score += POINTS_PER_EMAIL_THRESHOLD
+    if email_length > VERY_LONG_EMAIL_CHARS:
+        score += POINTS_PER_EMAIL_THRESHOLD
+
+    values = [value.lower() for value in insights.get("customer_values") or []]
+    matches = [value for value in values if any(marker in value for marker in HIGH_MAINTENANCE_VALUES)]
+    score += len(matches) * POINTS_PER_HIGH_MAINTENANCE_VALUE
+
+    return round(score, 2)
+
+
+def shape_reservation(diner, reservation, email_length):
+    """A reservation as the dashboard renders it, with its guest's details and precomputed scores."""
+    insights = (reservation.get("notes") or {}).get("customer_insights") or {}
+    orders = reservation.get("orders", [])
+    special_accommodations = len(insights.get("special_accommodations") or [])
+    return {
+        **reservation,
+        "guestName": diner.get("name"),
+        "guestData": {
+            "name": diner.get("name"),
+            "reviews": diner.get("reviews", []),
+            "emails": diner.get("emails", [])
+        },
+        "priorityScore": priority_score(reservation, email_length),
+        # Only special accommodations count as "needs"; dietary tags are shown separately
+        "totalNeeds": special_accommodations,
+        "totalCost": order_total(orders),
+        "needsBreakdown": {
+            "specialAccommodations": special_accommodations,
+            "dietaryRestrictions": sum(len(order.get("dietary_tags", [])) for order in orders)
+        }
+    }
+
+
+def iter_shaped_reservations(diners):
+    """Yield every reservation, shaped for the dashboard, in detailed_info order."""
+    for diner in iter_denormalized(diners):
+        email_length = average_email_length(diner)
+        for reservation in diner.get("reservations", []):
+            yield shape_reservation(diner, reservation, email_length)
+
+
+def normalize_dish_name(name):
+    for pattern, canonical in DISH_NAME_ALIASES:
+        name = pattern.sub(canonical, name)
+    return name
+
+
+def build_dish_index(parties):
+    """Dishes with their variations (grouped by dietary exceptions) and the orders of each variation."""
+    dishes = {}
+    for party in parties:
+        for dish in party.get("dishes", []):
+            name = normalize_dish_name(dish.get("name", ""))
+            exceptions = sorted(dish.get("dietary_exceptions") or [])
+            variation_key = ", ".join(exceptions) if exceptions else "standard"
+
+            variations = dishes.setdefault(name, {})
+            variation = variations.setdefault(variation_key, {
+                "variation": variation_key,
+                "dietary_exceptions": exceptions,
+                "quantity": 0,
+                "orders": []
+            })
+            variation["quantity"] += 1
+            variation["orders"].append({
+                "party_id": party.get("party_id"),
+                "table_number": party.get("table_number"),
+                "customer_name": party.get("customer_name"),
+                "price": dish.get("price", 0)
+            })
+
+    return [
+        {"name": name, "variations": list(variations.values())}
+        for name, variations in sorted(dishes.items(), key=lambda item: item[0].casefold())
+    ]
+
+
+def build_shards(diners, parties):
+    """{date: shard} with the date's reservations (highest priority first), parties (by table) and dishes."""
+    reservations_by_date = {}
+    for reservation in iter_shaped_reservations(diners):
+        reservations_by_date.setdefault(reservation.get("date", ""), []).append(reservation)
+    parties_by_date = {}
+    for party in parties:
+        parties_by_date.setdefault(party.get("date", ""), []).append(party)
+
+    shards = {}
+    for date in sorted(set(reservations_by_date) | set(parties_by_date)):
+        reservations = sorted(reservations_by_date.get(date, []), key=lambda reservation: -reservation["priorityScore"])
+        date_parties = sorted(
+            parties_by_date.get(date, []),
+            key=lambda party: (party.get("table_number") is None, party.get("table_number") or 0)
+        )
+        shards[date] = {
+            "date": date,
+            "reservations": reservations,
+            "parties": date_parties,
+            "dishes": build_dish_index(date_parties)
+        }
+    return shards
+
+
+def shard_file(date):
+    return f"{SHARDS_DIR}/{date or 'undated'}.json"
+
+
+def encode(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def write_shard(output_dir, date, shard):
+    """Write a date's shard unless it is unchanged; returns (manifest entry, shard text, whether it was written)."""
+    text = encode(shard)
+    path = os.path.join(output_dir, shard_file(date))
+    written = not os.path.exists(path) or read_text(path) != text
+    if written:
+        write_json_atomic(path, shard, compact=True)
+    entry = {
+        "date": date,
+        "file": shard_file(date),
+        "reservations": len(shard["reservations"]),
+        "guests": sum(reservation.get("number_of_people") or 0 for reservation in shard["reservations"]),
+        "parties": len(shard["parties"])
+    }
+    return entry, text, written
+
+
+def write_manifest(output_dir, entries, shard_texts):
+    manifest = {
+        # Changes whenever any shard changes; the dashboard appends it to shard URLs to bypass stale caches
+        "version": hashlib.sha256("".join(shard_texts).encode("utf-8")).hexdigest()[:12],
+        "generated_at": datetime.now().isoformat(),
+        "dates": entries
+    }
+    write_json_atomic(os.path.join(output_dir, MANIFEST_NAME), manifest)
+    return manifest
+
+
+def write_dashboard_data(diners, parties, output_dir=OUTPUT_DIR):
+    """
+    Write one shard per date and the manifest listing them. Unchanged shards are
+    left untouched, the manifest is replaced last so the dashboard never sees a
+    date whose shard is missing, and shards of dates that disappeared are removed.
+    Returns (manifest, number of shards written).
+    """
+    shards = build_shards(diners, parties)
+    os.makedirs(os.path.join(output_dir, SHARDS_DIR), exist_ok=True)
+
+    written = 0
+    entries = []
+    texts = []
+    for date, shard in shards.items():
+        entry, text, changed = write_shard(output_dir, date, shard)
+        entries.append(entry)
+        texts.append(text)
+        written += changed
+    manifest = write_manifest(output_dir, entries, texts)
+
+    current = {os.path.basename(shard_file(date)) for date in shards}
+    for name in os.listdir(os.path.join(output_dir, SHARDS_DIR)):
+        if name.endswith(".json") and name not in current:
+            os.remove(os.path.join(output_dir, SHARDS_DIR, name))
+
+    return manifest, written
+
+
+def publish_dates(diners, parties, dates, output_dir=OUTPUT_DIR):
+    """
+    Write the shards of the given dates only and add them to the existing
+    manifest, keeping every other date as it is. Used to publish dates that are
+    ready while the rest of a run is still in progress. Returns the manifest.
+    """
+    shards = build_shards(diners, parties)
+    os.makedirs(os.path.join(output_dir, SHARDS_DIR), exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    entries = {}
+    if os.path.exists(manifest_path):
+        entries = {entry["date"]: entry for entry in json.loads(read_text(manifest_path)).get("dates", [])}
+
+    for date in dates:
+        if date in shards:
+            entries[date], _, _ = write_shard(output_dir, date, shards[date])
+
+    ordered = [entries[date] for date in sorted(entries)]
+    texts = [read_text(os.path.join(output_dir, entry["file"])) for entry in ordered
+             if os.path.exists(os.path.join(output_dir, entry["file"]))]
+    return write_manifest(output_dir, ordered, texts)
+
+
+def main():
+    """Command line entry point for building the dashboard index."""
+    parser = argparse.ArgumentParser(description="Precompute the dashboard's rankings and dish views")
+    parser.add_argument("--detailed", default=DETAILED_INFO_PATH,
+                        help="Detailed info, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--dishes", default=DISHES_PATH,
+                        help="Parties from extract_dishes.py, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help="Directory for the manifest and per-date shards (default: %(default)s)")
+    args = parser.parse_args()
+
+    try:
+        diners = list(iter_records(args.detailed, "diners"))
+        parties = list(iter_records(args.dishes, "parties"))
+    except FileNotFoundError as e:
+        print(f"Error: {e.filename} not found. Please run generate_insights.py and extract_dishes.py first.")
+        return
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Invalid JSON input: {e}")
+        return
+
+    manifest, written = write_dashboard_data(diners, parties, args.output_dir)
+    print(f"✓ Wrote {len(manifest['dates'])} date shards to {args.output_dir} ({written} changed)")
+
+
+if __name__ == "__main__":
+    main()
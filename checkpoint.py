@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Checkpoint Journal for Resumable Pipeline Runs
+Append-only JSONL journal that records each diner or party as soon as it is
+processed, together with a fingerprint of its inputs. An interrupted run
+resumes where it stopped, and incremental runs only redo entries whose
+inputs changed since they were recorded.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+CHECKPOINT_DIR = ".checkpoints"
+
+
+def fingerprint(*parts):
+    """Stable hash of any JSON-serialisable values."""
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def diner_fingerprint(diner, *extra):
+    """Fingerprint of the inputs that determine a diner's insights."""
+    return fingerprint(
+        diner.get("reviews", []),
+        diner.get("emails", []),
+        diner.get("reservations", []),
+        *extra
+    )
+
+
+def iter_keyed_diners(diners):
+    """
+    Yield (key, diner) pairs with stable journal keys. Names are used so keys
+    survive diners being added or reordered; repeated names get an occurrence suffix.
+    Works on any iterable, so streamed datasets can be keyed as they are read.
+    """
+    seen = {}
+    for diner in diners:
+        name = diner.get("name") or "Unknown"
+        occurrence = seen.get(name, 0)
+        seen[name] = occurrence + 1
+        yield (name if occurrence == 0 else f"{name}#{occurrence + 1}"), diner
+
+
+def diner_keys(diners):
+    """Stable journal keys for a list of diners."""
+    return [key for key, _ in iter_keyed_diners(diners)]
+
+
+class CheckpointJournal:
+    """JSONL journal mapping keys to (fingerprint, result) pairs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.reused = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a partially written last line
+                        continue
+                    self.entries[entry["key"]] = entry
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def lookup(self, key, fingerprint_value):
+        """Return the recorded result for key if its inputs are unchanged, else None."""
+        entry = self.entries.get(key)
+        if entry is None or entry.get("fingerprint") != fingerprint_value:
+            return None
+        self.reused += 1
+        return entry["result"]
+
+    def record(self, key, fingerprint_value, result):
+        """Durably append a completed result to the journal."""
+        entry = {"key": key, "fingerprint": fingerprint_value, "result": result}
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self.entries[key] = entry
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.recorded += 1
+
+    def compact(self, keep_keys=None):
+        """Rewrite the journal with one line per key, optionally dropping keys no longer in the dataset."""
+        with self._lock:
+            if keep_keys is not None:
+                keep_keys = set(keep_keys)
+                self.entries = {key: entry for key, entry in self.entries.items() if key in keep_keys}
+
+            self._file.close()
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def summary(self):
+        return f"Checkpoint {self.path}: {self.reused} reused, {self.recorded} newly recorded"
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def add_checkpoint_arguments(parser, stage):
+    """Register the shared checkpoint command-line flags on an argparse parser."""
+    group = parser.add_argument_group("checkpointing")
+    group.add_argument("--checkpoint", default=os.path.join(CHECKPOINT_DIR, f"{stage}.jsonl"),
+                       help="Journal file used to resume and incrementally update runs (default: %(default)s)")
+    group.add_argument("--no-checkpoint", action="store_true",
+                       help="Process everything without reading or writing the journal")
+    group.add_argument("--reset-checkpoint", action="store_true",
+                       help="Discard the existing journal before starting")
+
+
+def open_journal_from_args(args):
+    """Open the journal selected by add_checkpoint_arguments() flags, or None if disabled."""
+    if args.no_checkpoint:
+        return None
+    if args.reset_checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    return CheckpointJournal(args.checkpoint)
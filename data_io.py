@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Streaming Dataset Input/Output
+Helpers for reading and writing the pipeline's record lists one record at a
+time instead of loading whole files. Records are either stored in the wrapped
+format used by the dashboard ({"diners": [...]}, {"parties": [...]}) or as a
+JSONL stream with one diner or party per line. The format is chosen by file
+extension (.jsonl for streams), and this module doubles as a converter
+between the two.
+"""
+
+import argparse
+import json
+import os
+
+CHUNK_SIZE = 1 << 16
+
+
+def is_jsonl(path):
+    return path.endswith(".jsonl")
+
+
+def iter_jsonl(path):
+    """Yield one record per non-empty line of a JSONL file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON line: {e}") from e
+
+
+def iter_wrapped_json(path, key):
+    """
+    Yield the items of the top-level {key: [...]} array of a JSON file without
+    loading the whole document. Only the array is read; the values of other
+    top-level keys are skipped over without being parsed, so the same key
+    nested inside them is never mistaken for the wrapper.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            # Drop consumed text so the buffer only ever holds about one record
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        def peek():
+            """Skip whitespace and return the next character (None at end of file) without consuming it."""
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n":
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if eof:
+                    return None
+                fill()
+
+        def decode():
+            """Parse the JSON value at the current position."""
+            nonlocal position
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # The value straddles the chunk boundary; read more and retry
+                    fill()
+                    continue
+                # A number at the very end of the buffer may be truncated
+                if end == len(buffer) and not eof:
+                    fill()
+                    continue
+                position = end
+                return value
+
+        def skip():
+            """Move past the JSON value at the current position, tracking strings and nesting only."""
+            nonlocal position
+            depth = 0
+            in_string = escaped = False
+            while True:
+                if position >= len(buffer):
+                    if eof:
+                        raise ValueError(f"{path}: unexpected end of file")
+                    fill()
+                    continue
+                char = buffer[position]
+                if in_string:
+                    position += 1
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                        if depth == 0:
+                            return
+                elif char == '"':
+                    position += 1
+                    in_string = True
+                elif char in "[{":
+                    position += 1
+                    depth += 1
+                elif char in "]}" and depth:
+                    position += 1
+                    depth -= 1
+                    if depth == 0:
+                        return
+                elif depth == 0 and char in ",]} \t\r\n":
+                    # End of a number, true, false or null
+                    return
+                else:
+                    position += 1
+
+        # Walk the top-level object's keys to the wrapped array
+        if peek() != "{":
+            raise ValueError(f"{path}: expected a JSON object with a '{key}' array")
+        position += 1
+        while True:
+            char = peek()
+            if char == ",":
+                position += 1
+                continue
+            if char is None or char == "}":
+                raise ValueError(f"{path}: no top-level '{key}' array found")
+            name = decode()
+            if peek() != ":":
+                raise ValueError(f"{path}: invalid JSON object")
+            position += 1
+            if name == key:
+                if peek() != "[":
+                    raise ValueError(f"{path}: top-level '{key}' is not an array")
+                position += 1
+                break
+            peek()
+            skip()
+
+        while True:
+            # Skip separators between items
+            char = peek()
+            while char == ",":
+                position += 1
+                char = peek()
+
+            if char is None:
+                raise ValueError(f"{path}: unexpected end of file inside '{key}' array")
+            if char == "]":
+                return
+            yield decode()
+
+
+def iter_records(path, key):
+    """Yield records from either a JSONL stream or a wrapped JSON file."""
+    if is_jsonl(path):
+        return iter_jsonl(path)
+    return iter_wrapped_json(path, key)
+
+
+class RecordWriter:
+    """
+    Incrementally writes records as JSONL or as a wrapped {key: [...]} document.
+    Output goes to a temporary file that atomically replaces the target on
+    close(), so readers never see a half-written file and the input and output
+    may be the same path.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.count = 0
+        self.jsonl = is_jsonl(path)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._temp_path = f"{path}.tmp-{os.getpid()}"
+        self._file = open(self._temp_path, "w", encoding="utf-8")
+        if not self.jsonl:
+            self._file.write("{\n  " + json.dumps(key) + ": [")
+
+    def write(self, record):
+        if self.jsonl:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            # Matches the layout of json.dump(..., indent=2) for the wrapped document
+            rendered = json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+            self._file.write(("," if self.count else "") + "\n    " + rendered)
+        self.count += 1
+
+    def close(self, extra=None):
+        """Finish the document and move it into place. extra adds top-level keys to wrapped output."""
+        if self._file.closed:
+            return
+
+        if not self.jsonl:
+            self._file.write("\n  ]" if self.count else "]")
+            for extra_key, value in (extra or {}).items():
+                rendered = json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                self._file.write(",\n  " + json.dumps(extra_key) + ": " + rendered)
+            self._file.write("\n}")
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        """Discard the partial output, leaving any existing target untouched."""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_json_atomic(path, data, compact=False):
+    """Write a JSON document (indent=2, or minified with compact=True) via a temporary file and atomic rename."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        if compact:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+        else:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def convert(input_path, output_path, key):
+    """Stream records from one format into the other; returns the record count."""
+    with RecordWriter(output_path, key) as writer:
+        for record in iter_records(input_path, key):
+            writer.write(record)
+    return writer.count
+
+
+def main():
+    """Convert between wrapped JSON files and JSONL streams."""
+    parser = argparse.ArgumentParser(description="Convert between wrapped JSON ({\"diners\": [...]}) and JSONL streams")
+    parser.add_argument("command", choices=["to-jsonl", "to-json"])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--key", default="diners", help="Wrapped array key, e.g. diners or parties (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "to-jsonl" and not is_jsonl(args.output):
+        parser.error("to-jsonl output must end in .jsonl")
+    if args.command == "to-json" and is_jsonl(args.output):
+        parser.error("to-json output must not end in .jsonl")
+
+    count = convert(args.input, args.output, args.key)
+    print(f"✓ Wrote {count} {args.key} records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
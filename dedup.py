@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Review and Email Removal
+Email threads often carry quoted copies of earlier messages ("> ...",
+"On ... wrote:", "-----Original Message-----"), and the same review text can
+be stored more than once. Before a customer's prompt context is rendered,
+quoted paragraphs and paragraphs already seen in earlier emails (or, for
+quoted ones, in the email's own text) are removed, and reviews or emails whose
+text nearly duplicates an earlier one are dropped. Quoted text found nowhere
+else is kept, since it may be the guest's only statement of a need.
+Near-duplicates are found with MinHash signatures over word shingles, so
+reworded copies (a changed greeting, a typo fixed) are caught as well.
+Customers without repeated content are returned untouched, so their prompts
+and cached responses do not change.
+
+Report the savings on a dataset with:
+    python dedup.py src/fine-dining-dataset.json
+"""
+
+import argparse
+import hashlib
+import random
+import re
+
+from data_io import iter_records
+
+# Word n-grams compared between texts
+SHINGLE_WORDS = 5
+# MinHash signature length; the Jaccard estimate's error is about 1/sqrt(NUM_PERMUTATIONS)
+NUM_PERMUTATIONS = 64
+# Estimated Jaccard similarity above which two texts count as the same
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Paragraphs shorter than this are greetings and sign-offs, never treated as repeats
+MIN_PARAGRAPH_WORDS = 6
+
+# Fixed coefficients so the same texts always produce the same signatures (and prompts)
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240518)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+QUOTED_LINE = re.compile(r"^\s*>")
+QUOTE_MARKS = re.compile(r"^(\s*>)+\s?")
+# Everything after one of these lines is an earlier message the client appended
+QUOTE_HEADER = re.compile(
+    r"^\s*(On\b.{0,200}\bwrote:\s*$|-+\s*Original Message\s*-+|-+\s*Forwarded message\s*-+)",
+    re.IGNORECASE
+)
+WORD = re.compile(r"\w+")
+
+# Rough token estimate used throughout the pipeline (see rate_limiter.estimate_tokens)
+CHARS_PER_TOKEN = 4
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def shingles(text):
+    tokens = words(text)
+    if len(tokens) <= SHINGLE_WORDS:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[index:index + SHINGLE_WORDS]) for index in range(len(tokens) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text):
+    """MinHash signature of a text's word shingles, or None for texts without words."""
+    hashed = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+              for shingle in shingles(text)]
+    if not hashed:
+        return None
+    return tuple(min((a * value + b) % _PRIME for value in hashed) for a, b in _PERMUTATIONS)
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    if signature is None or other is None:
+        return 0.0
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERMUTATIONS
+
+
+class SeenTexts:
+    """Signatures of the texts kept so far, for near-duplicate checks."""
+
+    def __init__(self):
+        self.exact = set()
+        self.signatures = []
+
+    def contains(self, text):
+        key = " ".join(words(text))
+        if key in self.exact:
+            return True
+        signature = minhash(text)
+        return any(similarity(signature, seen) >= NEAR_DUPLICATE_THRESHOLD for seen in self.signatures)
+
+    def add(self, text):
+        self.exact.add(" ".join(words(text)))
+        signature = minhash(text)
+        if signature is not None:
+            self.signatures.append(signature)
+
+
+def split_thread(thread):
+    """
+    Paragraphs (lines) of a thread in order, as (quoted, text, original). Quoted
+    lines and everything after a reply/forward header are quoted; text has the
+    quote marks removed for comparisons, original is the line as written.
+    """
+    paragraphs = []
+    in_history = False
+    for line in thread.split("\n"):
+        if QUOTE_HEADER.match(line):
+            in_history = True
+            continue
+        text = QUOTE_MARKS.sub("", line).strip()
+        if text:
+            paragraphs.append((in_history or bool(QUOTED_LINE.match(line)), text, line.strip()))
+    return paragraphs
+
+
+class DedupStats:
+    """What deduplication removed from one customer (or a whole dataset, via add())."""
+
+    def __init__(self):
+        self.reviews_dropped = 0
+        self.emails_dropped = 0
+        self.paragraphs_dropped = 0
+        self.chars_saved = 0
+
+    def add(self, other):
+        self.reviews_dropped += other.reviews_dropped
+        self.emails_dropped += other.emails_dropped
+        self.paragraphs_dropped += other.paragraphs_dropped
+        self.chars_saved += other.chars_saved
+
+    @property
+    def tokens_saved(self):
+        return self.chars_saved // CHARS_PER_TOKEN
+
+    @property
+    def changed(self):
+        return bool(self.reviews_dropped or self.emails_dropped or self.paragraphs_dropped or self.chars_saved)
+
+
+def dedupe_reviews(reviews, stats):
+    seen = SeenTexts()
+    kept = []
+    for review in reviews:
+        content = review.get("content", "")
+        if content and seen.contains(content):
+            stats.reviews_dropped += 1
+            stats.chars_saved += len(content)
+            continue
+        seen.add(content)
+        kept.append(review)
+    return kept
+
+
+def dedupe_emails(emails, stats):
+    """Strip quoted history and repeated paragraphs; drop emails with nothing new left."""
+    seen = SeenTexts()
+    kept = []
+    for email in emails:
+        thread = email.get("combined_thread", "")
+        if not thread.strip():
+            kept.append(email)
+            continue
+
+        parts = split_thread(thread)
+        own = SeenTexts()
+        for quoted, text, _ in parts:
+            if not quoted:
+                own.add(text)
+
+        paragraphs = []
+        repeated = quoted_dropped = 0
+        for quoted, text, original in parts:
+            if quoted:
+                # Quoted history is dropped only where it repeats something already kept
+                if seen.contains(text) or own.contains(text):
+                    quoted_dropped += 1
+                    continue
+            elif len(words(text)) >= MIN_PARAGRAPH_WORDS and seen.contains(text):
+                repeated += 1
+                continue
+            paragraphs.append((text, original))
+        stats.paragraphs_dropped += repeated + quoted_dropped
+
+        # A repeat with only a greeting or sign-off of its own says nothing new
+        if not paragraphs or (repeated and all(len(words(text)) < MIN_PARAGRAPH_WORDS for text, _ in paragraphs)):
+            stats.emails_dropped += 1
+            stats.chars_saved += len(thread)
+            continue
+
+        if not repeated and not quoted_dropped:
+            # Nothing removed: keep the email exactly as stored
+            new_thread = thread
+        else:
+            new_thread = "\n\n".join(original for _, original in paragraphs)
+        for text, _ in paragraphs:
+            # Short paragraphs are still remembered exactly so quoted copies of them are recognised
+            seen.add(text)
+        stats.chars_saved += len(thread) - len(new_thread)
+        kept.append(email if new_thread == thread else {**email, "combined_thread": new_thread})
+    return kept
+
+
+def dedupe_customer(customer_data):
+    """
+    Return (customer, DedupStats) with repeated reviews and email content removed.
+    The customer is returned as-is when nothing was removed.
+    """
+    stats = DedupStats()
+    reviews = dedupe_reviews(customer_data.get("reviews") or [], stats)
+    emails = dedupe_emails(customer_data.get("emails") or [], stats)
+    if not stats.changed:
+        return customer_data, stats
+    return {**customer_data, "reviews": reviews, "emails": emails}, stats
+
+
+def main():
+    """Report how much repeated review and email text a dataset carries."""
+    parser = argparse.ArgumentParser(description="Report near-duplicate reviews and quoted email content in a dataset")
+    parser.add_argument("input", help="Dataset or detailed info, wrapped JSON or .jsonl")
+    args = parser.parse_args()
+
+    customers = affected = 0
+    total = DedupStats()
+    for diner in iter_records(args.input, "diners"):
+        _, stats = dedupe_customer(diner)
+        customers += 1
+        affected += stats.changed
+        total.add(stats)
+
+    print(f"Customers: {customers} ({affected} with repeated content)")
+    print(f"Dropped: {total.reviews_dropped} duplicate reviews, {total.emails_dropped} repeated emails, "
+          f"{total.paragraphs_dropped} quoted or repeated paragraphs")
+    print(f"Saved: {total.chars_saved} characters (~{total.tokens_saved} tokens) per prompt round")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Normalized detailed_info Format
+Insights are generated once per diner, but the original detailed_info layout
+copies the same customer_insights, summary and timestamp into every
+reservation. The normalized layout stores them once in a diner-level "notes"
+block that all of the diner's reservations refer to; a reservation only
+carries its own "notes" when they differ from the diner's, and its own
+"notes_generated_at" when only the timestamp does. The compatibility view
+(denormalize) expands the notes back onto every reservation, which is the
+layout the dashboard and the older scripts read, so converting a file there
+and back reproduces it.
+
+Convert existing files with:
+    python detailed_format.py normalize src/detailed_info.json detailed_info.normalized.json
+    python detailed_format.py denormalize detailed_info.normalized.json src/detailed_info.json
+"""
+
+import argparse
+from datetime import datetime
+
+from data_io import RecordWriter, iter_records
+
+
+# Reservation key holding its notes' timestamp when only that differs from the diner's notes
+GENERATED_AT_KEY = "notes_generated_at"
+
+
+def is_justification_key(key):
+    return key.endswith("_justification") or key.endswith("_justifications")
+
+
+def build_summary(customer_insights):
+    """One-line summary of a diner's insights."""
+    summary_parts = []
+
+    if customer_insights.get("customer_values"):
+        summary_parts.append(f"Values: {', '.join(customer_insights['customer_values'])}")
+
+    if "is_new_customer" in customer_insights:
+        summary_parts.append("New customer" if customer_insights["is_new_customer"] else "Returning customer")
+
+    if customer_insights.get("special_accommodations"):
+        summary_parts.append(f"Special needs: {', '.join(customer_insights['special_accommodations'])}")
+
+    if customer_insights.get("taste_preferences"):
+        summary_parts.append(f"Taste preference: {customer_insights['taste_preferences']}")
+
+    if customer_insights.get("staff_interaction_preferences"):
+        summary_parts.append(f"Likes staff who are: {', '.join(customer_insights['staff_interaction_preferences'])}")
+
+    if customer_insights.get("personal_interests"):
+        summary_parts.append(f"Personal interests: {', '.join(customer_insights['personal_interests'])}")
+
+    return ". ".join(summary_parts) if summary_parts else "No specific insights available"
+
+
+def build_notes(customer_insights, generated_at=None):
+    """The notes block stored per diner (normalized) or per reservation (compatibility view)."""
+    return {
+        "customer_insights": customer_insights,
+        "generated_at": generated_at or datetime.now().isoformat(),
+        "summary": build_summary(customer_insights)
+    }
+
+
+def is_normalized(diner):
+    """True if the diner's notes are stored once at the diner level."""
+    return "notes" in diner
+
+
+def normalize_diner(diner):
+    """
+    Move identical reservation notes up to the diner. Reservations whose notes
+    differ from the first reservation's keep their own notes as an override;
+    those that differ only in generated_at keep just that timestamp.
+    """
+    if is_normalized(diner):
+        return diner
+
+    reservations = diner.get("reservations", [])
+    shared_notes = next((reservation["notes"] for reservation in reservations if "notes" in reservation), None)
+    if shared_notes is None:
+        return diner
+
+    normalized_reservations = []
+    for reservation in reservations:
+        notes = reservation.get("notes")
+        if notes is not None and _same_notes(notes, shared_notes):
+            generated_at = notes.get("generated_at")
+            if generated_at == shared_notes.get("generated_at"):
+                reservation = {key: value for key, value in reservation.items() if key != "notes"}
+            else:
+                reservation = _replace_key(reservation, "notes", GENERATED_AT_KEY, generated_at)
+        normalized_reservations.append(reservation)
+
+    # Keep the original key order so converting back is byte-for-byte identical
+    normalized = {}
+    for key, value in diner.items():
+        if key == "reservations":
+            normalized["notes"] = shared_notes
+            value = normalized_reservations
+        normalized[key] = value
+    return normalized
+
+
+def _same_notes(notes, other):
+    # Older runs stamped each reservation's copy separately, microseconds apart
+    return (notes.get("customer_insights") == other.get("customer_insights")
+            and notes.get("summary") == other.get("summary")
+            and set(notes) == set(other))
+
+
+def denormalize_diner(diner):
+    """
+    Compatibility view: copy the diner-level notes onto every reservation that
+    has none of its own. The copies share the diner's notes dictionary, except
+    where a reservation keeps its own timestamp.
+    """
+    if not is_normalized(diner):
+        return diner
+
+    notes = diner["notes"]
+    denormalized = {key: value for key, value in diner.items() if key != "notes"}
+    denormalized["reservations"] = [_expand_notes(reservation, notes) for reservation in diner.get("reservations", [])]
+    return denormalized
+
+
+def _expand_notes(reservation, notes):
+    if "notes" in reservation:
+        return reservation
+    if GENERATED_AT_KEY not in reservation:
+        return {**reservation, "notes": notes}
+    return _replace_key(reservation, GENERATED_AT_KEY, "notes", {**notes, "generated_at": reservation[GENERATED_AT_KEY]})
+
+
+def _replace_key(record, old_key, new_key, new_value):
+    """Copy of record with old_key replaced by new_key in the same position, so key order survives a round trip."""
+    return {(new_key if key == old_key else key): (new_value if key == old_key else value)
+            for key, value in record.items()}
+
+
+def iter_denormalized(diners):
+    """Yield the compatibility view of any iterable of diners, normalized or not."""
+    for diner in diners:
+        yield denormalize_diner(diner)
+
+
+def normalize(data):
+    return {**data, "diners": [normalize_diner(diner) for diner in data.get("diners", [])]}
+
+
+def denormalize(data):
+    return {**data, "diners": list(iter_denormalized(data.get("diners", [])))}
+
+
+def iter_insight_targets(diner):
+    """
+    Yield (label, customer_insights) for every place the diner's insights are
+    stored: "diner" for diner-level notes, otherwise the reservation index.
+    """
+    if "customer_insights" in diner.get("notes", {}):
+        yield "diner", diner["notes"]["customer_insights"]
+    for reservation_index, reservation in enumerate(diner.get("reservations", [])):
+        if "customer_insights" in reservation.get("notes", {}):
+            yield reservation_index, reservation["notes"]["customer_insights"]
+
+
+def group_insight_targets(diner):
+    """
+    Group the diner's insight targets whose insights are identical apart from
+    justifications, so each distinct set of insights is justified only once.
+    Returns [(label, [customer_insights, ...])] labelled by the first member.
+    """
+    groups = {}
+    for label, insights in iter_insight_targets(diner):
+        content = {key: value for key, value in insights.items() if not is_justification_key(key)}
+        # Insights are small, so their canonical repr is a cheap grouping key
+        group_key = repr(sorted(content.items(), key=lambda item: item[0]))
+        if group_key not in groups:
+            groups[group_key] = (label, [])
+        groups[group_key][1].append(insights)
+    return list(groups.values())
+
+
+def main():
+    """Convert detailed_info files between the per-reservation and normalized layouts."""
+    parser = argparse.ArgumentParser(description="Convert detailed_info between the per-reservation and normalized layouts")
+    parser.add_argument("command", choices=["normalize", "denormalize"])
+    parser.add_argument("input")
+    parser.add_argument("output")
+    args = parser.parse_args()
+
+    convert_diner = normalize_diner if args.command == "normalize" else denormalize_diner
+    with RecordWriter(args.output, "diners") as writer:
+        for diner in iter_records(args.input, "diners"):
+            writer.write(convert_diner(diner))
+    print(f"✓ Wrote {writer.count} {args.command}d diners to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Dry Runs
+Estimates what a run of generate_insights.py, add_justifications.py or
+extract_dishes.py will cost and how long it will take, without importing the
+OpenAI SDK, building a client or needing an API key. The scripts' normal code
+paths run with a DryRunClient in place of the OpenAI client, so every prompt
+is rendered exactly as in a real run (routing, escalation and the local fast
+path included). Input tokens are counted locally with the pipeline's usual
+estimate and each request's max_tokens is counted as its output, so output
+tokens and cost are upper bounds. Answers come from llm_standin.py, which
+keeps follow-up prompts (such as justifications per returned tag) shaped
+like a real run's.
+
+Cached responses are still served, so only real API calls are counted; the
+cache file is opened read-only (and not created when missing) and no journal
+or output file is written. Wall time
+is estimated from the call count at --assumed-latency seconds per call,
+spread over the configured concurrency, and from the time the requests and
+tokens need under the rate limits, whichever is longer.
+"""
+
+import threading
+from types import SimpleNamespace
+
+from llm_standin import standin_content
+from pipeline_metrics import estimate_cost, get_metrics, model_price
+from rate_limiter import estimate_tokens
+
+# Typical latency of one chat completion, used when --assumed-latency is not given
+DEFAULT_CALL_SECONDS = 1.5
+
+
+class DryRunEstimate:
+    """Calls, tokens and cost of the requests a dry run would have sent, per model."""
+
+    def __init__(self, concurrency=1, requests_per_minute=None, tokens_per_minute=None,
+                 call_seconds=DEFAULT_CALL_SECONDS):
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.call_seconds = call_seconds
+        self.models = {}
+        self.limited_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, request):
+        """Count a request; returns its (input, output) tokens."""
+        input_tokens = estimate_tokens(request.get("messages", []))
+        output_tokens = request.get("max_tokens") or 0
+        with self._lock:
+            entry = self.models.setdefault(request.get("model") or "unknown",
+                                           {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+            entry["calls"] += 1
+            entry["input_tokens"] += input_tokens
+            entry["output_tokens"] += output_tokens
+            # What the rate limiter charges for the request
+            tokens = estimate_tokens(request.get("messages", []), request.get("max_tokens"))
+            self.limited_tokens += min(tokens, self.tokens_per_minute) if self.tokens_per_minute else tokens
+        return input_tokens, output_tokens
+
+    @property
+    def calls(self):
+        return sum(entry["calls"] for entry in self.models.values())
+
+    def cost(self, model):
+        entry = self.models[model]
+        return estimate_cost(model, entry["input_tokens"], entry["output_tokens"])
+
+    def wall_seconds(self):
+        """Longest of the latency-bound time and the rate-limited time; buckets start full as in RateLimiter."""
+        latency_bound = self.calls * self.call_seconds / self.concurrency
+        rate_bound = 0.0
+        if self.requests_per_minute:
+            rate_bound = max(rate_bound, (self.calls - self.requests_per_minute) * 60.0 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            rate_bound = max(rate_bound, (self.limited_tokens - self.tokens_per_minute) * 60.0 / self.tokens_per_minute)
+        return max(latency_bound, rate_bound)
+
+    def report(self):
+        """The dry run report as printable text."""
+        lines = ["Dry run: no API calls were made and nothing was written",
+                 f"  {'model':<28} {'calls':>7} {'input tokens':>13} {'output tokens':>14} {'cost':>10}"]
+        totals = [0, 0, 0, 0.0]
+        for model, entry in sorted(self.models.items()):
+            cost = self.cost(model)
+            price = "" if model_price(model) else "  (unknown price)"
+            lines.append(f"  {model:<28} {entry['calls']:>7} {entry['input_tokens']:>13,} "
+                         f"{entry['output_tokens']:>14,} {f'${cost:.4f}':>10}{price}")
+            totals = [totals[0] + entry["calls"], totals[1] + entry["input_tokens"],
+                      totals[2] + entry["output_tokens"], totals[3] + cost]
+        lines.append(f"  {'total':<28} {totals[0]:>7} {totals[1]:>13,} {totals[2]:>14,} {f'${totals[3]:.4f}':>10}")
+
+        metrics = get_metrics().report()["totals"]
+        lines.append(f"  {metrics['cache_hits']} answers from the cache, {metrics['avoided_calls']} settled locally")
+
+        minutes, seconds = divmod(round(self.wall_seconds()), 60)
+        limits = ", ".join(
+            f"{value} {unit}/min" for value, unit in ((self.requests_per_minute, "requests"),
+                                                      (self.tokens_per_minute, "tokens")) if value
+        ) or "no rate limits"
+        lines.append(f"Estimated wall time: {minutes}m {seconds:02d}s ({self.calls} calls at "
+                     f"{self.call_seconds:g}s, concurrency {self.concurrency}, {limits})")
+        lines.append("Output tokens are each request's max_tokens, so output and cost are upper bounds.")
+        return "\n".join(lines)
+
+
+class DryRunClient:
+    """Stands in for OpenAI(): records every request in an estimate and answers it with llm_standin."""
+
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **request):
+        input_tokens, output_tokens = self.estimate.record(request)
+        content = standin_content(request)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=input_tokens, completion_tokens=output_tokens)
+        )
+
+    def async_client(self):
+        """The AsyncOpenAI() counterpart, recording into the same estimate."""
+        return AsyncDryRunClient(self.estimate)
+
+
+class AsyncDryRunClient(DryRunClient):
+    """Stands in for AsyncOpenAI()."""
+
+    async def create(self, **request):
+        return DryRunClient.create(self, **request)
+
+    async def close(self):
+        pass
+
+
+def add_dry_run_arguments(parser):
+    """Register the shared dry run flags on an argparse parser."""
+    group = parser.add_argument_group("dry run")
+    group.add_argument("--dry-run", action="store_true",
+                       help="Render every prompt and estimate calls, tokens, cost and wall time without calling the API")
+    group.add_argument("--assumed-latency", type=float, default=DEFAULT_CALL_SECONDS,
+                       help="Seconds per API call for the dry run's wall time estimate (default: %(default)s)")
+
+
+def start_dry_run(args, concurrency=1, requests_per_minute=None, tokens_per_minute=None):
+    """
+    Return the client to use in place of OpenAI() for a dry run from
+    add_dry_run_arguments() flags. configure_cache_from_args() has already
+    opened the cache read-only (or not at all) for it.
+    """
+    estimate = DryRunEstimate(concurrency, requests_per_minute, tokens_per_minute, args.assumed_latency)
+    return DryRunClient(estimate)
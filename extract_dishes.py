@@ -3,91 +3,209 @@
 Extract Dishes Information from Detailed Info
 This script takes the detailed_info.json file and creates a dishes.json file
 that contains table information, cost, group size, and all dishes with
-exceptions, organized by party.
+exceptions, organized by party. Tables are assigned locally by the
+table_assignment engine; the LLM is only used as an optional tiebreaker.
 """
 
+import argparse
 import json
 import os
-import time
-from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import datetime
+from llm_cache import add_cache_arguments, configure_cache_from_args, get_cache
+from llm_client import chat_completion, client_options
+from rate_limiter import RateLimiter
+from checkpoint import add_checkpoint_arguments, fingerprint, iter_keyed_diners, open_journal_from_args
+from data_io import RecordWriter, iter_records
+from dry_run import add_dry_run_arguments, start_dry_run
+from global_budget import BudgetExceededError
+from detailed_format import iter_denormalized
+from table_assignment import assign_tables
+from venues import add_venue_arguments, configure_venue_from_args, describe_layout, get_venue
+from pipeline_metrics import add_metrics_arguments, get_metrics, write_metrics_from_args
+from reservation_query import DISHES_PATH, order_total, total_revenue
+from model_routing import add_routing_arguments, configure_routing_from_args, escalate, get_router
+from retry_policy import add_retry_arguments, configure_retries_from_args
+from structured_output import (
+    TABLE_NUMBER_SCHEMA, StructuredOutputError, build_repair_request, json_schema_format, parse_structured, parse_table_number
+)
 
 # Load environment variables
 load_dotenv()
 
-def create_table_assignment_prompt(customer_name, group_size, special_accommodations, date):
+DETAILED_INFO_PATH = "src/detailed_info.json"
+OUTPUT_PATH = DISHES_PATH
+
+# Pacing for the optional LLM tiebreaker; cached answers are not throttled
+TABLE_ASSIGNMENT_REQUESTS_PER_MINUTE = 120
+
+def create_table_assignment_prompt(customer_name, group_size, special_accommodations, date, candidates=None):
     """Create a prompt to generate table assignment based on party requirements."""
     
-    prompt = f"""You are a restaurant host assigning tables for fine dining restaurant "French Laudure". 
+    if candidates:
+        # Tiebreak mode: the local engine found several equally suitable tables that are still free
+        instruction = f"""Equally suitable tables that are free on this date: {', '.join(str(number) for number in candidates)}
+Pick the one that best fits this party's special accommodations.
+
+Respond with only the table number as a JSON object: {{"table_number": <number>}}"""
+    else:
+        instruction = 'Respond with only the table number as a JSON object: {"table_number": <number>}'
+    
+    venue = get_venue()
+    prompt = f"""You are a restaurant host assigning tables for fine dining restaurant "{venue.name}". 
 
 Customer: {customer_name}
 Party Size: {group_size}
 Date: {date}
 Special Accommodations: {special_accommodations if special_accommodations else "None"}
 
-Based on this information, assign an appropriate table number (1-20) considering:
-- Party size (tables 1-5 for 2 people, 6-12 for 3-4 people, 13-18 for 5-6 people, 19-20 for 7+ people)
-- Special needs (wheelchair access: tables 3,7,11,15; quiet/private: tables 1,8,14,20; piano area: tables 5,12)
-- VIP/private dining: tables 19,20
+{describe_layout(venue)}
 
-Respond with only the table number (just the number, no extra text):"""
+{instruction}"""
     
     return prompt
 
-def extract_dishes_info(data, client):
+def assign_table(client, customer_name, group_size, special_accommodations, date, candidates=None, limiter=None,
+                 escalated=False):
+    """
+    Ask the LLM for a table number, returning None if the call or parsing fails.
+    With escalated=True the request goes to the routing escalation tier (None if there is none).
+    """
+    
+    # Generate table assignment using LLM
+    table_prompt = create_table_assignment_prompt(
+        customer_name, group_size, special_accommodations, date, candidates
+    )
+    
+    messages = [{"role": "user", "content": table_prompt}]
+    request = {
+        "model": get_router().route("tables", messages).model,
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": 20,
+        "response_format": json_schema_format("table_number", TABLE_NUMBER_SCHEMA)
+    }
+    if escalated:
+        request = escalate("tables", request)
+        if request is None:
+            return None
+    
+    def repair(broken_text):
+        return chat_completion(client, limiter, "tables", **build_repair_request(escalate("tables", request) or request, broken_text))
+    
+    try:
+        table_text = chat_completion(client, limiter, "tables", **request)
+        return parse_structured(table_text, "tables", parse_table_number, repair)
+        
+    except StructuredOutputError as e:
+        print(f"Error parsing table assignment for {customer_name}: {e}")
+        return None
+    except BudgetExceededError:
+        raise
+    except Exception as e:
+        print(f"Error generating table assignment for {customer_name}: {e}")
+        return None
+
+def make_llm_tiebreaker(client, limiter=None, journal=None):
+    """Tiebreaker for table_assignment.assign_tables() that asks the LLM to choose among equal, free tables."""
+    
+    def tiebreak(request, candidates):
+        # Reuse the journaled choice for parties whose details have not changed
+        party_fingerprint = fingerprint(
+            request["customer_name"], request["group_size"], request["special_accommodations"],
+            request["date"], candidates, get_router().signature("tables")
+        )
+        table_number = journal.lookup(request["party_key"], party_fingerprint) if journal else None
+        if table_number is not None:
+            return table_number
+        
+        table_number = assign_table(
+            client, request["customer_name"], request["group_size"],
+            request["special_accommodations"], request["date"], candidates, limiter
+        )
+        if table_number not in candidates:
+            # An answer outside the candidates fails validation; ask the stronger tier once
+            table_number = assign_table(
+                client, request["customer_name"], request["group_size"],
+                request["special_accommodations"], request["date"], candidates, limiter, escalated=True
+            )
+        if table_number not in candidates:
+            # The engine keeps its own choice among the candidates
+            get_metrics().record_fallback("tables", "tiebreak_unusable")
+        # Only usable LLM answers are journaled so failures are retried next run
+        if journal and table_number in candidates:
+            journal.record(request["party_key"], party_fingerprint, table_number)
+        return table_number
+    
+    return tiebreak
+
+def get_special_accommodations(reservation):
+    """Extract special accommodations from a reservation's insights."""
+    if "notes" in reservation and "customer_insights" in reservation["notes"]:
+        return reservation["notes"]["customer_insights"].get("special_accommodations", [])
+    return []
+
+def iter_table_requests(diners):
+    """Yield the details the table assignment engine needs for every party."""
+    
+    party_id = 1
+    for customer_key, customer in iter_keyed_diners(iter_denormalized(diners)):
+        for reservation_index, reservation in enumerate(customer.get("reservations", [])):
+            yield {
+                "party_id": party_id,
+                "party_key": f"{customer_key}/{reservation_index}",
+                "customer_name": customer.get("name", "Unknown"),
+                "date": reservation.get("date", ""),
+                "group_size": reservation.get("number_of_people", 0),
+                "special_accommodations": get_special_accommodations(reservation)
+            }
+            party_id += 1
+
+def assign_party_tables(diners, client=None, limiter=None, journal=None, layout=None):
+    """
+    Assign a table to every party with the local engine, one date at a time,
+    on the configured venue's layout unless one is given.
+    With a client, the LLM breaks ties between equally suitable tables.
+    Returns {party_id: table_number}.
+    """
+    
+    requests = list(iter_table_requests(diners))
+    tiebreaker = make_llm_tiebreaker(client, limiter, journal) if client else None
+    table_numbers = assign_tables(requests, layout or get_venue().layout, tiebreaker)
+    
+    unseated = [request for request in requests if table_numbers.get(request["party_id"]) is None]
+    for request in unseated:
+        print(f"Warning: no free table for party {request['party_id']} ({request['customer_name']}) on {request['date']}")
+        get_metrics().record_fallback("tables", "unseated")
+    print(f"Assigned tables to {len(requests) - len(unseated)}/{len(requests)} parties")
+    
+    if journal:
+        journal.compact(keep_keys=[request["party_key"] for request in requests])
+        print(journal.summary())
+    
+    return table_numbers
+
+def extract_dishes_info(data, client=None, limiter=None, journal=None):
     """Extract dishes information organized by party."""
     
-    dishes_data = {"parties": []}
+    diners = data.get("diners", [])
+    table_numbers = assign_party_tables(diners, client, limiter, journal)
+    return {"parties": list(iter_parties(diners, table_numbers))}
+
+def iter_parties(diners, table_numbers):
+    """Yield one party entry per reservation; diners may be any iterable, including a stream."""
+    
     party_id = 1
     
-    for customer in data.get("diners", []):
+    for customer in iter_denormalized(diners):
         customer_name = customer.get("name", "Unknown")
         
         for reservation in customer.get("reservations", []):
-            print(f"Processing party {party_id}: {customer_name}")
-            
             # Extract basic info
             date = reservation.get("date", "")
             group_size = reservation.get("number_of_people", 0)
             orders = reservation.get("orders", [])
             
-            # Calculate total cost
-            total_cost = sum(order.get("price", 0) for order in orders)
-            
-            # Extract special accommodations from insights
-            special_accommodations = []
-            if "notes" in reservation and "customer_insights" in reservation["notes"]:
-                insights = reservation["notes"]["customer_insights"]
-                special_accommodations = insights.get("special_accommodations", [])
-            
-            # Generate table assignment using LLM
-            table_prompt = create_table_assignment_prompt(
-                customer_name, group_size, special_accommodations, date
-            )
-            
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4.1-mini-2025-04-14",
-                    messages=[{"role": "user", "content": table_prompt}],
-                    temperature=0.1,
-                    max_tokens=10
-                )
-                table_number = int(response.choices[0].message.content.strip())
-                time.sleep(0.5)  # Rate limiting
-                
-            except Exception as e:
-                print(f"Error generating table assignment for {customer_name}: {e}")
-                # Fallback table assignment based on group size
-                if group_size <= 2:
-                    table_number = 3
-                elif group_size <= 4:
-                    table_number = 8
-                elif group_size <= 6:
-                    table_number = 15
-                else:
-                    table_number = 19
-            
             # Extract dishes with exceptions
             dishes = []
             for order in orders:
@@ -103,63 +221,140 @@ def extract_dishes_info(data, client):
                 "party_id": party_id,
                 "customer_name": customer_name,
                 "date": date,
-                "table_number": table_number,
+                "table_number": table_numbers.get(party_id),
                 "group_size": group_size,
-                "total_cost": round(total_cost, 2),
-                "special_accommodations": special_accommodations,
+                "total_cost": order_total(orders),
+                "special_accommodations": get_special_accommodations(reservation),
                 "dishes": dishes
             }
             
-            dishes_data["parties"].append(party)
+            yield party
             party_id += 1
-    
-    return dishes_data
+
+def build_metadata(total_parties, total_revenue, source_file):
+    """Summary block stored alongside the parties in dishes.json."""
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "total_parties": total_parties,
+        "total_revenue": total_revenue,
+        "source_file": source_file
+    }
 
 def main():
     """Main function to extract dishes information."""
     
-    # Check for API key
-    if not os.getenv("OPENAI_API_KEY"):
-        print("Error: OPENAI_API_KEY not found in environment variables.")
-        print("Please create a .env file with your OpenAI API key.")
+    parser = argparse.ArgumentParser(description="Extract dishes and table assignments into dishes.json")
+    parser.add_argument("--input", default=DETAILED_INFO_PATH,
+                        help="Detailed info to read, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--output", default=OUTPUT_PATH,
+                        help="Where to write the parties, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read diners and write parties incrementally to keep memory flat on large datasets")
+    parser.add_argument("--llm-tiebreak", action="store_true",
+                        help="Ask the LLM to choose between equally suitable tables (requires an API key)")
+    add_cache_arguments(parser)
+    add_checkpoint_arguments(parser, "extract_dishes")
+    add_retry_arguments(parser)
+    add_routing_arguments(parser)
+    add_venue_arguments(parser)
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    args = parser.parse_args()
+    configure_cache_from_args(args)
+    configure_retries_from_args(args)
+    configure_routing_from_args(args)
+    configure_venue_from_args(args)
+    
+    if args.dry_run:
+        # Tables are assigned locally; only --llm-tiebreak calls the API
+        client = start_dry_run(args, requests_per_minute=TABLE_ASSIGNMENT_REQUESTS_PER_MINUTE)
+        try:
+            if args.llm_tiebreak:
+                assign_party_tables(iter_records(args.input, "diners"), client)
+        except FileNotFoundError:
+            print(f"Error: {args.input} not found. Please run generate_insights.py first.")
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Error: Invalid JSON in {args.input}: {e}")
+            return
+        print(client.estimate.report())
         return
     
-    # Initialize OpenAI client
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = limiter = journal = None
+    if args.llm_tiebreak:
+        # Check for API key
+        if not os.getenv("OPENAI_API_KEY"):
+            print("Error: OPENAI_API_KEY not found in environment variables.")
+            print("Please create a .env file with your OpenAI API key.")
+            return
+        
+        # Initialize OpenAI client; the SDK is imported here so dry runs never load it
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), **client_options())
+        limiter = RateLimiter(requests_per_minute=TABLE_ASSIGNMENT_REQUESTS_PER_MINUTE, tokens_per_minute=None)
+        journal = open_journal_from_args(args)
+    
+    if args.stream:
+        print(f"Streaming dishes information from {args.input} to {args.output}...")
+        revenue = 0
+        try:
+            # First pass collects the small per-party details the engine needs,
+            # second pass re-reads the diners to write the full party entries
+            table_numbers = assign_party_tables(iter_records(args.input, "diners"), client, limiter, journal)
+            with RecordWriter(args.output, "parties") as writer:
+                for party in iter_parties(iter_records(args.input, "diners"), table_numbers):
+                    writer.write(party)
+                    revenue += party["total_cost"]
+                # JSONL streams hold only the parties; wrapped output keeps the metadata block
+                writer.close(extra={"metadata": build_metadata(writer.count, round(revenue, 2), args.input)})
+        except FileNotFoundError:
+            print(f"Error: {args.input} not found. Please run generate_insights.py first.")
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Error: Invalid JSON in {args.input}: {e}")
+            return
+        print(f"✓ Successfully created {args.output} with {writer.count} parties")
+        print(f"✓ Total revenue: ${revenue:.2f}")
+        if client:
+            print(get_cache().summary())
+        write_metrics_from_args(args)
+        return
     
     # Load detailed info
     try:
-        with open("src/detailed_info.json", "r", encoding="utf-8") as f:
+        with open(args.input, "r", encoding="utf-8") as f:
             data = json.load(f)
     except FileNotFoundError:
-        print("Error: src/detailed_info.json not found. Please run generate_insights.py first.")
+        print(f"Error: {args.input} not found. Please run generate_insights.py first.")
         return
     except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in src/detailed_info.json: {e}")
+        print(f"Error: Invalid JSON in {args.input}: {e}")
         return
     
     print(f"Extracting dishes information for {len(data['diners'])} customers...")
     
     # Extract dishes information
-    dishes_data = extract_dishes_info(data, client)
+    dishes_data = extract_dishes_info(data, client, limiter, journal)
     
     # Add metadata
-    dishes_data["metadata"] = {
-        "generated_at": datetime.now().isoformat(),
-        "total_parties": len(dishes_data["parties"]),
-        "total_revenue": sum(party["total_cost"] for party in dishes_data["parties"]),
-        "source_file": "src/detailed_info.json"
-    }
+    dishes_data["metadata"] = build_metadata(
+        len(dishes_data["parties"]),
+        total_revenue(dishes_data["parties"]),
+        args.input
+    )
     
     # Save dishes data
     try:
-        with open("dishes.json", "w", encoding="utf-8") as f:
+        with open(args.output, "w", encoding="utf-8") as f:
             json.dump(dishes_data, f, indent=2, ensure_ascii=False)
-        print(f"✓ Successfully created dishes.json with {len(dishes_data['parties'])} parties")
+        print(f"✓ Successfully created {args.output} with {len(dishes_data['parties'])} parties")
         print(f"✓ Total revenue: ${dishes_data['metadata']['total_revenue']:.2f}")
+        if client:
+            print(get_cache().summary())
+        write_metrics_from_args(args)
         
     except Exception as e:
         print(f"Error saving file: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
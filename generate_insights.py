@@ -1,200 +1,550 @@
 import json
-from openai import OpenAI
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+import argparse
+import asyncio
 import os
-from datetime import datetime
-import time
+from collections import deque
 from dotenv import load_dotenv
+from rate_limiter import RateLimiter, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+from llm_cache import add_cache_arguments, configure_cache_from_args, get_cache
+from llm_client import chat_completion, chat_completion_async, client_options
+from checkpoint import CheckpointJournal, add_checkpoint_arguments, diner_fingerprint, iter_keyed_diners, open_journal_from_args
+from data_io import RecordWriter, iter_records
+from dry_run import DryRunClient, add_dry_run_arguments, start_dry_run
+from global_budget import BudgetExceededError
+from detailed_format import build_notes
+from local_extractor import INSIGHT_FIELDS, LocalExtraction
+from prompt_context import build_insights_context
+from pipeline_metrics import add_metrics_arguments, get_metrics, write_metrics_from_args
+from retry_policy import AdaptiveConcurrency, add_retry_arguments, configure_retries_from_args
+from model_routing import add_routing_arguments, configure_routing_from_args, escalate, get_router
+from service_scheduler import ScheduledRun, add_schedule_arguments, dashboard_publisher, schedule_from_args
+from venues import add_venue_arguments, configure_venue_from_args
+from structured_output import (
+    StructuredOutputError, build_repair_request, insights_schema, json_schema_format, parse_structured, parse_structured_async
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI client, created on first use so prompts can be rendered without an API key.
+# The SDK is only imported then, which keeps imports of this module and dry runs fast
+client = None
 
-def generate_customer_insights(diner_data: Dict[str, Any]) -> Dict[str, Any]:
+def get_client() -> Any:
     """
-    Generate insights for a customer based on their reviews and emails using OpenAI API
+    Return the shared OpenAI client, initializing it on first use
+    """
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), **client_options())
+    return client
+
+def new_async_client() -> Any:
+    """
+    Return a new async client for one asyncio run (a dry run's stand-in while one is active)
+    """
+    if isinstance(client, DryRunClient):
+        return client.async_client()
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), **client_options())
+
+INSIGHTS_MAX_TOKENS = 500
+INSIGHTS_TEMPERATURE = 0.1
+
+# Default number of in-flight requests in async mode
+DEFAULT_CONCURRENCY = 8
+
+DATASET_PATH = "src/fine-dining-dataset.json"
+OUTPUT_PATH = "detailed_info.json"
+STREAM_OUTPUT_PATH = "detailed_info.jsonl"
+
+INSIGHTS_SYSTEM_PROMPT = "You are a restaurant data analyst. Analyze customer data and provide insights in JSON format only. Be conservative and only include insights you are confident about based on clear evidence in the data."
+
+# Per-field JSON template lines and guidelines, in INSIGHT_FIELDS order; fields the
+# local fast path already settled are left out of the prompt
+INSIGHT_TEMPLATE = {
+    "customer_values": '"customer_values": ["value1", "value2"]',
+    "is_new_customer": '"is_new_customer": true/false',
+    "special_accommodations": '"special_accommodations": ["accommodation1", "accommodation2"]',
+    "taste_preferences": '"taste_preferences": "sweet/spicy/savory/rich/light/null"',
+    "staff_interaction_preferences": '"staff_interaction_preferences": ["chatty", "professional", "knowledgeable", "friendly"]',
+    "personal_interests": '"personal_interests": ["interest1", "interest2", "interest3"]'
+}
+
+INSIGHT_GUIDELINES = {
+    "customer_values": '- customer_values: Extract 2-3 action words/phrases from reviews showing what they value (e.g., "conversation", "not too crowded", "personalized service", "authentic experience", "quick service"). Only include if clearly stated.',
+    "is_new_customer": '- is_new_customer: Determine if this is a new customer based on email tone, references to "returning", "back to", etc. Only set if clear evidence.',
+    "special_accommodations": '- special_accommodations: Any special needs like wheelchair access, birthday celebrations, quiet tables, etc. Only if explicitly mentioned.',
+    "taste_preferences": '- taste_preferences: Determine if they prefer "sweet", "spicy", "savory", "rich", or "light" foods based on what they enjoyed in reviews. Use "null" if unclear.',
+    "staff_interaction_preferences": '- staff_interaction_preferences: What they like about staff interactions based on positive mentions - "chatty", "professional", "knowledgeable", "friendly", "enthusiastic", "attentive". Only include if clearly mentioned in reviews.',
+    "personal_interests": '- personal_interests: Things they mention enjoying or being interested in from their reviews - "art", "science", "desserts", "wine", "sports", "travel", "music", "local culture", "history", etc. Only include if explicitly mentioned.'
+}
+
+def build_insights_prompt(diner_data: Dict[str, Any], fields: Optional[List[str]] = None) -> str:
+    """
+    Build the insight-generation prompt for a customer from their reviews and emails,
+    asking only for the given fields (default: all of them)
     """
     
-    # Prepare the context for the LLM
-    customer_name = diner_data.get("name", "Unknown")
-    reviews = diner_data.get("reviews", [])
-    emails = diner_data.get("emails", [])
-    
-    # Build context string
-    context = f"Customer: {customer_name}\n\n"
-    
-    if reviews:
-        context += "PREVIOUS REVIEWS:\n"
-        for review in reviews:
-            context += f"- {review.get('restaurant_name', '')}: {review.get('content', '')} (Rating: {review.get('rating', 'N/A')})\n"
-        context += "\n"
+    fields = [field for field in INSIGHT_FIELDS if fields is None or field in fields]
+    template = ",\n".join(f"    {INSIGHT_TEMPLATE[field]}" for field in fields)
+    guidelines = "\n".join(INSIGHT_GUIDELINES[field] for field in fields)
     
-    if emails:
-        context += "RECENT EMAILS:\n"
-        for email in emails:
-            context += f"- Subject: {email.get('subject', '')}\n  Content: {email.get('combined_thread', '')}\n"
-        context += "\n"
+    # Reviews and emails, trimmed to the context token budget for heavy guests
+    context = build_insights_context(diner_data)
     
     prompt = f"""Based on the customer data below, provide insights in the following JSON format. ONLY include a field if you are confident based on clear evidence in the data. If you cannot determine something with confidence, leave that array empty or set to null.
 
 {{
-    "customer_values": ["value1", "value2"],
-    "is_new_customer": true/false,
-    "special_accommodations": ["accommodation1", "accommodation2"],
-    "taste_preferences": "sweet/spicy/savory/rich/light/null",
-    "staff_interaction_preferences": ["chatty", "professional", "knowledgeable", "friendly"],
-    "personal_interests": ["interest1", "interest2", "interest3"]
+{template}
 }}
 
 Guidelines:
-- customer_values: Extract 2-3 action words/phrases from reviews showing what they value (e.g., "conversation", "not too crowded", "personalized service", "authentic experience", "quick service"). Only include if clearly stated.
-- is_new_customer: Determine if this is a new customer based on email tone, references to "returning", "back to", etc. Only set if clear evidence.
-- special_accommodations: Any special needs like wheelchair access, birthday celebrations, quiet tables, etc. Only if explicitly mentioned.
-- taste_preferences: Determine if they prefer "sweet", "spicy", "savory", "rich", or "light" foods based on what they enjoyed in reviews. Use "null" if unclear.
-- staff_interaction_preferences: What they like about staff interactions based on positive mentions - "chatty", "professional", "knowledgeable", "friendly", "enthusiastic", "attentive". Only include if clearly mentioned in reviews.
-- personal_interests: Things they mention enjoying or being interested in from their reviews - "art", "science", "desserts", "wine", "sports", "travel", "music", "local culture", "history", etc. Only include if explicitly mentioned.
+{guidelines}
 
 Customer Data:
 {context}
 
 Respond only with valid JSON. Be conservative - only include insights you are confident about based on clear evidence:"""
 
+    return prompt
+
+def build_insights_messages(diner_data: Dict[str, Any], fields: Optional[List[str]] = None) -> List[Dict[str, str]]:
+    """
+    Build the chat messages sent to the model for a customer
+    """
+    return [
+        {"role": "system", "content": INSIGHTS_SYSTEM_PROMPT},
+        {"role": "user", "content": build_insights_prompt(diner_data, fields)}
+    ]
+
+def build_insights_request(diner_data: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Build the full chat completion request for a customer (also used for batch files).
+    The model is chosen by the router from the prompt size, and the response_format
+    makes the API return JSON matching the requested fields
+    """
+    fields = [field for field in INSIGHT_FIELDS if fields is None or field in fields]
+    messages = build_insights_messages(diner_data, fields)
+    return {
+        "model": get_router().route("insights", messages).model,
+        "messages": messages,
+        "max_tokens": INSIGHTS_MAX_TOKENS,
+        "temperature": INSIGHTS_TEMPERATURE,
+        "response_format": json_schema_format("customer_insights", insights_schema(fields))
+    }
+
+def clean_insights(insights: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drop null values and empty arrays from a parsed insights object
+    """
+    cleaned_insights = {}
+    for key, value in insights.items():
+        if key == "taste_preferences":
+            if value and value != "null":
+                cleaned_insights[key] = value
+        elif isinstance(value, list) and value:
+            cleaned_insights[key] = value
+        elif isinstance(value, bool):
+            cleaned_insights[key] = value
+        elif value and not isinstance(value, list):
+            cleaned_insights[key] = value
+    
+    return cleaned_insights
+
+def unparseable_insights(customer_name: str) -> None:
+    """
+    Report an answer that could not be parsed; the caller falls back to empty insights
+    """
+    print(f"Warning: Could not parse JSON for {customer_name}. Returning empty insights.")
+    get_metrics().record_fallback("insights", "unparseable_response")
+    return None
+
+def parse_insights_response(insights_text: str, customer_name: str,
+                            repair: Optional[Callable[[str], str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Parse the model's JSON answer, dropping null values and empty arrays. Answers
+    wrapped in code fences or extra text are parsed leniently, and repair (if given)
+    is asked to fix anything else. Returns None if the answer stays unusable.
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini-2025-04-14",
-            messages=[
-                {"role": "system", "content": "You are a restaurant data analyst. Analyze customer data and provide insights in JSON format only. Be conservative and only include insights you are confident about based on clear evidence in the data."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.1
-        )
-        
-        insights_text = response.choices[0].message.content.strip()
-        
-        # Try to parse the JSON response
-        try:
-            insights = json.loads(insights_text)
-            
-            # Clean up null values and empty arrays
-            cleaned_insights = {}
-            for key, value in insights.items():
-                if key == "taste_preferences":
-                    if value and value != "null":
-                        cleaned_insights[key] = value
-                elif isinstance(value, list) and value:
-                    cleaned_insights[key] = value
-                elif isinstance(value, bool):
-                    cleaned_insights[key] = value
-                elif value and not isinstance(value, list):
-                    cleaned_insights[key] = value
-            
-            return cleaned_insights
-        except json.JSONDecodeError:
-            # If JSON parsing fails, return empty insights
-            print(f"Warning: Could not parse JSON for {customer_name}. Returning empty insights.")
-            return {}
+        return clean_insights(parse_structured(insights_text, "insights", repair=repair))
+    except StructuredOutputError:
+        return unparseable_insights(customer_name)
+
+async def parse_insights_response_async(insights_text: str, customer_name: str,
+                                        repair: Callable[[str], Any]) -> Optional[Dict[str, Any]]:
+    """
+    Async variant of parse_insights_response() with an async repair call
+    """
+    try:
+        return clean_insights(await parse_structured_async(insights_text, "insights", repair=repair))
+    except StructuredOutputError:
+        return unparseable_insights(customer_name)
+
+def generate_customer_insights(diner_data: Dict[str, Any], limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """
+    Generate insights for a customer based on their reviews and emails using OpenAI API
+    """
+    insights = request_customer_insights(diner_data, limiter)
+    return insights if insights is not None else {}
+
+def merge_local_insights(extraction: Optional[LocalExtraction], insights: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Combine the LLM's answer with the fields the fast path settled locally
+    """
+    if extraction is None or insights is None:
+        return insights
+    return extraction.merge(insights)
+
+def request_customer_insights(diner_data: Dict[str, Any], limiter: Optional[RateLimiter] = None,
+                              fast_path: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Like generate_customer_insights(), but returns None when the call or parsing failed
+    so callers can tell a failure apart from a customer with no confident insights.
+    With fast_path, fields the local rules settle are not asked of the LLM, and
+    diners the rules settle completely are answered without a call
+    """
+    
+    customer_name = diner_data.get("name", "Unknown")
+    extraction = LocalExtraction(diner_data) if fast_path else None
+    if extraction and extraction.skips_llm:
+        get_metrics().record_avoided("insights")
+        return extraction.insights()
+    fields = extraction.unresolved if extraction else None
+    
+    request = build_insights_request(diner_data, fields)
+    
+    def repair(broken_text):
+        # Only the broken answer is sent back, not the customer's whole context, to the escalation tier if there is one
+        repair_request = build_repair_request(escalate("insights", request) or request, broken_text)
+        return chat_completion(get_client(), limiter, "insights", **repair_request)
+    
+    try:
+        insights_text = chat_completion(get_client(), limiter, "insights", **request)
+        return merge_local_insights(extraction, parse_insights_response(insights_text, customer_name, repair))
             
+    except BudgetExceededError:
+        raise
     except Exception as e:
+        # Transient errors were already retried with backoff by chat_completion()
         print(f"Error generating insights for {customer_name}: {str(e)}")
-        # Add a small delay to avoid rate limiting
-        time.sleep(1)
-        return {}
+        get_metrics().record_fallback("insights", "api_error")
+        return None
 
-def process_reservations():
+async def request_customer_insights_async(diner_data: Dict[str, Any], async_client: Any, limiter: RateLimiter,
+                                          window_control: AdaptiveConcurrency, fast_path: bool = True) -> Optional[Dict[str, Any]]:
     """
-    Process the fine dining dataset and add insights to each reservation
+    Async variant of request_customer_insights() for the concurrent mode
     """
     
+    customer_name = diner_data.get("name", "Unknown")
+    extraction = LocalExtraction(diner_data) if fast_path else None
+    if extraction and extraction.skips_llm:
+        get_metrics().record_avoided("insights")
+        return extraction.insights()
+    fields = extraction.unresolved if extraction else None
+    
+    request = build_insights_request(diner_data, fields)
+    
+    async def repair(broken_text):
+        repair_request = build_repair_request(escalate("insights", request) or request, broken_text)
+        return await chat_completion_async(async_client, limiter, "insights", window_control, **repair_request)
+    
+    try:
+        insights_text = await chat_completion_async(async_client, limiter, "insights", window_control, **request)
+        return merge_local_insights(
+            extraction, await parse_insights_response_async(insights_text, customer_name, repair)
+        )
+    
+    except BudgetExceededError:
+        raise
+    except Exception as e:
+        print(f"Error generating insights for {customer_name}: {str(e)}")
+        get_metrics().record_fallback("insights", "api_error")
+        return None
+
+def build_enhanced_diner(diner: Dict[str, Any], customer_insights: Dict[str, Any], normalized: bool = False) -> Dict[str, Any]:
+    """
+    Combine a diner's original data with their insights. By default every
+    reservation is annotated with the notes; with normalized=True they are
+    stored once at the diner level (see detailed_format.py)
+    """
+    
+    # Insights are per diner, so the summary and timestamp are shared by all reservations
+    notes = build_notes(customer_insights)
+    
+    # Create enhanced diner data
+    enhanced_diner = {
+        "name": diner.get("name"),
+        "reviews": diner.get("reviews", []),
+        "reservations": [],
+        "emails": diner.get("emails", [])
+    }
+    if normalized:
+        enhanced_diner["notes"] = notes
+    
+    # Add insights to each reservation
+    for reservation in diner.get("reservations", []):
+        enhanced_reservation = {
+            "date": reservation.get("date"),
+            "number_of_people": reservation.get("number_of_people"),
+            "orders": reservation.get("orders", [])
+        }
+        if not normalized:
+            enhanced_reservation["notes"] = notes
+        enhanced_diner["reservations"].append(enhanced_reservation)
+
+    return enhanced_diner
+
+def lookup_insights(key: str, diner: Dict[str, Any], journal: Optional[CheckpointJournal],
+                    fast_path: bool = True) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Return the diner's fingerprint and their journaled insights, if their inputs are unchanged
+    """
+    # Fast-path and full-LLM insights can differ, so a journal entry only counts for the same mode
+    models = get_router().signature("insights")
+    fp = diner_fingerprint(diner, models, "fast_path") if fast_path else diner_fingerprint(diner, models)
+    return fp, journal.lookup(key, fp) if journal else None
+
+def record_insights(key: str, fp: str, insights: Optional[Dict[str, Any]], journal: Optional[CheckpointJournal]):
+    """
+    Journal a diner's insights; failed diners are not journaled so the next run retries them
+    """
+    if journal and insights is not None:
+        journal.record(key, fp, insights)
+
+def enhance_diners(diners: Iterable[Dict[str, Any]], sink: Callable[[Dict[str, Any]], None],
+                   use_async: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                   limiter: Optional[RateLimiter] = None, journal: Optional[CheckpointJournal] = None,
+                   total_diners: Optional[int] = None, normalized: bool = False, fast_path: bool = True,
+                   on_failure: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    """
+    Generate insights for every diner and pass the enhanced diners to sink in input order.
+    diners may be any iterable (including a stream), and only a bounded window of
+    diners is held in memory at once. fast_path=False sends every diner to the LLM
+    without the local pre-extraction. Diners whose insight call failed are passed
+    on with empty insights and also given to on_failure. Returns the number of
+    diners processed.
+    """
+    
+    keys = []
+    
+    def keyed_diners():
+        for key, diner in iter_keyed_diners(diners):
+            keys.append(key)
+            yield key, diner
+    
+    if use_async:
+        print(f"Running in async mode with up to {concurrency} concurrent requests")
+        asyncio.run(enhance_diners_async(keyed_diners(), sink, concurrency, limiter, journal, total_diners, normalized,
+                                         fast_path, on_failure))
+    else:
+        for idx, (key, diner) in enumerate(keyed_diners(), 1):
+            progress = f"{idx}/{total_diners}" if total_diners else str(idx)
+            fp, customer_insights = lookup_insights(key, diner, journal, fast_path)
+            
+            if customer_insights is not None:
+                print(f"Skipping diner {progress}: {diner.get('name', 'Unknown')} (unchanged since last run)")
+            else:
+                print(f"Processing diner {progress}: {diner.get('name', 'Unknown')}")
+                
+                # Generate insights for this customer (the limiter paces API calls)
+                customer_insights = request_customer_insights(diner, limiter, fast_path)
+                record_insights(key, fp, customer_insights, journal)
+                if customer_insights is None and on_failure:
+                    on_failure(diner)
+            
+            sink(build_enhanced_diner(diner, customer_insights or {}, normalized))
+    
+    if journal:
+        journal.compact(keep_keys=keys)
+        print(journal.summary())
+    
+    return len(keys)
+
+async def enhance_diners_async(keyed_diners: Iterable[Tuple[str, Dict[str, Any]]], sink: Callable[[Dict[str, Any]], None],
+                               concurrency: int, limiter: RateLimiter, journal: Optional[CheckpointJournal],
+                               total_diners: Optional[int] = None, normalized: bool = False, fast_path: bool = True,
+                               on_failure: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """
+    Concurrent variant of enhance_diners(). Up to `concurrency` requests are in flight
+    (fewer while the API is pushing back), and finished diners are handed to sink strictly in input order.
+    """
+    
+    async_client = new_async_client()
+    # --concurrency is the ceiling; the window adapts to 429s and server errors below it
+    window_control = AdaptiveConcurrency(concurrency)
+    completed = 0
+    
+    async def run_one(key, diner):
+        nonlocal completed
+        fp, customer_insights = lookup_insights(key, diner, journal, fast_path)
+        if customer_insights is None:
+            customer_insights = await request_customer_insights_async(diner, async_client, limiter, window_control, fast_path)
+            record_insights(key, fp, customer_insights, journal)
+            if customer_insights is None and on_failure:
+                on_failure(diner)
+        
+        completed += 1
+        progress = f"{completed}/{total_diners}" if total_diners else str(completed)
+        print(f"Processed diner {progress}: {diner.get('name', 'Unknown')}")
+        return build_enhanced_diner(diner, customer_insights or {}, normalized)
+    
+    # Keep a bounded window of tasks ahead of the oldest unfinished diner so
+    # streamed input never piles up in memory while preserving output order
+    window = deque()
+    window_size = max(1, concurrency) * 4
+    try:
+        for key, diner in keyed_diners:
+            window.append(asyncio.ensure_future(run_one(key, diner)))
+            if len(window) >= window_size:
+                sink(await window.popleft())
+        while window:
+            sink(await window.popleft())
+    finally:
+        for task in window:
+            task.cancel()
+        await async_client.close()
+        print(window_control.summary())
+
+def process_reservations(use_async: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                         requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+                         tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+                         journal: Optional[CheckpointJournal] = None,
+                         input_path: str = DATASET_PATH, output_path: str = OUTPUT_PATH,
+                         stream: bool = False, normalized: bool = False, fast_path: bool = True,
+                         schedule: Optional[Any] = None, publish_dir: Optional[str] = None):
+    """
+    Process the fine dining dataset and add insights to each reservation.
+    With a ServiceSchedule, the soonest reservations are processed first and,
+    with publish_dir, dates inside the horizon are published there as they complete.
+    """
+    
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    
+    if stream:
+        # Read diners incrementally and write each enhanced diner as soon as it is ready
+        try:
+            with RecordWriter(output_path, "diners") as writer:
+                total_diners = enhance_diners(
+                    iter_records(input_path, "diners"), writer.write,
+                    use_async=use_async, concurrency=concurrency, limiter=limiter, journal=journal,
+                    normalized=normalized, fast_path=fast_path
+                )
+        except FileNotFoundError:
+            print(f"Error: {input_path} not found")
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Error: Invalid data in {input_path}: {e}")
+            return
+        
+        print(f"\nEnhanced data streamed to '{output_path}'")
+        print(f"Processed {total_diners} diners with their reservations")
+        return
+    
     # Read the original data
     try:
-        with open('src/fine-dining-dataset.json', 'r', encoding='utf-8') as file:
+        with open(input_path, 'r', encoding='utf-8') as file:
             data = json.load(file)
     except FileNotFoundError:
-        print("Error: fine-dining-dataset.json not found in src/ directory")
+        print(f"Error: {input_path} not found")
         return
     except json.JSONDecodeError:
-        print("Error: Invalid JSON in fine-dining-dataset.json")
+        print(f"Error: Invalid JSON in {input_path}")
         return
     
     enhanced_data = {"diners": []}
     
-    total_diners = len(data.get("diners", []))
+    diners = data.get("diners", [])
+    total_diners = len(diners)
     
-    for idx, diner in enumerate(data.get("diners", []), 1):
-        print(f"Processing diner {idx}/{total_diners}: {diner.get('name', 'Unknown')}")
-        
-        # Generate insights for this customer
-        customer_insights = generate_customer_insights(diner)
-        
-        # Add a small delay to respect API rate limits
-        time.sleep(0.5)
-        
-        # Create enhanced diner data
-        enhanced_diner = {
-            "name": diner.get("name"),
-            "reviews": diner.get("reviews", []),
-            "reservations": [],
-            "emails": diner.get("emails", [])
-        }
-        
-        # Add insights to each reservation
-        for reservation in diner.get("reservations", []):
-            # Build summary from insights
-            summary_parts = []
-            
-            if customer_insights.get("customer_values"):
-                summary_parts.append(f"Values: {', '.join(customer_insights['customer_values'])}")
-            
-            if "is_new_customer" in customer_insights:
-                summary_parts.append("New customer" if customer_insights["is_new_customer"] else "Returning customer")
-            
-            if customer_insights.get("special_accommodations"):
-                summary_parts.append(f"Special needs: {', '.join(customer_insights['special_accommodations'])}")
-            
-            if customer_insights.get("taste_preferences"):
-                summary_parts.append(f"Taste preference: {customer_insights['taste_preferences']}")
-            
-            if customer_insights.get("staff_interaction_preferences"):
-                summary_parts.append(f"Likes staff who are: {', '.join(customer_insights['staff_interaction_preferences'])}")
-            
-            if customer_insights.get("personal_interests"):
-                summary_parts.append(f"Personal interests: {', '.join(customer_insights['personal_interests'])}")
-            
-            summary = ". ".join(summary_parts) if summary_parts else "No specific insights available"
-            
-            enhanced_reservation = {
-                "date": reservation.get("date"),
-                "number_of_people": reservation.get("number_of_people"),
-                "orders": reservation.get("orders", []),
-                "notes": {
-                    "customer_insights": customer_insights,
-                    "generated_at": datetime.now().isoformat(),
-                    "summary": summary
-                }
-            }
-            enhanced_diner["reservations"].append(enhanced_reservation)
-        
-        enhanced_data["diners"].append(enhanced_diner)
+    run = ScheduledRun(diners, schedule, dashboard_publisher(publish_dir) if publish_dir else None) if schedule else None
+    enhance_diners(
+        run.diners if run else diners, run.sink if run else enhanced_data["diners"].append,
+        use_async=use_async, concurrency=concurrency, limiter=limiter, journal=journal,
+        total_diners=total_diners, normalized=normalized, fast_path=fast_path
+    )
+    if run:
+        enhanced_data["diners"] = run.results()
     
     # Save the enhanced data
     try:
-        with open('detailed_info.json', 'w', encoding='utf-8') as file:
+        with open(output_path, 'w', encoding='utf-8') as file:
             json.dump(enhanced_data, file, indent=2, ensure_ascii=False)
-        print(f"\nEnhanced data saved to 'detailed_info.json'")
+        print(f"\nEnhanced data saved to '{output_path}'")
         print(f"Processed {total_diners} diners with their reservations")
     except Exception as e:
         print(f"Error saving enhanced data: {str(e)}")
 
+def dry_run_insights(args):
+    """
+    Render every insights request of the input without calling the API and print the estimate
+    """
+    global client
+    client = start_dry_run(args, args.concurrency if args.use_async else 1, args.rpm, args.tpm)
+    try:
+        enhance_diners(iter_records(args.input, "diners"), lambda diner: None,
+                       use_async=args.use_async, concurrency=args.concurrency,
+                       normalized=args.normalized, fast_path=args.fast_path)
+    except FileNotFoundError:
+        print(f"Error: {args.input} not found")
+        return
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Invalid data in {args.input}: {e}")
+        return
+    print(client.estimate.report())
+
 def main():
     """
     Main function to run the insight generation process
     """
+    parser = argparse.ArgumentParser(description="Generate customer insights for the fine dining dataset")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Generate insights concurrently with the async OpenAI client")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum in-flight requests in async mode (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help=f"Requests-per-minute limit (default: {DEFAULT_REQUESTS_PER_MINUTE})")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                        help=f"Tokens-per-minute limit (default: {DEFAULT_TOKENS_PER_MINUTE})")
+    parser.add_argument("--input", default=DATASET_PATH,
+                        help="Dataset to read, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--output", default=None,
+                        help=f"Where to write the enhanced data (default: {OUTPUT_PATH}, or {STREAM_OUTPUT_PATH} with --stream)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read and write diners incrementally to keep memory flat on large datasets")
+    parser.add_argument("--normalized", action="store_true",
+                        help="Store insights once per diner instead of copying them into every reservation")
+    parser.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+                        help="Send every field of every diner to the LLM instead of settling clear-cut ones locally")
+    add_cache_arguments(parser)
+    add_checkpoint_arguments(parser, "generate_insights")
+    add_retry_arguments(parser)
+    add_routing_arguments(parser)
+    add_venue_arguments(parser)
+    add_schedule_arguments(parser)
+    parser.add_argument("--publish-dir", default=None,
+                        help="With --schedule, publish dashboard shards of finished dates in the horizon here (e.g. public/data)")
+    add_metrics_arguments(parser)
+    add_dry_run_arguments(parser)
+    args = parser.parse_args()
+    configure_cache_from_args(args)
+    configure_retries_from_args(args)
+    configure_routing_from_args(args)
+    configure_venue_from_args(args)
+    if args.schedule and args.stream:
+        parser.error("--schedule orders the whole dataset and cannot be combined with --stream")
+    
     print("Fine Dining Dataset Enhancement Script")
     print("=====================================")
     
+    if args.dry_run:
+        dry_run_insights(args)
+        return
+    
     # Check if OpenAI API key is set
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OpenAI API key not found.")
@@ -205,7 +555,22 @@ def main():
     print("Starting to process reservations and generate insights...")
     print("This may take a few minutes due to API rate limiting...")
     print("Using conservative analysis - only confident insights will be included...")
-    process_reservations()
+    process_reservations(
+        use_async=args.use_async,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        journal=open_journal_from_args(args),
+        input_path=args.input,
+        output_path=args.output or (STREAM_OUTPUT_PATH if args.stream else OUTPUT_PATH),
+        stream=args.stream,
+        normalized=args.normalized,
+        fast_path=args.fast_path,
+        schedule=schedule_from_args(args),
+        publish_dir=args.publish_dir
+    )
+    print(get_cache().summary())
+    write_metrics_from_args(args)
     print("Process completed!")
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Global API Budget
+Requests-per-minute, tokens-per-minute and spend limits shared by every
+process of a run. The per-script RateLimiter only knows about its own calls;
+when several venues are processed in parallel worker processes, their calls
+are drawn from this one budget as well, so together they stay within the
+account's limits. The buckets and the running spend live in shared memory
+and are guarded by a multiprocessing lock.
+
+The spend limit (--max-cost-usd) is enforced before a call is sent: each call
+reserves its worst-case cost (its prompt plus max_tokens of output at the
+model's price). A call that only fits once calls still in flight in any
+process have settled waits for them; one that would take the spend itself
+past the limit is refused. When a call returns, its reservation is replaced
+by the cost of its actual usage. However many calls run at once, the spend can only pass the limit by
+as much as the local prompt token estimate (rate_limiter.estimate_tokens)
+falls short of the real count.
+
+The budget is created in the parent process and handed to the workers through
+the process pool's initializer (see multi_venue.py); single-process runs have
+no global budget unless one is configured.
+"""
+
+import asyncio
+import multiprocessing
+import time
+
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE
+
+# Positions in the shared state array
+_REQUESTS = 0
+_TOKENS = 1
+_LAST_REFILL = 2
+_SPENT = 3
+_RESERVED = 4
+
+# How often a call waiting for in-flight calls to settle checks the spend again
+SETTLE_POLL_SECONDS = 0.05
+
+
+class BudgetExceededError(RuntimeError):
+    """The run's spend limit is used up; no further API calls are made."""
+
+
+class GlobalBudget:
+    """Token buckets and a spend counter in shared memory, usable from several processes."""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_cost_usd=None, context=None):
+        context = context or multiprocessing.get_context()
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_cost_usd = max_cost_usd
+        self._lock = context.Lock()
+        # Buckets start full, like RateLimiter; time.monotonic() is system-wide on the supported platforms
+        self._state = context.Array("d", [float(requests_per_minute or 0), float(tokens_per_minute or 0),
+                                          time.monotonic(), 0.0, 0.0], lock=False)
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = max(0.0, now - self._state[_LAST_REFILL])
+        self._state[_LAST_REFILL] = now
+        if self.requests_per_minute:
+            self._state[_REQUESTS] = min(float(self.requests_per_minute),
+                                         self._state[_REQUESTS] + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self._state[_TOKENS] = min(float(self.tokens_per_minute),
+                                       self._state[_TOKENS] + elapsed * self.tokens_per_minute / 60.0)
+
+    def _reserve(self, tokens, cost):
+        """
+        Reserve capacity and the worst-case cost for one request and return how
+        long the caller must wait, or None if it must wait for calls in flight.
+        """
+        with self._lock:
+            spent = self._state[_SPENT]
+            if self.max_cost_usd is not None:
+                if spent >= self.max_cost_usd or spent + cost > self.max_cost_usd:
+                    raise BudgetExceededError(
+                        f"spend limit of ${self.max_cost_usd:.2f} reached (${spent:.4f} spent, ${cost:.4f} needed)"
+                    )
+                if spent + self._state[_RESERVED] + cost > self.max_cost_usd:
+                    return None
+            self._state[_RESERVED] += cost
+            self._refill()
+            wait = 0.0
+            if self.requests_per_minute:
+                self._state[_REQUESTS] -= 1
+                if self._state[_REQUESTS] < 0:
+                    wait = max(wait, -self._state[_REQUESTS] * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                self._state[_TOKENS] -= min(tokens, self.tokens_per_minute)
+                if self._state[_TOKENS] < 0:
+                    wait = max(wait, -self._state[_TOKENS] * 60.0 / self.tokens_per_minute)
+            return wait
+
+    def acquire(self, tokens=0, cost=0.0):
+        """
+        Block until a request of the given token size may be sent, reserving
+        its worst-case cost; raises BudgetExceededError. Every acquire() must
+        be followed by record_spend() or release() with the same cost.
+        """
+        wait = self._reserve(tokens, cost)
+        while wait is None:
+            time.sleep(SETTLE_POLL_SECONDS)
+            wait = self._reserve(tokens, cost)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            except BaseException:
+                self.release(cost)
+                raise
+
+    async def acquire_async(self, tokens=0, cost=0.0):
+        """Wait (without blocking the event loop) until a request may be sent."""
+        wait = self._reserve(tokens, cost)
+        while wait is None:
+            await asyncio.sleep(SETTLE_POLL_SECONDS)
+            wait = self._reserve(tokens, cost)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                self.release(cost)
+                raise
+
+    def release(self, reserved):
+        """Give back a reservation whose request was not sent or failed."""
+        with self._lock:
+            self._state[_RESERVED] = max(0.0, self._state[_RESERVED] - reserved)
+
+    def record_spend(self, cost, reserved=0.0):
+        """Replace a request's reservation with the cost of its actual usage."""
+        with self._lock:
+            self._state[_RESERVED] = max(0.0, self._state[_RESERVED] - reserved)
+            self._state[_SPENT] += cost
+
+    @property
+    def spent(self):
+        with self._lock:
+            return self._state[_SPENT]
+
+
+_budget = None
+
+
+def configure_global_budget(budget=None):
+    """Set the budget every chat completion in this process draws from (None removes it)."""
+    global _budget
+    _budget = budget
+    return _budget
+
+
+def get_global_budget():
+    return _budget
+
+
+def add_budget_arguments(parser):
+    """Register the shared global budget flags on an argparse parser."""
+    group = parser.add_argument_group("global API budget")
+    group.add_argument("--global-rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                       help="Requests per minute across all worker processes (default: %(default)s)")
+    group.add_argument("--global-tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                       help="Tokens per minute across all worker processes (default: %(default)s)")
+    group.add_argument("--max-cost-usd", type=float, default=None,
+                       help="Spend limit in USD; a call is only sent if its worst-case cost still fits")
+
+
+def budget_from_args(args, context=None):
+    """GlobalBudget from add_budget_arguments() flags."""
+    return GlobalBudget(args.global_rpm, args.global_tpm, args.max_cost_usd, context)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Persistent LLM Response Cache
+Content-addressed SQLite cache for chat completions, shared by the insight,
+justification and dish extraction scripts. Entries are keyed by a hash of the
+full request (model, messages, temperature, max_tokens, ...) so re-running the
+pipeline on unchanged data is answered locally without any API calls.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = ".llm_cache.sqlite3"
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_SIZE_MB = 200
+
+# Cache modes: read and write, ignore completely, skip reads but store fresh answers,
+# or read without storing or evicting anything (dry runs)
+CACHE_MODES = ("use", "bypass", "refresh", "readonly")
+
+
+def cache_key(request):
+    """Hash a chat completion request into a stable cache key."""
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed cache of chat completion responses with age/size eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, mode="use", max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {', '.join(CACHE_MODES)}")
+
+        self.path = path
+        self.mode = mode
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if mode == "readonly":
+            self._conn = self._open_readonly(path)
+        elif mode != "bypass":
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )"""
+            )
+            self._conn.commit()
+            self.evict()
+
+    @staticmethod
+    def _open_readonly(path):
+        """Connection that cannot modify the cache, or None when there is no cache to read."""
+        if not os.path.exists(path):
+            return None
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'responses'").fetchone() is None:
+            conn.close()
+            return None
+        return conn
+
+    def get(self, request):
+        """Return the cached response text for a request, or None on a miss."""
+        if self.mode not in ("use", "readonly") or self._conn is None:
+            return None
+
+        key = cache_key(request)
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if self.mode == "use":
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            return row[0]
+
+    def put(self, request, content):
+        """Store the response text for a request."""
+        if self._conn is None or self.mode == "readonly":
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(request), request.get("model"), content, len(content.encode("utf-8")), now, now)
+            )
+            self._conn.commit()
+            self.writes += 1
+
+    def evict(self):
+        """Drop entries older than max_age_days, then least recently used ones above max_size_mb."""
+        if self._conn is None:
+            return 0
+
+        removed = 0
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+
+            if self.max_size_mb:
+                budget = self.max_size_mb * 1024 * 1024
+                used = 0
+                stale_keys = []
+                for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used DESC"):
+                    used += size
+                    if used > budget:
+                        stale_keys.append((key,))
+                if stale_keys:
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+                    removed += len(stale_keys)
+
+            self._conn.commit()
+
+        self.evicted += removed
+        return removed
+
+    def clear(self):
+        """Remove every cached response."""
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        entries = 0
+        size = 0
+        if self._conn is not None:
+            with self._lock:
+                entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evicted": self.evicted,
+            "entries": entries,
+            "size_bytes": size
+        }
+
+    def summary(self):
+        """One-line human readable summary of the cache counters."""
+        stats = self.stats()
+        if stats["mode"] == "bypass":
+            return "LLM cache: bypassed"
+        return (f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['writes']} writes, "
+                f"{stats['entries']} entries ({stats['size_bytes'] / 1024:.1f} KB)")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_cache = None
+
+
+def configure_cache(path=None, mode="use", max_age_days=DEFAULT_MAX_AGE_DAYS, max_size_mb=DEFAULT_MAX_SIZE_MB):
+    """Replace the process-wide cache used by llm_client.chat_completion()."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = ResponseCache(
+        path or os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+        mode=mode,
+        max_age_days=max_age_days,
+        max_size_mb=max_size_mb
+    )
+    return _cache
+
+
+def get_cache():
+    """Return the process-wide cache, opening the default one on first use."""
+    if _cache is None:
+        configure_cache()
+    return _cache
+
+
+def add_cache_arguments(parser):
+    """Register the shared cache command-line flags on an argparse parser."""
+    group = parser.add_argument_group("LLM response cache")
+    group.add_argument("--cache-path", default=None,
+                       help=f"SQLite cache file (default: $LLM_CACHE_PATH or {DEFAULT_CACHE_PATH})")
+    group.add_argument("--no-cache", action="store_true",
+                       help="Bypass the response cache entirely")
+    group.add_argument("--refresh-cache", action="store_true",
+                       help="Ignore cached responses but store the fresh ones")
+    group.add_argument("--cache-max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                       help=f"Evict entries older than this (default: {DEFAULT_MAX_AGE_DAYS})")
+    group.add_argument("--cache-max-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB,
+                       help=f"Evict least recently used entries above this size (default: {DEFAULT_MAX_SIZE_MB})")
+
+
+def configure_cache_from_args(args):
+    """
+    Configure the process-wide cache from the flags added by add_cache_arguments().
+    Dry runs (see dry_run.py) only read the cache, and only where a real run would.
+    """
+    if args.no_cache:
+        mode = "bypass"
+    elif args.refresh_cache:
+        mode = "bypass" if getattr(args, "dry_run", False) else "refresh"
+    else:
+        mode = "readonly" if getattr(args, "dry_run", False) else "use"
+    return configure_cache(args.cache_path, mode, args.cache_max_age_days, args.cache_max_size_mb)
+
+
+def main():
+    """Show cache statistics, evict stale entries, or clear the cache."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or maintain the LLM response cache")
+    parser.add_argument("action", choices=["stats", "evict", "clear"])
+    parser.add_argument("--cache-path", default=None)
+    parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+    parser.add_argument("--max-size-mb", type=float, default=DEFAULT_MAX_SIZE_MB)
+    args = parser.parse_args()
+
+    cache = configure_cache(args.cache_path, "use", args.max_age_days, args.max_size_mb)
+    if args.action == "clear":
+        cache.clear()
+        print(f"✓ Cleared {cache.path}")
+    elif args.action == "evict":
+        print(f"✓ Evicted {cache.evicted} stale entries from {cache.path}")
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
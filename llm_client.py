@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Shared Chat Completion Calls
+Single entry point the pipeline scripts use to talk to the OpenAI chat
+completions API. Responses are served from the persistent response cache when
+possible, and the rate limiter is only consulted for real API calls. Transient
+failures are retried according to retry_policy.py, concurrent callers can share
+an AdaptiveConcurrency window, and every attempt is recorded in the pipeline
+metrics under the caller's stage and the model's routing tier. When a global
+budget is configured (see global_budget.py), every API call also draws from it:
+the call's worst-case cost is reserved before it is sent and replaced by the
+cost of its actual usage afterwards.
+"""
+
+import asyncio
+import time
+
+from global_budget import get_global_budget
+from llm_cache import get_cache
+from model_routing import get_router
+from pipeline_metrics import estimate_cost, get_metrics
+from rate_limiter import estimate_tokens
+from retry_policy import REQUEST_TIMEOUT, get_retry_policy, is_overload
+
+
+def client_options():
+    """Keyword arguments for OpenAI()/AsyncOpenAI(): retries are handled here, not by the SDK."""
+    return {"max_retries": 0, "timeout": REQUEST_TIMEOUT}
+
+
+def _handle_failure(stage, error, retries, concurrency, started):
+    """Record a failed attempt; return the backoff delay, or None if the error should be raised."""
+    if concurrency:
+        concurrency.release(started, "overload" if is_overload(error) else "error")
+    get_metrics().record_error(stage, error)
+
+    delay = get_retry_policy().next_delay(retries, error)
+    if delay is not None:
+        get_metrics().record_retry(stage)
+    return delay
+
+
+def _worst_case_cost(request):
+    """Cost of a request if its answer uses all of max_tokens, for the global budget's reservation."""
+    return estimate_cost(request.get("model"), estimate_tokens(request["messages"]), request.get("max_tokens") or 0)
+
+
+def _release(budget, reserved):
+    if budget:
+        budget.release(reserved)
+
+
+def _record_spend(model, usage, reserved):
+    budget = get_global_budget()
+    if budget:
+        # Without usage figures the reservation is kept as the spend
+        cost = reserved if usage is None else estimate_cost(model, getattr(usage, "prompt_tokens", 0) or 0,
+                                                            getattr(usage, "completion_tokens", 0) or 0)
+        budget.record_spend(cost, reserved)
+
+
+def _response_text(response):
+    """
+    Stripped text of a response. A message without content (a refusal, or
+    output cut off by a content filter) gives "", which callers already treat
+    as an unusable answer; it is not cached, so a later run asks again.
+    """
+    return (response.choices[0].message.content or "").strip()
+
+
+def chat_completion(client, limiter=None, stage=None, concurrency=None, **request):
+    """Return the stripped response text for a chat completion request."""
+
+    metrics = get_metrics()
+    cache = get_cache()
+    cached = cache.get(request)
+    if cached is not None:
+        metrics.record_cache_hit(stage)
+        return cached
+
+    get_retry_policy().budget.record_call()
+    tokens = estimate_tokens(request["messages"], request.get("max_tokens"))
+    budget = get_global_budget()
+    reserved = _worst_case_cost(request) if budget else 0.0
+    retries = 0
+    while True:
+        if budget:
+            budget.acquire(tokens, reserved)
+        try:
+            if limiter:
+                limiter.acquire(tokens)
+            started = concurrency.acquire() if concurrency else None
+        except BaseException:
+            _release(budget, reserved)
+            raise
+
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(**request)
+        except BaseException as e:
+            _release(budget, reserved)
+            if not isinstance(e, Exception):
+                raise
+            delay = _handle_failure(stage, e, retries, concurrency, started)
+            if delay is None:
+                raise
+            retries += 1
+            time.sleep(delay)
+            continue
+
+        if concurrency:
+            concurrency.release(started, "success")
+        break
+
+    metrics.record_call(stage, request.get("model"), time.perf_counter() - start, getattr(response, "usage", None),
+                        get_router().tier_of(request.get("model")))
+    _record_spend(request.get("model"), getattr(response, "usage", None), reserved)
+    content = _response_text(response)
+    if content:
+        cache.put(request, content)
+    return content
+
+
+async def chat_completion_async(async_client, limiter=None, stage=None, concurrency=None, **request):
+    """Async variant of chat_completion() for use with AsyncOpenAI."""
+
+    metrics = get_metrics()
+    cache = get_cache()
+    cached = cache.get(request)
+    if cached is not None:
+        metrics.record_cache_hit(stage)
+        return cached
+
+    get_retry_policy().budget.record_call()
+    tokens = estimate_tokens(request["messages"], request.get("max_tokens"))
+    budget = get_global_budget()
+    reserved = _worst_case_cost(request) if budget else 0.0
+    retries = 0
+    while True:
+        if budget:
+            await budget.acquire_async(tokens, reserved)
+        try:
+            if limiter:
+                await limiter.acquire_async(tokens)
+            started = await concurrency.acquire_async() if concurrency else None
+        except BaseException:
+            _release(budget, reserved)
+            raise
+
+        start = time.perf_counter()
+        try:
+            response = await async_client.chat.completions.create(**request)
+        except asyncio.CancelledError:
+            _release(budget, reserved)
+            if concurrency:
+                concurrency.release(started, "error")
+            raise
+        except Exception as e:
+            _release(budget, reserved)
+            delay = _handle_failure(stage, e, retries, concurrency, started)
+            if delay is None:
+                raise
+            retries += 1
+            # The concurrency slot is already released, so backing off does not hold up other calls
+            await asyncio.sleep(delay)
+            continue
+
+        if concurrency:
+            concurrency.release(started, "success")
+        break
+
+    metrics.record_call(stage, request.get("model"), time.perf_counter() - start, getattr(response, "usage", None),
+                        get_router().tier_of(request.get("model")))
+    _record_spend(request.get("model"), getattr(response, "usage", None), reserved)
+    content = _response_text(response)
+    if content:
+        cache.put(request, content)
+    return content
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Local Insight Pre-Extraction
+Deterministic, rule-based pass that runs before the insight LLM call. Fields
+whose evidence cannot exist are settled locally: a guest without reviews has
+no customer values, taste, staff or interest evidence, and a guest with
+neither reviews nor emails has made no requests. Explicit keywords settle
+more: "returning"/"back to" in an email or an earlier review of the venue mean
+a returning guest, and wheelchair, allergy, gluten-free, birthday and
+quiet-table requests in an email are always reported unless the LLM already
+lists the same kind of need. Negated mentions ("no wheelchair needed") are not
+requests. Reviews describe other restaurants, so accommodations found only in
+reviews are left to the LLM. Only the fields left open are sent to the LLM,
+and guests with no reviews and no emails skip the call entirely.
+
+Check how much of a dataset the fast path resolves with:
+    python local_extractor.py src/fine-dining-dataset.json
+"""
+
+import argparse
+import re
+
+from data_io import iter_records
+from venues import get_venue
+
+# Insight fields in prompt order
+INSIGHT_FIELDS = [
+    "customer_values",
+    "is_new_customer",
+    "special_accommodations",
+    "taste_preferences",
+    "staff_interaction_preferences",
+    "personal_interests"
+]
+
+# Fields the prompt derives from reviews only
+REVIEW_FIELDS = {"customer_values", "taste_preferences", "staff_interaction_preferences", "personal_interests"}
+
+RETURNING_PATTERN = re.compile(
+    r"\b(returning|return to|coming back|back to|back at|be back|last time|last visit)\b", re.IGNORECASE
+)
+FIRST_VISIT_PATTERN = re.compile(
+    r"\b(first time|first visit|never been|new to|haven't been before|have not been before)\b", re.IGNORECASE
+)
+
+# (pattern, accommodation, category); matched against the guest's emails. Rules
+# sharing a category describe the same need, so only the first match is kept
+ACCOMMODATION_RULES = [
+    (re.compile(r"wheelchair", re.IGNORECASE), "wheelchair access", "mobility"),
+    (re.compile(r"step-free|aisle space|\bcane\b|\bwalker\b", re.IGNORECASE), "accessible seating", "mobility"),
+    (re.compile(r"\bquiet (table|corner|spot)\b|secluded", re.IGNORECASE), "quiet table", "quiet"),
+    (re.compile(r"private dining|semi-private", re.IGNORECASE), "private dining", "private"),
+    (re.compile(r"gluten[- ]free|celiac|coeliac", re.IGNORECASE), "gluten-free", "gluten"),
+    (re.compile(r"lactose intoleran|dairy[- ]free", re.IGNORECASE), "dairy-free", "dairy"),
+    (re.compile(r"birthday", re.IGNORECASE), "birthday celebration", "birthday"),
+    (re.compile(r"anniversary", re.IGNORECASE), "anniversary celebration", "anniversary"),
+    (re.compile(r"high ?chair", re.IGNORECASE), "high chair", "high chair")
+]
+
+# Wording that puts an accommodation, however the LLM phrased it, in a category
+CATEGORY_PATTERNS = {
+    "mobility": re.compile(r"wheelchair|accessib|mobility|step-free|\bramp\b|\bcane\b|\bwalker\b", re.IGNORECASE),
+    "quiet": re.compile(r"quiet|secluded|low noise", re.IGNORECASE),
+    "private": re.compile(r"private", re.IGNORECASE),
+    "gluten": re.compile(r"gluten|celiac|coeliac", re.IGNORECASE),
+    "dairy": re.compile(r"dairy|lactose", re.IGNORECASE),
+    "birthday": re.compile(r"birthday", re.IGNORECASE),
+    "anniversary": re.compile(r"anniversary", re.IGNORECASE),
+    "high chair": re.compile(r"high ?chair|booster", re.IGNORECASE)
+}
+
+# A mention is negated when one of these words comes shortly before it in the same clause
+NEGATION_PATTERN = re.compile(r"\b(no|not|without|never|none|don't|doesn't|didn't|won't|isn't|aren't)\b", re.IGNORECASE)
+CLAUSE_BOUNDARY = re.compile(r"[.!?;:,\n]|\bbut\b|\bhowever\b", re.IGNORECASE)
+NEGATION_WINDOW_WORDS = 4
+
+ALLERGENS = {
+    "nut", "walnut", "peanut", "almond", "cashew", "pecan", "hazelnut", "pistachio", "shellfish",
+    "fish", "crustacean", "dairy", "milk", "egg", "soy", "sesame", "gluten", "wheat", "mustard"
+}
+ALLERGY_PATTERN = re.compile(r"\b(\w+) allerg(?:y|ies)\b|\ballergic to (\w+)", re.IGNORECASE)
+
+
+def email_text(diner):
+    return "\n".join(f"{email.get('subject', '')}\n{email.get('combined_thread', '')}" for email in diner.get("emails") or [])
+
+
+def is_negated(text, start):
+    """Whether the mention starting at text[start] is negated ("no wheelchair needed", "we don't need a high chair")."""
+    clause = CLAUSE_BOUNDARY.split(text[:start])[-1]
+    return bool(NEGATION_PATTERN.search(" ".join(clause.split()[-NEGATION_WINDOW_WORDS:])))
+
+
+def mentioned(pattern, text):
+    return any(not is_negated(text, match.start()) for match in pattern.finditer(text))
+
+
+def find_allergies(text):
+    allergies = []
+    for match in ALLERGY_PATTERN.finditer(text):
+        if is_negated(text, match.start()):
+            continue
+        word = (match.group(1) or match.group(2)).lower()
+        if word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word in ALLERGENS and f"{word} allergy" not in allergies:
+            allergies.append(f"{word} allergy")
+    return allergies
+
+
+def find_accommodations(text):
+    """Accommodations stated explicitly (and not negated) in the text, one per category, in rule order."""
+    found = []
+    categories = set()
+    for pattern, accommodation, category in ACCOMMODATION_RULES:
+        if category not in categories and mentioned(pattern, text):
+            found.append(accommodation)
+            categories.add(category)
+    return found + find_allergies(text)
+
+
+def accommodation_categories(accommodation):
+    """Normalized categories of an accommodation, e.g. {"mobility"} for "accessible seating"."""
+    text = str(accommodation)
+    categories = {category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(text)}
+    categories.update(find_allergies(text))
+    # "nut-free" is the LLM's way of recording a nut allergy
+    categories.update(f"{word} allergy" for word in re.findall(r"\b(\w+)[- ]free\b", text.lower()) if word in ALLERGENS)
+    return categories
+
+
+def find_new_customer(diner):
+    """True/False when the guest's emails or review history settle it, None when they do not."""
+    venue = get_venue().name
+    if any(review.get("restaurant_name") == venue for review in diner.get("reviews") or []):
+        return False
+    # Reviews are about other restaurants, so only the emails speak about coming back here
+    text = email_text(diner)
+    returning = bool(RETURNING_PATTERN.search(text))
+    first_visit = bool(FIRST_VISIT_PATTERN.search(text))
+    if returning != first_visit:
+        return first_visit
+    return None
+
+
+class LocalExtraction:
+    """
+    Result of the local pass for one diner: the settled fields (in the cleaned
+    form parse_insights_response() produces, so empty fields are absent) and
+    the fields that still need the LLM.
+    """
+
+    def __init__(self, diner):
+        self.resolved = {}
+        self.unresolved = []
+        # Accommodations the emails state explicitly; kept even if the LLM words them differently
+        self.required_accommodations = []
+
+        has_reviews = bool(diner.get("reviews"))
+        has_emails = bool(diner.get("emails"))
+
+        for field in INSIGHT_FIELDS:
+            if field in REVIEW_FIELDS:
+                if has_reviews:
+                    self.unresolved.append(field)
+                else:
+                    self.resolved[field] = None
+            elif field == "is_new_customer":
+                is_new = find_new_customer(diner)
+                if is_new is not None or not (has_reviews or has_emails):
+                    self.resolved[field] = is_new
+                else:
+                    self.unresolved.append(field)
+            elif field == "special_accommodations":
+                if has_emails:
+                    self.unresolved.append(field)
+                    self.required_accommodations = find_accommodations(email_text(diner))
+                elif has_reviews:
+                    # Reviews are about other venues; a complaint about one is not a request here
+                    self.unresolved.append(field)
+                else:
+                    self.resolved[field] = None
+
+    @property
+    def skips_llm(self):
+        return not self.unresolved
+
+    def insights(self):
+        """The locally settled insights, without empty values."""
+        return {field: value for field, value in self.resolved.items() if value not in (None, [], "", "null")}
+
+    def merge(self, llm_insights):
+        """Combine the LLM's answer for the open fields with the local ones, in prompt order."""
+        local = self.insights()
+        merged = {}
+        for field in INSIGHT_FIELDS:
+            if field in local:
+                merged[field] = local[field]
+            elif field in self.unresolved and field in llm_insights:
+                merged[field] = llm_insights[field]
+
+        if self.required_accommodations:
+            accommodations = list(merged.get("special_accommodations") or [])
+            covered = set().union(*(accommodation_categories(existing) for existing in accommodations))
+            for accommodation in self.required_accommodations:
+                categories = accommodation_categories(accommodation)
+                if not categories & covered:
+                    accommodations.append(accommodation)
+                    covered |= categories
+            merged["special_accommodations"] = accommodations
+        return merged
+
+
+def main():
+    """Report how many LLM calls and fields the fast path saves on a dataset."""
+    parser = argparse.ArgumentParser(description="Check how much of a dataset the local insight fast path resolves")
+    parser.add_argument("input", help="Dataset, wrapped JSON or .jsonl")
+    args = parser.parse_args()
+
+    diners = skipped = resolved_fields = 0
+    for diner in iter_records(args.input, "diners"):
+        extraction = LocalExtraction(diner)
+        diners += 1
+        skipped += extraction.skips_llm
+        resolved_fields += len(INSIGHT_FIELDS) - len(extraction.unresolved)
+
+    if not diners:
+        print("No diners found")
+        return
+    print(f"Diners: {diners}")
+    print(f"Answered without the LLM: {skipped} ({skipped / diners:.0%} of insight calls avoided)")
+    print(f"Fields resolved locally: {resolved_fields}/{diners * len(INSIGHT_FIELDS)} "
+          f"({resolved_fields / (diners * len(INSIGHT_FIELDS)):.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI Chat Completions Server
+Local stand-in for the chat completions endpoint so the pipeline scripts can be
+benchmarked and load-tested without an API key. Answers come from
+llm_standin.py. Latency, server errors, 429 rate-limit responses and malformed
+answers (JSON wrapped in chatter, or cut off) can be injected, and GET /stats reports the calls, status codes and tokens seen so far.
+
+Point the scripts at it through the OpenAI SDK's base URL variable:
+    python mock_openai_server.py --port 8765 --latency-ms 300 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock python generate_insights.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_standin import build_chat_completion, standin_content
+
+COMPLETIONS_PATHS = ("/v1/chat/completions", "/chat/completions")
+
+
+class MockStats:
+    """Thread-safe counters for the requests the server has handled."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.status_counts = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.models = {}
+
+    def record(self, status, model=None, usage=None):
+        with self._lock:
+            self.calls += 1
+            self.status_counts[str(status)] = self.status_counts.get(str(status), 0) + 1
+            if usage:
+                self.prompt_tokens += usage["prompt_tokens"]
+                self.completion_tokens += usage["completion_tokens"]
+                self.models[model] = self.models.get(model, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "status_counts": dict(self.status_counts),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "models": dict(self.models)
+            }
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    # Keep-alive lets the SDK reuse connections like it does against the real API
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.send_json(200, self.server.stats.snapshot())
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length)
+
+        if self.path == "/stats/reset":
+            self.server.stats.reset()
+            self.send_json(200, {"reset": True})
+            return
+        if self.path not in COMPLETIONS_PATHS:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        try:
+            body = json.loads(raw_body)
+        except json.JSONDecodeError:
+            self.server.stats.record(400)
+            self.send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        server = self.server
+        with server.rng_lock:
+            latency = max(0.0, server.rng.gauss(server.latency, server.latency_jitter)) if server.latency else 0.0
+            roll = server.rng.random()
+            malformed_roll = server.rng.random()
+
+        if roll < server.rate_limit_rate:
+            server.stats.record(429)
+            self.send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                           {"retry-after-ms": str(server.retry_after_ms), "retry-after": str(max(1, server.retry_after_ms // 1000))})
+            return
+
+        time.sleep(latency)
+
+        if roll < server.rate_limit_rate + server.error_rate:
+            server.stats.record(500)
+            self.send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+            return
+
+        content = standin_content(body)
+        if malformed_roll < server.malformed_rate:
+            content = malform(content, malformed_roll < server.malformed_rate / 2)
+        completion = build_chat_completion(body, content)
+        server.stats.record(200, body.get("model"), completion["usage"])
+        self.send_json(200, completion)
+
+
+def malform(content, truncate):
+    """Damage an answer the way models do: cut it off mid-way, or wrap it in a code fence and chatter."""
+    if truncate:
+        return content[:max(1, len(content) * 2 // 3)]
+    return f"Here is the result:\n```json\n{content}\n```\nLet me know if you need anything else."
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, latency_jitter_ms=0, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after_ms=500, seed=None, verbose=False, malformed_rate=0.0):
+        super().__init__((host, port), MockOpenAIHandler)
+        self.latency = latency_ms / 1000
+        self.latency_jitter = latency_jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_ms = retry_after_ms
+        self.malformed_rate = malformed_rate
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.stats = MockStats()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(**options):
+    """Start a mock server on a background thread; returns the server (call shutdown() to stop it)."""
+    server = MockOpenAIServer(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mean response latency (default: %(default)s)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0, help="Standard deviation of the latency (default: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500 (default: %(default)s)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429 (default: %(default)s)")
+    parser.add_argument("--retry-after-ms", type=int, default=500, help="Retry-After sent with 429 responses (default: %(default)s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="Fraction of answers returned cut off or wrapped in extra text (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible fault injection")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        args.host, args.port, args.latency_ms, args.latency_jitter_ms, args.error_rate,
+        args.rate_limit_rate, args.retry_after_ms, args.seed, args.verbose, args.malformed_rate
+    )
+    print(f"Mock OpenAI server listening on {server.base_url}")
+    print(f"Use: OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=mock python <script>.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats.snapshot(), indent=2))
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tiered Model Routing
+Decides which model answers each request instead of hard-coding one model
+per script. Models are grouped into tiers (small, standard, large) and every
+task (insights, justifications, tables) routes short prompts to its simple
+tier and other prompts to its default tier. Prompts past the task's
+long-context threshold start on the escalation tier, and answers that fail
+validation (unparseable JSON, a table that is not among the candidates, an
+empty justification) are retried there. Calls, latency and spend are reported
+per tier in the pipeline metrics.
+
+Tiers and routes can be changed without code edits through a JSON file passed
+with --routing-config (or $MODEL_ROUTING_CONFIG), for example:
+    {"tiers": {"small": "gpt-4o-mini"}, "routes": {"insights": {"simple": "standard"}}}
+
+Show the effective routing with:
+    python model_routing.py --routing-config routing.json
+"""
+
+import argparse
+import json
+import os
+
+from pipeline_metrics import get_metrics
+from rate_limiter import estimate_tokens
+
+# Tiers from cheapest/fastest to strongest
+DEFAULT_TIERS = {
+    "small": "gpt-4.1-nano-2025-04-14",
+    "standard": "gpt-4.1-mini-2025-04-14",
+    "large": "gpt-4.1-2025-04-14"
+}
+
+# Per task: the tier for prompts up to simple_tokens, the tier for everything
+# else, and the escalation tier for prompts of long_tokens or more and for
+# answers that fail validation (prompt sizes in estimated tokens)
+DEFAULT_ROUTES = {
+    "insights": {"simple": "small", "default": "standard", "escalate": "large",
+                 "simple_tokens": 600, "long_tokens": 2500},
+    "justifications": {"simple": "small", "default": "small", "escalate": "standard",
+                       "simple_tokens": 400, "long_tokens": 1200},
+    "tables": {"simple": "standard", "default": "standard", "escalate": "large",
+               "simple_tokens": 0, "long_tokens": None}
+}
+
+ROUTING_CONFIG_ENV = "MODEL_ROUTING_CONFIG"
+
+
+class Route:
+    """The tier and model chosen for one request, and why."""
+
+    def __init__(self, tier, model, reason):
+        self.tier = tier
+        self.model = model
+        self.reason = reason
+
+    def __repr__(self):
+        return f"Route({self.tier!r}, {self.model!r}, {self.reason!r})"
+
+
+class ModelRouter:
+    """Maps tasks and prompt sizes to model tiers."""
+
+    def __init__(self, tiers=None, routes=None):
+        self.tiers = {**DEFAULT_TIERS, **(tiers or {})}
+        self.routes = {task: dict(route) for task, route in DEFAULT_ROUTES.items()}
+        for task, overrides in (routes or {}).items():
+            if task not in self.routes:
+                raise ValueError(f"Unknown routing task '{task}' (tasks: {', '.join(self.routes)})")
+            self.routes[task].update(overrides)
+
+        for task, route in self.routes.items():
+            for key in ("simple", "default", "escalate"):
+                if route[key] not in self.tiers:
+                    raise ValueError(f"Route '{task}' uses unknown tier '{route[key]}' (tiers: {', '.join(self.tiers)})")
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config.get("tiers"), config.get("routes"))
+
+    def _route(self, task, tier, reason):
+        return Route(tier, self.tiers[tier], reason)
+
+    def route(self, task, messages):
+        """The route for a request with these messages; long prompts start on the escalation tier."""
+        config = self.routes[task]
+        tokens = estimate_tokens(messages)
+        if config.get("long_tokens") and tokens >= config["long_tokens"]:
+            get_metrics().record_escalation(task, "long_context")
+            return self._route(task, config["escalate"], "long_context")
+        if tokens <= (config.get("simple_tokens") or 0):
+            return self._route(task, config["simple"], "simple")
+        return self._route(task, config["default"], "default")
+
+    def escalation(self, task, model):
+        """The route to retry an invalid answer from model on, or None if it already came from that tier or above."""
+        target = self.routes[task]["escalate"]
+        order = list(self.tiers)
+        current = self.tier_of(model)
+        if current in order and order.index(current) >= order.index(target):
+            return None
+        return self._route(task, target, "invalid_output")
+
+    def tier_of(self, model):
+        for tier, tier_model in self.tiers.items():
+            if tier_model == model:
+                return tier
+        return None
+
+    def signature(self, task):
+        """Models a task can be answered by; checkpoint fingerprints include it so rerouting redoes the work."""
+        config = self.routes[task]
+        return [self.tiers[config[key]] for key in ("simple", "default", "escalate")]
+
+
+def escalate(task, request):
+    """
+    Copy of a request for the task's escalation tier, for retrying an answer that
+    failed validation; None when the request already ran on that tier or above.
+    """
+    route = get_router().escalation(task, request.get("model"))
+    if route is None:
+        return None
+    get_metrics().record_escalation(task, route.reason)
+    return {**request, "model": route.model}
+
+
+# Created on first use so $MODEL_ROUTING_CONFIG applies to scripts without the flag
+_router = None
+
+
+def configure_routing(path=None):
+    """Replace the process-wide router, loading tiers and routes from a JSON file if given."""
+    global _router
+    path = path or os.getenv(ROUTING_CONFIG_ENV)
+    _router = ModelRouter.from_file(path) if path else ModelRouter()
+    return _router
+
+
+def get_router():
+    if _router is None:
+        configure_routing()
+    return _router
+
+
+def add_routing_arguments(parser):
+    """Register the shared model routing flag on an argparse parser."""
+    group = parser.add_argument_group("model routing")
+    group.add_argument("--routing-config", default=None,
+                       help=f"JSON file overriding model tiers and per-task routes (default: ${ROUTING_CONFIG_ENV})")
+
+
+def configure_routing_from_args(args):
+    """Configure the process-wide router from add_routing_arguments() flags."""
+    return configure_routing(args.routing_config)
+
+
+def main():
+    """Print the effective tiers and routes."""
+    parser = argparse.ArgumentParser(description="Show the effective model tiers and per-task routes")
+    add_routing_arguments(parser)
+    args = parser.parse_args()
+    router = configure_routing_from_args(args)
+
+    print("Tiers:")
+    for tier, model in router.tiers.items():
+        print(f"  {tier:<10} {model}")
+    print("Routes:")
+    for task, config in router.routes.items():
+        long_text = f", escalate from {config['long_tokens']} tokens" if config.get("long_tokens") else ""
+        print(f"  {task:<15} simple (<= {config['simple_tokens']} tokens): {config['simple']}, "
+              f"default: {config['default']}, escalate: {config['escalate']}{long_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Multi-Venue Runs
+Runs the full pipeline for several restaurants at once, one venue per worker
+process. Each venue is a directory with a venue.json (name, table layout and
+optionally the dataset file, see venues.py) next to its dataset; its outputs
+are written to the venue's own output/ directory:
+
+    venues/
+        french-laudure/venue.json, fine-dining-dataset.json
+        le-petit-bistro/venue.json, fine-dining-dataset.json
+
+Venues share nothing but the response cache and the global API budget: the
+workers draw every call from one requests/tokens-per-minute budget and one
+spend limit held in shared memory (see global_budget.py), so adding venues
+adds throughput without exceeding the account's limits. Each worker's
+progress goes to its venue's output/run.log, and a per-venue throughput
+report is printed at the end.
+
+Usage:
+    python multi_venue.py venues --workers 4 --global-rpm 1000 --max-cost-usd 5
+    python multi_venue.py venues --async --concurrency 8   # other flags go to every venue's pipeline
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+from data_io import iter_records
+from global_budget import add_budget_arguments, budget_from_args, configure_global_budget
+from pipeline_metrics import get_metrics, reset_metrics
+
+VENUE_CONFIG = "venue.json"
+DEFAULT_DATASET = "fine-dining-dataset.json"
+OUTPUT_DIR = "output"
+
+
+def find_venues(root):
+    """Venue directories under root, by name: every subdirectory with a venue.json."""
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, VENUE_CONFIG))
+    )
+
+
+def venue_run_arguments(venue_dir, pipeline_args):
+    """Pipeline arguments for one venue: its config, dataset and output paths, then the shared flags."""
+    with open(os.path.join(venue_dir, VENUE_CONFIG), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    output_dir = os.path.join(venue_dir, OUTPUT_DIR)
+    return [
+        "--venue-config", os.path.join(venue_dir, VENUE_CONFIG),
+        "--input", os.path.join(venue_dir, config.get("dataset", DEFAULT_DATASET)),
+        "--detailed-input", os.path.join(output_dir, "detailed_info.json"),
+        "--detailed-output", os.path.join(output_dir, "detailed_info.json"),
+        "--dishes-output", os.path.join(output_dir, "dishes.json"),
+        "--dashboard-dir", os.path.join(output_dir, "dashboard"),
+        "--checkpoint-dir", os.path.join(output_dir, ".checkpoints")
+    ] + list(pipeline_args)
+
+
+def _init_worker(budget):
+    load_dotenv()
+    configure_global_budget(budget)
+
+
+def run_venue(venue_dir, pipeline_args):
+    """Run the pipeline for one venue in this worker process; returns its throughput figures."""
+    # Imported in the worker so the parent process stays light
+    from llm_cache import configure_cache_from_args
+    from model_routing import configure_routing_from_args
+    from pipeline import build_parser, run_pipeline
+    from retry_policy import configure_retries_from_args
+    from venues import configure_venue_from_args
+
+    args = build_parser().parse_args(venue_run_arguments(venue_dir, pipeline_args))
+    os.makedirs(os.path.join(venue_dir, OUTPUT_DIR), exist_ok=True)
+    result = {"venue_dir": venue_dir, "venue": os.path.basename(venue_dir), "diners": 0, "parties": 0,
+              "seconds": 0.0, "calls": 0, "tokens": 0, "cost_usd": 0.0, "error": None}
+
+    start = time.perf_counter()
+    with open(os.path.join(venue_dir, OUTPUT_DIR, "run.log"), "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log):
+        try:
+            configure_cache_from_args(args)
+            configure_retries_from_args(args)
+            configure_routing_from_args(args)
+            result["venue"] = configure_venue_from_args(args).name
+            reset_metrics()
+            run_pipeline(args)
+            if os.path.exists(args.detailed_output):
+                result["diners"] = sum(1 for _ in iter_records(args.detailed_output, "diners"))
+            if os.path.exists(args.dishes_output):
+                result["parties"] = sum(1 for _ in iter_records(args.dishes_output, "parties"))
+        except Exception as e:
+            # One venue failing (including on BudgetExceededError) must not lose the other venues' results
+            print(f"Error: {type(e).__name__}: {e}")
+            result["error"] = str(e)
+        totals = get_metrics().report()["totals"]
+        print(get_metrics().summary())
+
+    result["seconds"] = time.perf_counter() - start
+    result["calls"] = totals["calls"]
+    result["tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+    result["cost_usd"] = totals["cost_usd"]
+    return result
+
+
+def print_report(results, seconds, spent):
+    print("\nVenue throughput:")
+    print(f"  {'venue':<24} {'diners':>7} {'parties':>8} {'seconds':>8} {'diners/s':>9} {'calls':>7} {'tokens':>9} {'cost':>9}")
+    for result in results:
+        rate = result["diners"] / result["seconds"] if result["seconds"] else 0.0
+        status = f"  failed: {result['error']}" if result["error"] else ""
+        print(f"  {result['venue']:<24} {result['diners']:>7} {result['parties']:>8} {result['seconds']:>8.1f} "
+              f"{rate:>9.2f} {result['calls']:>7} {result['tokens']:>9} ${result['cost_usd']:>8.4f}{status}")
+    diners = sum(result["diners"] for result in results)
+    calls = sum(result["calls"] for result in results)
+    tokens = sum(result["tokens"] for result in results)
+    print(f"  {'total':<24} {diners:>7} {sum(result['parties'] for result in results):>8} {seconds:>8.1f} "
+          f"{diners / seconds if seconds else 0.0:>9.2f} {calls:>7} {tokens:>9} ${spent:>8.4f}")
+
+
+def main():
+    """Command line entry point for multi-venue runs."""
+    parser = argparse.ArgumentParser(
+        description="Run the pipeline for every venue in a directory on a process pool with a shared API budget",
+        epilog="Any other flags (e.g. --async, --stages, --no-cache) are passed to every venue's pipeline."
+    )
+    parser.add_argument("venues_dir", nargs="?", default="venues",
+                        help="Directory with one subdirectory per venue (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: one per venue, at most the number of CPUs)")
+    add_budget_arguments(parser)
+    args, pipeline_args = parser.parse_known_args()
+    load_dotenv()
+
+    try:
+        venue_dirs = find_venues(args.venues_dir)
+    except FileNotFoundError:
+        print(f"Error: {args.venues_dir} not found")
+        return
+    if not venue_dirs:
+        print(f"Error: no {VENUE_CONFIG} found under {args.venues_dir}")
+        return
+
+    # Fail on bad pipeline flags here rather than once per worker
+    from pipeline import build_parser
+    build_parser().parse_args(venue_run_arguments(venue_dirs[0], pipeline_args))
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY not found in environment variables.")
+        print("Please create a .env file with your OpenAI API key.")
+        return
+
+    workers = args.workers or min(len(venue_dirs), os.cpu_count() or 1)
+    context = multiprocessing.get_context("spawn")
+    budget = budget_from_args(args, context)
+    print("Multi-Venue Pipeline")
+    print("====================")
+    print(f"{len(venue_dirs)} venues on {workers} worker processes, "
+          f"global budget {args.global_rpm} requests/min, {args.global_tpm} tokens/min"
+          + (f", ${args.max_cost_usd:.2f}" if args.max_cost_usd is not None else ""))
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(budget,)) as executor:
+        futures = [executor.submit(run_venue, venue_dir, pipeline_args) for venue_dir in venue_dirs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            log = os.path.join(result["venue_dir"], OUTPUT_DIR, "run.log")
+            if result["error"]:
+                print(f"✗ {result['venue']} failed after {result['seconds']:.1f}s: {result['error']} (see {log})")
+            else:
+                print(f"✓ {result['venue']}: {result['diners']} diners, {result['parties']} parties "
+                      f"in {result['seconds']:.1f}s (log: {log})")
+
+    results.sort(key=lambda result: result["venue_dir"])
+    print_report(results, time.perf_counter() - start, budget.spent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Dining Data Pipeline
+Single entry point that runs insights -> justifications -> dishes/tables as a
+stage graph. Stages hand their diners to each other in memory instead of
+re-reading JSON files, stages whose inputs are ready run at the same time
+(justifications and dishes both only need the insights), and the dashboard
+files (detailed info, dishes and the per-date dashboard shards) are written
+atomically once at the end, so an interrupted run never leaves a half-updated
+dashboard behind.
+
+Usage:
+    python pipeline.py                              # all stages
+    python pipeline.py --stages justifications,dishes
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+
+from add_justifications import DETAILED_INFO_PATH, JUSTIFICATION_REQUESTS_PER_MINUTE, justify_diners
+from build_dashboard_index import OUTPUT_DIR as DASHBOARD_DIR, write_dashboard_data
+from checkpoint import CHECKPOINT_DIR, CheckpointJournal
+from data_io import write_json_atomic
+from extract_dishes import TABLE_ASSIGNMENT_REQUESTS_PER_MINUTE, build_metadata, extract_dishes_info
+from generate_insights import DATASET_PATH, DEFAULT_CONCURRENCY, enhance_diners, get_client
+from llm_cache import add_cache_arguments, configure_cache_from_args, get_cache
+from model_routing import add_routing_arguments, configure_routing_from_args
+from pipeline_metrics import add_metrics_arguments, write_metrics_from_args
+from retry_policy import add_retry_arguments, configure_retries_from_args
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, RateLimiter
+from reservation_query import DISHES_PATH, total_revenue
+from service_scheduler import ScheduledRun, add_schedule_arguments, dashboard_publisher, schedule_from_args
+from venues import add_venue_arguments, configure_venue_from_args
+
+# Load environment variables
+load_dotenv()
+
+# Stage -> stages whose output it consumes
+STAGES = {
+    "insights": (),
+    "justifications": ("insights",),
+    "dishes": ("insights",)
+}
+
+# Journals are shared with the standalone scripts, so either entry point can resume the other's work
+STAGE_CHECKPOINTS = {
+    "insights": "generate_insights",
+    "justifications": "add_justifications",
+    "dishes": "extract_dishes"
+}
+
+
+def parse_stages(value):
+    """Parse a comma-separated stage list, keeping the graph's order."""
+    selected = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = selected - set(STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s): {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    return [name for name in STAGES if name in selected]
+
+
+def run_stage_graph(runners, max_workers=None):
+    """
+    Run {stage: callable} respecting STAGES dependencies. A stage starts as soon
+    as every selected stage it depends on has finished; dependencies that were
+    not selected are assumed to be satisfied from files. Returns {stage: seconds}.
+    The first failing stage stops the run and its exception is re-raised.
+    """
+    timings = {}
+    started = {}
+    done = set()
+    pending = dict(runners)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(runners) or 1) as executor:
+        running = {}
+        while pending or running:
+            for stage in list(pending):
+                if all(dependency in done or dependency not in runners for dependency in STAGES[stage]):
+                    print(f"\n▶ Starting stage: {stage}")
+                    started[stage] = time.perf_counter()
+                    running[executor.submit(pending.pop(stage))] = stage
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                future.result()
+                timings[stage] = time.perf_counter() - started[stage]
+                done.add(stage)
+                print(f"✓ Finished stage: {stage} ({timings[stage]:.1f}s)")
+
+    return timings
+
+
+def open_stage_journal(args, stage):
+    """Open the checkpoint journal of a stage, or None when checkpointing is disabled."""
+    if args.no_checkpoint:
+        return None
+    path = os.path.join(args.checkpoint_dir, f"{STAGE_CHECKPOINTS[stage]}.jsonl")
+    if args.reset_checkpoint and os.path.exists(path):
+        os.remove(path)
+    return CheckpointJournal(path)
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_diners(path):
+    return load_json(path).get("diners", [])
+
+
+def run_pipeline(args):
+    """Run the selected stages and write their outputs; returns the per-stage timings."""
+    stages = args.stages
+    state = {}
+    journals = []
+    schedule = schedule_from_args(args)
+
+    def journal_for(stage):
+        journal = open_stage_journal(args, stage)
+        if journal:
+            journals.append(journal)
+        return journal
+
+    if "insights" not in stages:
+        # Downstream stages start from the detailed info written by an earlier run
+        state["detailed"] = load_diners(args.detailed_input)
+        print(f"Loaded {len(state['detailed'])} diners from {args.detailed_input}")
+
+    def run_insights():
+        diners = load_diners(args.input)
+        enhanced = []
+        # Scheduled runs publish each date of the horizon to the dashboard as soon as its insights are in
+        run = ScheduledRun(diners, schedule, dashboard_publisher(args.dashboard_dir)) if schedule else None
+        enhance_diners(
+            run.diners if run else diners, run.sink if run else enhanced.append,
+            use_async=args.use_async, concurrency=args.concurrency,
+            limiter=RateLimiter(args.rpm, args.tpm), journal=journal_for("insights"),
+            total_diners=len(diners), normalized=args.normalized, fast_path=args.fast_path
+        )
+        state["detailed"] = run.results() if run else enhanced
+
+    def run_justifications():
+        # Justifications are added in place, so the dishes stage may read the same diners meanwhile
+        limiter = RateLimiter(requests_per_minute=JUSTIFICATION_REQUESTS_PER_MINUTE, tokens_per_minute=None)
+        justified = []
+        run = ScheduledRun(state["detailed"], schedule) if schedule else None
+        justify_diners(run.diners if run else state["detailed"], run.sink if run else justified.append,
+                       get_client(), limiter, args.batched, journal_for("justifications"), total=len(state["detailed"]))
+        state["detailed"] = run.results() if run else justified
+
+    def run_dishes():
+        client = limiter = journal = None
+        if args.llm_tiebreak:
+            client = get_client()
+            limiter = RateLimiter(requests_per_minute=TABLE_ASSIGNMENT_REQUESTS_PER_MINUTE, tokens_per_minute=None)
+            journal = journal_for("dishes")
+        dishes_data = extract_dishes_info({"diners": state["detailed"]}, client, limiter, journal)
+        dishes_data["metadata"] = build_metadata(
+            len(dishes_data["parties"]),
+            total_revenue(dishes_data["parties"]),
+            args.detailed_output if ("insights" in stages or "justifications" in stages) else args.detailed_input
+        )
+        state["dishes"] = dishes_data
+
+    runners = {"insights": run_insights, "justifications": run_justifications, "dishes": run_dishes}
+    try:
+        timings = run_stage_graph({stage: runners[stage] for stage in stages})
+    finally:
+        for journal in journals:
+            journal.close()
+
+    # Every stage succeeded; publish the outputs together
+    if "insights" in stages or "justifications" in stages:
+        write_json_atomic(args.detailed_output, {"diners": state["detailed"]})
+        print(f"✓ Saved {len(state['detailed'])} diners to {args.detailed_output}")
+    if "dishes" in stages:
+        write_json_atomic(args.dishes_output, state["dishes"])
+        print(f"✓ Saved {len(state['dishes']['parties'])} parties to {args.dishes_output}")
+
+    # The dashboard shards pair the detailed info with the dishes, so rebuild them whenever either changed
+    if "dishes" in state:
+        parties = state["dishes"]["parties"]
+    elif os.path.exists(args.dishes_output):
+        parties = load_json(args.dishes_output).get("parties", [])
+    else:
+        parties = None
+        print(f"Skipping the dashboard data: {args.dishes_output} not found")
+    if parties is not None:
+        manifest, written = write_dashboard_data(state["detailed"], parties, args.dashboard_dir)
+        print(f"✓ Saved {len(manifest['dates'])} date shards to {args.dashboard_dir} ({written} changed)")
+
+    return timings
+
+
+def build_parser():
+    """The pipeline's argument parser; multi_venue.py builds each venue's run arguments with it too."""
+    parser = argparse.ArgumentParser(description="Run insights -> justifications -> dishes as one pipeline")
+    parser.add_argument("--stages", type=parse_stages, default=list(STAGES),
+                        help=f"Comma-separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument("--input", default=DATASET_PATH,
+                        help="Raw dataset for the insights stage (default: %(default)s)")
+    parser.add_argument("--detailed-input", default=DETAILED_INFO_PATH,
+                        help="Detailed info to start from when the insights stage is skipped (default: %(default)s)")
+    parser.add_argument("--detailed-output", default=DETAILED_INFO_PATH,
+                        help="Where to write the detailed info (default: %(default)s)")
+    parser.add_argument("--dishes-output", default=DISHES_PATH,
+                        help="Where to write the dishes (default: %(default)s)")
+    parser.add_argument("--dashboard-dir", default=DASHBOARD_DIR,
+                        help="Where to write the dashboard's manifest and per-date shards (default: %(default)s)")
+
+    group = parser.add_argument_group("insights stage")
+    group.add_argument("--async", dest="use_async", action="store_true",
+                       help="Generate insights concurrently with the async OpenAI client")
+    group.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                       help="Maximum in-flight requests in async mode (default: %(default)s)")
+    group.add_argument("--rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                       help="Requests-per-minute limit (default: %(default)s)")
+    group.add_argument("--tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                       help="Tokens-per-minute limit (default: %(default)s)")
+    group.add_argument("--normalized", action="store_true",
+                       help="Store insights once per diner instead of copying them into every reservation")
+    group.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+                       help="Send every field of every diner to the LLM instead of settling clear-cut ones locally")
+
+    group = parser.add_argument_group("justifications and dishes stages")
+    group.add_argument("--batched", action="store_true",
+                       help="Request all justifications of a diner in a single JSON call")
+    group.add_argument("--llm-tiebreak", action="store_true",
+                       help="Ask the LLM to choose between equally suitable tables")
+
+    group = parser.add_argument_group("checkpointing")
+    group.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR,
+                       help="Directory holding the per-stage journals (default: %(default)s)")
+    group.add_argument("--no-checkpoint", action="store_true",
+                       help="Process everything without reading or writing the journals")
+    group.add_argument("--reset-checkpoint", action="store_true",
+                       help="Discard the journals of the selected stages before starting")
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_routing_arguments(parser)
+    add_venue_arguments(parser)
+    add_schedule_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser
+
+
+def main():
+    """Command line entry point for the full pipeline."""
+    parser = build_parser()
+    args = parser.parse_args()
+    configure_cache_from_args(args)
+    configure_retries_from_args(args)
+    configure_routing_from_args(args)
+    configure_venue_from_args(args)
+
+    if not args.stages:
+        parser.error("no stages selected")
+
+    needs_api = "insights" in args.stages or "justifications" in args.stages or args.llm_tiebreak
+    if needs_api and not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY not found in environment variables.")
+        print("Please create a .env file with your OpenAI API key.")
+        return
+
+    print("Dining Data Pipeline")
+    print("====================")
+    print(f"Stages: {' -> '.join(args.stages)}")
+
+    start = time.perf_counter()
+    try:
+        timings = run_pipeline(args)
+    except FileNotFoundError as e:
+        print(f"Error: {e.filename} not found")
+        return
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON input: {e}")
+        return
+
+    print("\nStage timings:")
+    for stage in args.stages:
+        print(f"  {stage:<15} {timings[stage]:7.1f}s")
+    print(f"  {'total':<15} {time.perf_counter() - start:7.1f}s")
+    print(get_cache().summary())
+    write_metrics_from_args(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+Process-wide instrumentation for every LLM call the pipeline makes. The shared
+call wrapper in llm_client.py records per-stage latency histograms, token
+usage from response.usage, cache hits, errors, retries and estimated cost per
+model and model tier; the stage scripts record the fallback values they write
+when a call fails (generic justifications, empty insights, default tables),
+the calls the local insight fast path made unnecessary, how structured
+answers were parsed (strictly, leniently, after a repair re-ask, or not at
+all) and why requests were escalated to a stronger tier. At the end of a run
+the counters can be written as a JSON report and in the Prometheus
+textfile-collector format.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# Histogram buckets for call latency, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million (prompt, completion) tokens, matched on the model name prefix
+# so dated snapshots such as gpt-4.1-mini-2025-04-14 are priced too
+MODEL_PRICES = {
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00)
+}
+
+METRIC_PREFIX = "dining_llm"
+
+
+def model_price(model):
+    """(prompt, completion) USD per million tokens, or None for unknown models."""
+    # Longest prefix first so gpt-4.1-mini is not priced as gpt-4.1
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if (model or "").startswith(prefix):
+            return MODEL_PRICES[prefix]
+    return None
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    price = model_price(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+
+def _new_stage():
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "avoided_calls": 0,
+        "errors": {},
+        "retries": 0,
+        "fallbacks": {},
+        "parses": {},
+        "escalations": {},
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latency_sum": 0.0,
+        "models": {},
+        "tiers": {}
+    }
+
+
+def _new_model():
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+
+def _new_tier():
+    return {"calls": 0, "latency_sum": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+
+class PipelineMetrics:
+    """Thread-safe counters for LLM calls, grouped by stage and model."""
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat()
+        self._start = time.monotonic()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage):
+        return self._stages.setdefault(stage or "unknown", _new_stage())
+
+    def record_call(self, stage, model, latency, usage=None, tier=None):
+        """Record a successful API call and its response.usage."""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            entry = self._stage(stage)
+            entry["calls"] += 1
+            entry["latency_sum"] += latency
+            bucket = next((index for index, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+            entry["latency_buckets"][bucket] += 1
+
+            model_entry = entry["models"].setdefault(model or "unknown", _new_model())
+            model_entry["calls"] += 1
+            model_entry["prompt_tokens"] += prompt_tokens
+            model_entry["completion_tokens"] += completion_tokens
+            model_entry["cost_usd"] += cost
+
+            tier_entry = entry["tiers"].setdefault(tier or "unrouted", _new_tier())
+            tier_entry["calls"] += 1
+            tier_entry["latency_sum"] += latency
+            tier_entry["prompt_tokens"] += prompt_tokens
+            tier_entry["completion_tokens"] += completion_tokens
+            tier_entry["cost_usd"] += cost
+
+    def record_cache_hit(self, stage):
+        with self._lock:
+            self._stage(stage)["cache_hits"] += 1
+
+    def record_avoided(self, stage):
+        """Count a request answered by local rules without calling the LLM."""
+        with self._lock:
+            self._stage(stage)["avoided_calls"] += 1
+
+    def record_error(self, stage, error):
+        """Count a failed call by error kind (HTTP status when available, else exception name)."""
+        status = getattr(error, "status_code", None)
+        kind = str(status) if status else type(error).__name__
+        with self._lock:
+            errors = self._stage(stage)["errors"]
+            errors[kind] = errors.get(kind, 0) + 1
+
+    def record_retry(self, stage):
+        with self._lock:
+            self._stage(stage)["retries"] += 1
+
+    def record_fallback(self, stage, label):
+        """Count a fallback value written in place of an LLM answer (label: insight type or reason)."""
+        with self._lock:
+            fallbacks = self._stage(stage)["fallbacks"]
+            fallbacks[label] = fallbacks.get(label, 0) + 1
+
+    def record_escalation(self, stage, reason):
+        """Count a request sent to a stronger model tier (reason: long_context or invalid_output)."""
+        with self._lock:
+            escalations = self._stage(stage)["escalations"]
+            escalations[reason] = escalations.get(reason, 0) + 1
+
+    def record_parse(self, stage, path):
+        """Count a structured answer by how it was parsed (see structured_output.py)."""
+        with self._lock:
+            parses = self._stage(stage)["parses"]
+            parses[path] = parses.get(path, 0) + 1
+
+    def report(self):
+        """The run report as a JSON-serialisable dict."""
+        with self._lock:
+            stages = json.loads(json.dumps(self._stages))
+
+        tiers = {}
+        totals = {"calls": 0, "cache_hits": 0, "avoided_calls": 0, "errors": 0, "retries": 0, "fallbacks": 0,
+                  "repairs": 0, "parse_failures": 0, "escalations": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        for entry in stages.values():
+            count = entry["calls"]
+            entry["latency"] = {
+                "count": count,
+                "sum_seconds": round(entry.pop("latency_sum"), 3),
+                "buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], entry.pop("latency_buckets")))
+            }
+            entry["latency"]["mean_seconds"] = round(entry["latency"]["sum_seconds"] / count, 3) if count else None
+            entry["latency"]["p50_seconds"] = _bucket_quantile(entry["latency"]["buckets"], count, 0.50)
+            entry["latency"]["p95_seconds"] = _bucket_quantile(entry["latency"]["buckets"], count, 0.95)
+            for model_entry in entry["models"].values():
+                model_entry["cost_usd"] = round(model_entry["cost_usd"], 6)
+                totals["prompt_tokens"] += model_entry["prompt_tokens"]
+                totals["completion_tokens"] += model_entry["completion_tokens"]
+                totals["cost_usd"] += model_entry["cost_usd"]
+            totals["calls"] += count
+            totals["cache_hits"] += entry["cache_hits"]
+            totals["avoided_calls"] += entry["avoided_calls"]
+            totals["errors"] += sum(entry["errors"].values())
+            totals["retries"] += entry["retries"]
+            totals["fallbacks"] += sum(entry["fallbacks"].values())
+            totals["repairs"] += entry["parses"].get("repaired", 0)
+            totals["parse_failures"] += entry["parses"].get("failed", 0)
+            totals["escalations"] += sum(entry["escalations"].values())
+            for tier, tier_entry in entry["tiers"].items():
+                combined = tiers.setdefault(tier, _new_tier())
+                for key in combined:
+                    combined[key] += tier_entry[key]
+                _finish_tier(tier_entry)
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        for tier_entry in tiers.values():
+            _finish_tier(tier_entry)
+
+        return {
+            "started_at": self.started_at,
+            "finished_at": datetime.now().isoformat(),
+            "wall_seconds": round(time.monotonic() - self._start, 3),
+            "totals": totals,
+            "tiers": tiers,
+            "stages": stages
+        }
+
+    def prometheus(self):
+        """The counters in Prometheus text exposition format."""
+        report = self.report()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}")
+
+        stages = report["stages"]
+        metric("calls_total", "counter", "LLM API calls that returned a response.",
+               [({"stage": stage, "model": model}, entry["calls"])
+                for stage, stage_entry in stages.items() for model, entry in stage_entry["models"].items()])
+        metric("cache_hits_total", "counter", "LLM requests answered from the response cache.",
+               [({"stage": stage}, entry["cache_hits"]) for stage, entry in stages.items()])
+        metric("avoided_calls_total", "counter", "LLM requests answered by local rules without an API call.",
+               [({"stage": stage}, entry["avoided_calls"]) for stage, entry in stages.items()])
+        metric("errors_total", "counter", "Failed LLM API calls by error kind.",
+               [({"stage": stage, "error": kind}, count)
+                for stage, entry in stages.items() for kind, count in entry["errors"].items()])
+        metric("retries_total", "counter", "LLM API calls retried after an error.",
+               [({"stage": stage}, entry["retries"]) for stage, entry in stages.items()])
+        metric("fallbacks_total", "counter", "Fallback values written instead of an LLM answer.",
+               [({"stage": stage, "label": label}, count)
+                for stage, entry in stages.items() for label, count in entry["fallbacks"].items()])
+        metric("parses_total", "counter", "Structured LLM answers by parse path (strict, lenient, repaired, failed).",
+               [({"stage": stage, "path": path}, count)
+                for stage, entry in stages.items() for path, count in entry["parses"].items()])
+        metric("escalations_total", "counter", "Requests sent to a stronger model tier, by reason.",
+               [({"stage": stage, "reason": reason}, count)
+                for stage, entry in stages.items() for reason, count in entry["escalations"].items()])
+        metric("tier_calls_total", "counter", "LLM API calls by model tier.",
+               [({"stage": stage, "tier": tier}, entry["calls"])
+                for stage, stage_entry in stages.items() for tier, entry in stage_entry["tiers"].items()])
+        metric("tier_latency_seconds_sum", "counter", "Total LLM API call latency by model tier.",
+               [({"stage": stage, "tier": tier}, entry["latency_sum_seconds"])
+                for stage, stage_entry in stages.items() for tier, entry in stage_entry["tiers"].items()])
+        metric("tier_cost_usd_total", "counter", "Estimated API cost in USD by model tier.",
+               [({"stage": stage, "tier": tier}, entry["cost_usd"])
+                for stage, stage_entry in stages.items() for tier, entry in stage_entry["tiers"].items()])
+        metric("tokens_total", "counter", "Tokens reported in response.usage.",
+               [({"stage": stage, "model": model, "kind": kind}, entry[f"{kind}_tokens"])
+                for stage, stage_entry in stages.items() for model, entry in stage_entry["models"].items()
+                for kind in ("prompt", "completion")])
+        metric("cost_usd_total", "counter", "Estimated API cost in USD.",
+               [({"stage": stage, "model": model}, entry["cost_usd"])
+                for stage, stage_entry in stages.items() for model, entry in stage_entry["models"].items()])
+
+        lines.append(f"# HELP {METRIC_PREFIX}_latency_seconds LLM API call latency.")
+        lines.append(f"# TYPE {METRIC_PREFIX}_latency_seconds histogram")
+        for stage, entry in stages.items():
+            cumulative = 0
+            for bound, count in entry["latency"]["buckets"].items():
+                cumulative += count
+                lines.append(f'{METRIC_PREFIX}_latency_seconds_bucket{{stage="{_escape(stage)}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_PREFIX}_latency_seconds_sum{{stage="{_escape(stage)}"}} {entry["latency"]["sum_seconds"]}')
+            lines.append(f'{METRIC_PREFIX}_latency_seconds_count{{stage="{_escape(stage)}"}} {entry["latency"]["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One-line human readable summary of the run."""
+        totals = self.report()["totals"]
+        return (f"LLM metrics: {totals['calls']} calls, {totals['cache_hits']} cache hits, "
+                f"{totals['avoided_calls']} calls avoided, "
+                f"{totals['errors']} errors, {totals['retries']} retries, {totals['fallbacks']} fallbacks, "
+                f"{totals['repairs']} repairs, {totals['escalations']} escalations, "
+                f"{totals['prompt_tokens'] + totals['completion_tokens']} tokens (~${totals['cost_usd']:.4f})")
+
+
+def _finish_tier(entry):
+    """Turn a tier's latency sum into report fields and round its cost."""
+    latency_sum = entry.pop("latency_sum")
+    entry["latency_sum_seconds"] = round(latency_sum, 3)
+    entry["mean_latency_seconds"] = round(latency_sum / entry["calls"], 3) if entry["calls"] else None
+    entry["cost_usd"] = round(entry["cost_usd"], 6)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _bucket_quantile(buckets, count, quantile):
+    """Upper bound of the histogram bucket containing the quantile (None past the last bound)."""
+    if not count:
+        return None
+    target = quantile * count
+    cumulative = 0
+    for bound, bucket_count in buckets.items():
+        cumulative += bucket_count
+        if cumulative >= target:
+            return None if bound == "+Inf" else float(bound)
+    return None
+
+
+def _write_atomic(path, text):
+    # The textfile collector may read at any moment, so never expose a partial file
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+_metrics = PipelineMetrics()
+
+
+def get_metrics():
+    """Return the process-wide metrics used by llm_client and the stage scripts."""
+    return _metrics
+
+
+def reset_metrics():
+    global _metrics
+    _metrics = PipelineMetrics()
+    return _metrics
+
+
+def add_metrics_arguments(parser):
+    """Register the shared metrics output flags on an argparse parser."""
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics-report", default=None,
+                       help="Write a JSON run report (calls, latency, tokens, errors, fallbacks, cost) to this file")
+    group.add_argument("--metrics-prom", default=None,
+                       help="Write the metrics in Prometheus textfile format to this file")
+
+
+def write_metrics_from_args(args):
+    """Print the metrics summary and write the files requested by add_metrics_arguments() flags."""
+    metrics = get_metrics()
+    print(metrics.summary())
+    if args.metrics_report:
+        _write_atomic(args.metrics_report, json.dumps(metrics.report(), indent=2) + "\n")
+        print(f"✓ Metrics report saved to {args.metrics_report}")
+    if args.metrics_prom:
+        _write_atomic(args.metrics_prom, metrics.prometheus())
+        print(f"✓ Prometheus metrics saved to {args.metrics_prom}")
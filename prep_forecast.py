@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Kitchen Prep Forecast
+Loads every order (dish, dietary variant, price, date and party size) into
+columnar NumPy arrays once, then aggregates with vectorized group-bys instead
+of loops over nested diners: per-date, per-dish, per-dietary-variant order
+counts and revenue, and rolling-window forecasts for upcoming service dates.
+A forecast takes each dish variant's orders per guest over the window before
+the service date and scales them to each upcoming date's booked guests (or
+the window's average guests per day when nothing is booked yet). The result
+is written as a prep list JSON.
+
+Dishes are grouped the way the dashboard groups them: spelling variants share
+a name and a variant is the sorted set of dietary tags ("standard" without tags).
+
+Usage:
+    python prep_forecast.py --service-date 2025-01-15 --days 7
+    python prep_forecast.py --input bench/dataset.jsonl --window-days 56
+"""
+
+import argparse
+import json
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from build_dashboard_index import normalize_dish_name
+from data_io import iter_records, write_json_atomic
+from detailed_format import iter_denormalized
+
+DETAILED_INFO_PATH = "src/detailed_info.json"
+OUTPUT_PATH = "prep_list.json"
+
+DEFAULT_WINDOW_DAYS = 28
+DEFAULT_FORECAST_DAYS = 7
+STANDARD_VARIANT = "standard"
+
+
+def variant_name(dietary_tags):
+    tags = sorted(dietary_tags or [])
+    return ", ".join(tags) if tags else STANDARD_VARIANT
+
+
+class Categories:
+    """Interns labels to consecutive integer codes."""
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class OrderColumns:
+    """
+    Orders and reservations as parallel arrays. Orders: day, dish, variant
+    and price; reservations: day and party size. Days are datetime64[D];
+    reservations without a valid date are left out.
+    """
+
+    def __init__(self, diners):
+        self.dishes = Categories()
+        self.variants = Categories()
+        order_days, dish_codes, variant_codes, prices = [], [], [], []
+        reservation_days, reservation_party = [], []
+
+        for diner in iter_denormalized(diners):
+            for reservation in diner.get("reservations", []):
+                day = reservation.get("date") or ""
+                party_size = reservation.get("number_of_people") or 0
+                reservation_days.append(day)
+                reservation_party.append(party_size)
+                for order in reservation.get("orders", []):
+                    order_days.append(day)
+                    dish_codes.append(self.dishes.code(normalize_dish_name(order.get("item", ""))))
+                    variant_codes.append(self.variants.code(variant_name(order.get("dietary_tags"))))
+                    prices.append(order.get("price", 0))
+
+        order_day = self._days(order_days)
+        valid = ~np.isnat(order_day)
+        self.day = order_day[valid]
+        self.dish = np.asarray(dish_codes, dtype=np.int32)[valid]
+        self.variant = np.asarray(variant_codes, dtype=np.int32)[valid]
+        self.price = np.asarray(prices, dtype=np.float64)[valid]
+
+        reservation_day = self._days(reservation_days)
+        valid = ~np.isnat(reservation_day)
+        self.reservation_day = reservation_day[valid]
+        self.reservation_party = np.asarray(reservation_party, dtype=np.int64)[valid]
+
+    @staticmethod
+    def _days(texts):
+        """datetime64[D] array of YYYY-MM-DD strings; missing or malformed dates become NaT."""
+        try:
+            return np.array(texts, dtype="datetime64[D]")
+        except ValueError:
+            days = np.empty(len(texts), dtype="datetime64[D]")
+            for index, text in enumerate(texts):
+                try:
+                    days[index] = np.datetime64(text, "D")
+                except ValueError:
+                    days[index] = np.datetime64("NaT")
+            return days
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def item_count(self):
+        return len(self.dishes.labels) * len(self.variants.labels)
+
+    def item_codes(self):
+        """One code per (dish, variant) pair."""
+        return self.dish.astype(np.int64) * len(self.variants.labels) + self.variant
+
+    def item_label(self, item):
+        dish, variant = divmod(int(item), len(self.variants.labels))
+        return self.dishes.labels[dish], self.variants.labels[variant]
+
+
+def daily_mix(columns):
+    """
+    Per-date, per-dish, per-variant order counts and revenue:
+    [{"date", "guests", "orders", "revenue", "dishes": [{"name", "variant", "orders", "revenue"}]}] by date.
+    """
+    if not len(columns):
+        return []
+    first = columns.day.min()
+    one_day = np.timedelta64(1, "D")
+    span = int((columns.day.max() - first) // one_day) + 1
+
+    # Renumber the (dish, variant) pairs that occur, so the bins below stay small
+    item_codes = columns.item_codes()
+    observed = np.flatnonzero(np.bincount(item_codes, minlength=columns.item_count))
+    compact = np.zeros(columns.item_count, dtype=np.int64)
+    compact[observed] = np.arange(len(observed))
+    item_count = len(observed)
+
+    # Dense (day, item) bins: one bincount instead of sorting millions of keys
+    keys = ((columns.day - first) // one_day).astype(np.int64) * item_count + compact[item_codes]
+    counts = np.bincount(keys, minlength=span * item_count)
+    revenue = np.bincount(keys, weights=columns.price, minlength=span * item_count)
+    groups = np.flatnonzero(counts)
+    group_day, group_item = np.divmod(groups, item_count)
+
+    # Within a date: most ordered first, then by dish name and variant
+    labels = [columns.item_label(item) for item in observed]
+    label_rank = np.empty(item_count, dtype=np.int64)
+    label_rank[sorted(range(item_count), key=lambda item: (labels[item][0].casefold(), labels[item][1]))] = \
+        np.arange(item_count)
+    order = np.lexsort((label_rank[group_item], -counts[groups], group_day))
+    groups, group_day, group_item = groups[order], group_day[order], group_item[order]
+
+    guest_days = (columns.reservation_day >= first) & (columns.reservation_day <= columns.day.max())
+    guests = np.bincount(((columns.reservation_day[guest_days] - first) // one_day).astype(np.int64),
+                         weights=columns.reservation_party[guest_days], minlength=span)
+    day_orders = counts.reshape(span, item_count).sum(axis=1)
+    day_revenue = revenue.reshape(span, item_count).sum(axis=1)
+
+    group_counts = counts[groups].tolist()
+    group_revenue = np.round(revenue[groups], 2).tolist()
+    bounds = np.searchsorted(group_day, np.arange(span + 1)).tolist()
+    result = []
+    for offset in np.unique(group_day).tolist():
+        dishes = [
+            {"name": labels[item][0], "variant": labels[item][1], "orders": count, "revenue": amount}
+            for item, count, amount in zip(group_item[bounds[offset]:bounds[offset + 1]].tolist(),
+                                           group_counts[bounds[offset]:bounds[offset + 1]],
+                                           group_revenue[bounds[offset]:bounds[offset + 1]])
+        ]
+        result.append({
+            "date": str(first + offset * one_day),
+            "guests": int(guests[offset]),
+            "orders": int(day_orders[offset]),
+            "revenue": round(float(day_revenue[offset]), 2),
+            "dishes": dishes
+        })
+    return result
+
+
+def forecast(columns, service_date, days=DEFAULT_FORECAST_DAYS, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Prep forecasts for service_date and the following days - 1 dates: the
+    orders per guest of every dish variant over the window_days before
+    service_date, scaled to each date's expected guests.
+    """
+    start = np.datetime64(service_date, "D")
+    window_start = start - window_days
+    one_day = np.timedelta64(1, "D")
+
+    in_window = (columns.day >= window_start) & (columns.day < start)
+    window_orders = np.bincount(columns.item_codes()[in_window], minlength=columns.item_count)
+    reservations_in_window = (columns.reservation_day >= window_start) & (columns.reservation_day < start)
+    window_guests = float(columns.reservation_party[reservations_in_window].sum())
+    per_guest = window_orders / window_guests if window_guests else np.zeros(columns.item_count)
+
+    upcoming = (columns.reservation_day >= start) & (columns.reservation_day < start + days)
+    offsets = ((columns.reservation_day[upcoming] - start) // one_day).astype(np.int64)
+    booked = np.bincount(offsets, weights=columns.reservation_party[upcoming], minlength=days)
+
+    items = np.flatnonzero(window_orders)
+    results = []
+    for offset in range(days):
+        expected_guests = float(booked[offset]) if booked[offset] else window_guests / window_days
+        expected = per_guest[items] * expected_guests
+        entries = []
+        for item, quantity in zip(items, expected):
+            name, variant = columns.item_label(item)
+            entries.append({"name": name, "variant": variant,
+                            "expected": round(float(quantity), 1), "prep": int(np.ceil(quantity))})
+        entries.sort(key=lambda entry: (-entry["expected"], entry["name"].casefold(), entry["variant"]))
+        results.append({
+            "date": str(start + offset * one_day),
+            "booked_guests": int(booked[offset]),
+            "expected_guests": round(expected_guests, 1),
+            "items": entries
+        })
+    return results
+
+
+def build_prep_list(columns, service_date, days=DEFAULT_FORECAST_DAYS, window_days=DEFAULT_WINDOW_DAYS):
+    history = {"orders": len(columns)}
+    if len(columns):
+        history.update({"first_date": str(columns.day.min()), "last_date": str(columns.day.max()),
+                        "revenue": round(float(columns.price.sum()), 2)})
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "service_date": str(service_date),
+        "window_days": window_days,
+        "history": history,
+        "forecast": forecast(columns, service_date, days, window_days),
+        "daily": daily_mix(columns)
+    }
+
+
+def main():
+    """Command line entry point for the prep forecast."""
+    parser = argparse.ArgumentParser(description="Forecast kitchen prep quantities from the order history")
+    parser.add_argument("--input", default=DETAILED_INFO_PATH,
+                        help="Detailed info or dataset, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--output", default=OUTPUT_PATH,
+                        help="Where to write the prep list (default: %(default)s)")
+    parser.add_argument("--service-date", type=lambda text: datetime.strptime(text, "%Y-%m-%d").date(),
+                        default=None, help="First date to forecast, YYYY-MM-DD (default: today)")
+    parser.add_argument("--days", type=int, default=DEFAULT_FORECAST_DAYS,
+                        help="Number of dates to forecast (default: %(default)s)")
+    parser.add_argument("--window-days", type=int, default=DEFAULT_WINDOW_DAYS,
+                        help="History days each forecast is based on (default: %(default)s)")
+    args = parser.parse_args()
+    service_date = args.service_date or date.today()
+
+    try:
+        load_start = time.perf_counter()
+        columns = OrderColumns(iter_records(args.input, "diners"))
+        load_seconds = time.perf_counter() - load_start
+    except FileNotFoundError:
+        print(f"Error: {args.input} not found. Please run generate_insights.py first.")
+        return
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Invalid JSON in {args.input}: {e}")
+        return
+
+    start = time.perf_counter()
+    prep_list = build_prep_list(columns, service_date, args.days, args.window_days)
+    seconds = time.perf_counter() - start
+    write_json_atomic(args.output, prep_list)
+
+    print(f"✓ Loaded {len(columns)} orders in {load_seconds:.2f}s, aggregated and forecast in {seconds:.3f}s")
+    for day in prep_list["forecast"]:
+        top = ", ".join(f"{item['prep']} {item['name']} ({item['variant']})" for item in day["items"][:3])
+        print(f"  {day['date']}: {day['expected_guests']:g} guests - {top or 'no history'}")
+    print(f"✓ Saved the prep list to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Customer Prompt Context
+Shared builder for the reviews/emails context embedded in the insight and
+justification prompts. A customer's context is rendered once and reused for
+every prompt about them. Quoted email history and near-duplicate reviews are
+removed first (see dedup.py), and a per-call token budget keeps heavy guests'
+prompts bounded: overly long reviews and email threads are shortened first,
+then the least relevant entries (other restaurants' reviews, oldest first)
+are dropped until the context fits. Customers without repeated content and
+within budget get exactly the same text as before, so cached responses stay
+valid.
+
+Inspect how a dataset fares against the budgets with:
+    python prompt_context.py src/fine-dining-dataset.json
+"""
+
+import argparse
+
+from data_io import iter_records
+from dedup import DedupStats, dedupe_customer
+from venues import get_venue
+
+# Rough token estimate used throughout the pipeline (see rate_limiter.estimate_tokens)
+CHARS_PER_TOKEN = 4
+
+# Context budgets per call, excluding the fixed instructions around the context
+INSIGHTS_CONTEXT_TOKENS = 3000
+JUSTIFICATION_CONTEXT_TOKENS = 1500
+
+# Single reviews or email threads longer than this are shortened before anything is dropped
+MAX_ENTRY_TOKENS = 500
+TRUNCATION_MARKER = " […]"
+
+# Rendering of each prompt family; the formats match the original prompts exactly
+STYLES = {
+    "insights": {
+        "reviews_header": "PREVIOUS REVIEWS:\n",
+        "review": "- {restaurant_name}: {content} (Rating: {rating})\n",
+        "emails_header": "RECENT EMAILS:\n",
+        "email": "- Subject: {subject}\n  Content: {combined_thread}\n"
+    },
+    "justification": {
+        "reviews_header": "Customer Reviews:\n",
+        "review": "- {restaurant_name} ({rating}/5): {content}\n",
+        "emails_header": "Customer Emails:\n",
+        "email": "- Subject: {subject}\n  Content: {combined_thread}\n"
+    }
+}
+
+
+def estimate_text_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def shorten(text, max_tokens):
+    """Cut text to roughly max_tokens, ending on a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut + TRUNCATION_MARKER
+
+
+def render_review(review, style, max_tokens=None):
+    content = review.get("content", "")
+    if max_tokens:
+        content = shorten(content, max_tokens)
+    return STYLES[style]["review"].format(
+        restaurant_name=review.get("restaurant_name", ""),
+        content=content,
+        rating=review.get("rating", "N/A")
+    )
+
+
+def render_email(email, style, max_tokens=None):
+    thread = email.get("combined_thread", "")
+    if max_tokens:
+        thread = shorten(thread, max_tokens)
+    return STYLES[style]["email"].format(subject=email.get("subject", ""), combined_thread=thread)
+
+
+def _relevance(kind, entry, venue):
+    """Sort key: higher is kept longer. Emails are about the upcoming visit, then reviews of this venue."""
+    if kind == "email":
+        rank = 2
+    elif entry.get("restaurant_name") == venue:
+        rank = 1
+    else:
+        rank = 0
+    return rank, entry.get("date") or ""
+
+
+class CustomerContext:
+    """
+    The rendered reviews and emails sections for one customer and prompt style,
+    trimmed to a token budget. Build it once per customer and pass it to every
+    prompt builder for that customer.
+    """
+
+    def __init__(self, customer_data, style="justification", token_budget=None, venue=None):
+        self.style = style
+        self.token_budget = token_budget
+        customer_data, self.dedup = dedupe_customer(customer_data)
+        reviews = customer_data.get("reviews") or []
+        emails = customer_data.get("emails") or []
+        self.omitted_reviews = 0
+        self.omitted_emails = 0
+        self.shortened = False
+
+        review_lines = [render_review(review, style) for review in reviews]
+        email_lines = [render_email(email, style) for email in emails]
+        self.reviews_text, self.emails_text = self._sections(review_lines, email_lines)
+        self.full_tokens = self.tokens
+
+        if token_budget and self.full_tokens > token_budget:
+            review_lines, email_lines = self._trim(reviews, emails, venue or get_venue().name)
+            self.reviews_text, self.emails_text = self._sections(review_lines, email_lines)
+
+        if self.omitted_reviews or self.omitted_emails:
+            self.emails_text += f"({self._omitted_note()})\n"
+
+    def _sections(self, review_lines, email_lines):
+        reviews_text = STYLES[self.style]["reviews_header"] + "".join(review_lines) if review_lines else ""
+        emails_text = STYLES[self.style]["emails_header"] + "".join(email_lines) if email_lines else ""
+        return reviews_text, emails_text
+
+    def _trim(self, reviews, emails, venue):
+        """Shorten long entries, then drop the least relevant ones until the budget is met."""
+        style = self.style
+        entries = (
+            [("review", index, review, render_review(review, style, MAX_ENTRY_TOKENS)) for index, review in enumerate(reviews)]
+            + [("email", index, email, render_email(email, style, MAX_ENTRY_TOKENS)) for index, email in enumerate(emails)]
+        )
+        self.shortened = any(TRUNCATION_MARKER in line for _, _, _, line in entries)
+
+        headers = STYLES[style]["reviews_header"] + STYLES[style]["emails_header"]
+        total = estimate_text_tokens(headers) + sum(estimate_text_tokens(line) for _, _, _, line in entries)
+        dropped = set()
+        for kind, index, entry, line in sorted(entries, key=lambda item: _relevance(item[0], item[2], venue)):
+            # Always keep the single most relevant entry, even if it alone exceeds the budget
+            if total <= self.token_budget or len(dropped) == len(entries) - 1:
+                break
+            dropped.add((kind, index))
+            total -= estimate_text_tokens(line)
+            if kind == "review":
+                self.omitted_reviews += 1
+            else:
+                self.omitted_emails += 1
+
+        # Surviving entries keep their original order
+        review_lines = [line for kind, index, _, line in entries if kind == "review" and (kind, index) not in dropped]
+        email_lines = [line for kind, index, _, line in entries if kind == "email" and (kind, index) not in dropped]
+        return review_lines, email_lines
+
+    def _omitted_note(self):
+        parts = []
+        if self.omitted_reviews:
+            parts.append(f"{self.omitted_reviews} older or less relevant review{'s' if self.omitted_reviews != 1 else ''}")
+        if self.omitted_emails:
+            parts.append(f"{self.omitted_emails} older email{'s' if self.omitted_emails != 1 else ''}")
+        return " and ".join(parts) + " omitted for length"
+
+    @property
+    def trimmed(self):
+        return self.shortened or bool(self.omitted_reviews or self.omitted_emails)
+
+    @property
+    def tokens(self):
+        return estimate_text_tokens(self.reviews_text + self.emails_text)
+
+
+def build_insights_context(customer_data, token_budget=INSIGHTS_CONTEXT_TOKENS):
+    """Context block of the insight-generation prompt."""
+    context = CustomerContext(customer_data, "insights", token_budget)
+    text = f"Customer: {customer_data.get('name', 'Unknown')}\n\n"
+    if context.reviews_text:
+        text += context.reviews_text + "\n"
+    if context.emails_text:
+        text += context.emails_text + "\n"
+    return text
+
+
+def build_justification_context(customer_data, token_budget=JUSTIFICATION_CONTEXT_TOKENS):
+    """Reviews and emails sections shared by all of a customer's justification prompts."""
+    return CustomerContext(customer_data, "justification", token_budget)
+
+
+def main():
+    """Report how many customers exceed the context budgets and the tokens trimming saves."""
+    parser = argparse.ArgumentParser(description="Check a dataset's prompt context sizes against the token budgets")
+    parser.add_argument("input", help="Dataset or detailed info, wrapped JSON or .jsonl")
+    parser.add_argument("--style", choices=sorted(STYLES), default="insights")
+    parser.add_argument("--budget", type=int, default=None,
+                        help=f"Token budget (default: {INSIGHTS_CONTEXT_TOKENS} for insights, {JUSTIFICATION_CONTEXT_TOKENS} for justifications)")
+    args = parser.parse_args()
+    budget = args.budget or (INSIGHTS_CONTEXT_TOKENS if args.style == "insights" else JUSTIFICATION_CONTEXT_TOKENS)
+
+    customers = trimmed = full_tokens = sent_tokens = largest = 0
+    dedup = DedupStats()
+    for diner in iter_records(args.input, "diners"):
+        context = CustomerContext(diner, args.style, budget)
+        customers += 1
+        trimmed += context.trimmed
+        full_tokens += context.full_tokens
+        sent_tokens += context.tokens
+        largest = max(largest, context.full_tokens)
+        dedup.add(context.dedup)
+
+    print(f"Customers: {customers}")
+    print(f"Over the {budget}-token budget: {trimmed}")
+    print(f"Largest context: ~{largest} tokens")
+    print(f"Repeated content removed: ~{dedup.tokens_saved} tokens ({dedup.reviews_dropped} reviews, "
+          f"{dedup.emails_dropped} emails, {dedup.paragraphs_dropped} quoted or repeated paragraphs)")
+    print(f"Context tokens per prompt round: ~{full_tokens} untrimmed, ~{sent_tokens} with the budget")
+
+
+if __name__ == "__main__":
+    main()
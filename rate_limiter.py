@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting for OpenAI API Calls
+Token-bucket limiter that enforces both a requests-per-minute and a
+tokens-per-minute budget. It replaces the fixed time.sleep() delays in the
+pipeline scripts and can be shared by synchronous and asyncio callers.
+"""
+
+import asyncio
+import threading
+import time
+
+# Default budgets, kept below the usual tier limits for the mini models
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200000
+
+
+def estimate_tokens(messages, max_tokens=0):
+    """Roughly estimate the tokens a chat completion will consume (~4 chars per token)."""
+
+    characters = sum(len(message.get("content") or "") for message in messages)
+    # Each message carries a few tokens of role/formatting overhead
+    return characters // 4 + 4 * len(messages) + (max_tokens or 0)
+
+
+class RateLimiter:
+    """Token bucket limiting requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        # Buckets start full so short runs are not throttled at all
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Top up both buckets for the time elapsed since the last refill."""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def _reserve(self, tokens):
+        """Reserve capacity for one request and return how long the caller must wait."""
+        with self._lock:
+            self._refill()
+            wait = 0.0
+
+            if self.requests_per_minute:
+                self._request_allowance -= 1
+                if self._request_allowance < 0:
+                    wait = max(wait, -self._request_allowance * 60.0 / self.requests_per_minute)
+
+            if self.tokens_per_minute:
+                # A single request can never need more than a full bucket
+                self._token_allowance -= min(tokens, self.tokens_per_minute)
+                if self._token_allowance < 0:
+                    wait = max(wait, -self._token_allowance * 60.0 / self.tokens_per_minute)
+
+            return wait
+
+    def acquire(self, tokens=0):
+        """Block until a request of the given token size may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=0):
+        """Wait (without blocking the event loop) until a request may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Reservation Query Engine
+Loads detailed_info.json (and optionally dishes.json for table numbers) once
+into compact slotted records and builds secondary indexes by date, table,
+accommodation, dietary tag and dish, so filtered and aggregate questions are
+answered from the indexes instead of a scan over nested diners, reservations
+and orders. It is also the shared place for order and revenue totals used by
+extract_dishes.py, the pipeline and the dashboard build.
+
+Examples:
+    python reservation_query.py dishes --date 2024-05-20 --tag nut-free
+    python reservation_query.py reservations --start 2024-05-20 --end 2024-05-26 --accommodation wheelchair
+    python reservation_query.py top-dishes --by revenue --limit 5
+    python reservation_query.py revenue --by-date
+"""
+
+import argparse
+import bisect
+import re
+import sys
+
+from data_io import iter_records
+from detailed_format import iter_denormalized
+
+DETAILED_INFO_PATH = "src/detailed_info.json"
+# Where extract_dishes.py writes the parties and every other script reads them
+DISHES_PATH = "src/dishes.json"
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def order_total(orders):
+    """Total price of a reservation's orders, as stored in dishes.json."""
+    return round(sum(order.get("price", 0) for order in orders), 2)
+
+
+def total_revenue(parties):
+    """Revenue of a list of parties from extract_dishes.py."""
+    return round(sum(party.get("total_cost", 0) for party in parties), 2)
+
+
+def _key(text):
+    return sys.intern(str(text).strip().lower())
+
+
+def _words(text):
+    return set(WORD.findall(str(text).lower()))
+
+
+class ReservationRecord:
+    """One reservation with the fields the queries need."""
+
+    __slots__ = ("id", "customer", "date", "party_size", "table", "total_cost", "accommodations", "orders")
+
+    def __init__(self, id, customer, date, party_size, table, total_cost, accommodations, orders):
+        self.id = id
+        self.customer = customer
+        self.date = date
+        self.party_size = party_size
+        self.table = table
+        self.total_cost = total_cost
+        self.accommodations = accommodations
+        self.orders = orders
+
+    def as_dict(self, index):
+        return {
+            "customer": self.customer,
+            "date": self.date,
+            "party_size": self.party_size,
+            "table": self.table,
+            "total_cost": self.total_cost,
+            "accommodations": list(self.accommodations),
+            "dishes": [index.order_records[order_id].name for order_id in self.orders]
+        }
+
+
+class OrderRecord:
+    """One ordered dish."""
+
+    __slots__ = ("id", "reservation", "name", "price", "tags")
+
+    def __init__(self, id, reservation, name, price, tags):
+        self.id = id
+        self.reservation = reservation
+        self.name = name
+        self.price = price
+        self.tags = tags
+
+
+class ReservationIndex:
+    """
+    Reservations and orders with secondary indexes. Filters combine by
+    intersecting index entries; date ranges use a sorted list of dates.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.order_records = []
+        self.by_date = {}
+        self.by_table = {}
+        self.by_accommodation_word = {}
+        self.orders_by_tag = {}
+        self.orders_by_dish = {}
+        self.dates = []
+
+    @classmethod
+    def from_data(cls, diners, parties=None):
+        """Build the index from detailed_info diners and, optionally, the matching dishes.json parties."""
+        index = cls()
+        # extract_dishes.py numbers parties in detailed_info reservation order
+        parties_by_id = {party.get("party_id"): party for party in parties or []}
+        for diner in iter_denormalized(diners):
+            for reservation in diner.get("reservations", []):
+                party = parties_by_id.get(len(index.records) + 1)
+                if party and (party.get("customer_name"), party.get("date")) != (diner.get("name"), reservation.get("date")):
+                    party = None
+                index.add(diner, reservation, party)
+        index.dates = sorted(index.by_date)
+        return index
+
+    @classmethod
+    def load(cls, detailed_path=DETAILED_INFO_PATH, dishes_path=None):
+        parties = list(iter_records(dishes_path, "parties")) if dishes_path else None
+        return cls.from_data(iter_records(detailed_path, "diners"), parties)
+
+    def add(self, diner, reservation, party=None):
+        reservation_id = len(self.records)
+        insights = (reservation.get("notes") or {}).get("customer_insights") or {}
+        accommodations = tuple(
+            (party.get("special_accommodations") if party else None) or insights.get("special_accommodations") or []
+        )
+        orders = reservation.get("orders", [])
+        order_ids = []
+        for order in orders:
+            order_id = len(self.order_records)
+            name = sys.intern(order.get("item", ""))
+            tags = tuple(_key(tag) for tag in order.get("dietary_tags", []))
+            self.order_records.append(OrderRecord(order_id, reservation_id, name, order.get("price", 0), tags))
+            order_ids.append(order_id)
+            for tag in tags:
+                self.orders_by_tag.setdefault(tag, []).append(order_id)
+            self.orders_by_dish.setdefault(_key(name), []).append(order_id)
+
+        date = sys.intern(reservation.get("date") or "")
+        table = party.get("table_number") if party else None
+        self.records.append(ReservationRecord(
+            reservation_id, diner.get("name"), date, reservation.get("number_of_people") or 0,
+            table, order_total(orders), accommodations, tuple(order_ids)
+        ))
+        self.by_date.setdefault(date, []).append(reservation_id)
+        if table is not None:
+            self.by_table.setdefault(table, []).append(reservation_id)
+        for accommodation in accommodations:
+            for word in _words(accommodation):
+                self.by_accommodation_word.setdefault(word, set()).add(reservation_id)
+
+    def _date_ids(self, date=None, start=None, end=None):
+        if date is not None:
+            return set(self.by_date.get(date, []))
+        low = bisect.bisect_left(self.dates, start) if start else 0
+        high = bisect.bisect_right(self.dates, end) if end else len(self.dates)
+        return {reservation_id for day in self.dates[low:high] for reservation_id in self.by_date[day]}
+
+    def _order_ids(self, tag=None, dish=None):
+        """Order ids matching a tag and/or dish name, or None for no order filter."""
+        matches = None
+        if tag is not None:
+            matches = set(self.orders_by_tag.get(_key(tag), []))
+        if dish is not None:
+            dish_orders = set(self.orders_by_dish.get(_key(dish), []))
+            matches = dish_orders if matches is None else matches & dish_orders
+        return matches
+
+    def reservation_ids(self, date=None, start=None, end=None, table=None, accommodation=None, tag=None, dish=None):
+        """Ids of the reservations matching every given filter, in date then input order."""
+        candidates = None
+
+        def narrow(ids):
+            nonlocal candidates
+            candidates = set(ids) if candidates is None else candidates & set(ids)
+
+        if date is not None or start or end:
+            narrow(self._date_ids(date, start, end))
+        if table is not None:
+            narrow(self.by_table.get(table, []))
+        if accommodation:
+            # Every word must appear: "quiet table" matches "Quiet table near the window"
+            for word in _words(accommodation):
+                narrow(self.by_accommodation_word.get(word, set()))
+        order_ids = self._order_ids(tag, dish)
+        if order_ids is not None:
+            narrow(self.order_records[order_id].reservation for order_id in order_ids)
+
+        ids = range(len(self.records)) if candidates is None else candidates
+        return sorted(ids, key=lambda reservation_id: (self.records[reservation_id].date, reservation_id))
+
+    def reservations(self, **filters):
+        return [self.records[reservation_id] for reservation_id in self.reservation_ids(**filters)]
+
+    def orders(self, tag=None, dish=None, **filters):
+        """Orders matching tag/dish in the reservations matching the other filters."""
+        order_ids = self._order_ids(tag, dish)
+        results = []
+        for reservation_id in self.reservation_ids(tag=tag, dish=dish, **filters):
+            for order_id in self.records[reservation_id].orders:
+                if order_ids is None or order_id in order_ids:
+                    results.append(self.order_records[order_id])
+        return results
+
+    def top_dishes(self, limit=10, by="revenue", **filters):
+        """[(dish, orders, revenue)] for the matching orders, highest revenue (or count) first."""
+        totals = {}
+        for order in self.orders(**filters):
+            count, revenue = totals.get(order.name, (0, 0.0))
+            totals[order.name] = (count + 1, revenue + order.price)
+        position = 1 if by == "count" else 2
+        ranked = sorted(((name, count, round(revenue, 2)) for name, (count, revenue) in totals.items()),
+                        key=lambda item: (-item[position], item[0]))
+        return ranked[:limit]
+
+    def revenue(self, **filters):
+        return round(sum(record.total_cost for record in self.reservations(**filters)), 2)
+
+    def revenue_by_date(self, **filters):
+        totals = {}
+        for record in self.reservations(**filters):
+            totals[record.date] = totals.get(record.date, 0.0) + record.total_cost
+        return {date: round(total, 2) for date, total in sorted(totals.items())}
+
+
+def add_filter_arguments(parser):
+    parser.add_argument("--date", help="Exact reservation date (YYYY-MM-DD)")
+    parser.add_argument("--start", help="First date of a range (inclusive)")
+    parser.add_argument("--end", help="Last date of a range (inclusive)")
+    parser.add_argument("--table", type=int, help="Table number (needs --dishes)")
+    parser.add_argument("--accommodation", help="Words that must appear in a special accommodation, e.g. wheelchair")
+    parser.add_argument("--tag", help="Dietary tag of an ordered dish, e.g. nut-free")
+    parser.add_argument("--dish", help="Dish name")
+
+
+def filters_from_args(args):
+    return {key: getattr(args, key) for key in ("date", "start", "end", "table", "accommodation", "tag", "dish")
+            if getattr(args, key) is not None}
+
+
+def main():
+    """Command line entry point for reservation queries."""
+    parser = argparse.ArgumentParser(description="Query reservations, dishes and revenue from detailed_info and dishes")
+    parser.add_argument("--detailed", default=DETAILED_INFO_PATH,
+                        help="Detailed info, wrapped JSON or .jsonl (default: %(default)s)")
+    parser.add_argument("--dishes", default=DISHES_PATH,
+                        help="Parties with table numbers, wrapped JSON or .jsonl; '' to skip (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_filter_arguments(commands.add_parser("reservations", help="List matching reservations"))
+    add_filter_arguments(commands.add_parser("dishes", help="List matching ordered dishes"))
+    top = commands.add_parser("top-dishes", help="Rank dishes by revenue or order count")
+    add_filter_arguments(top)
+    top.add_argument("--by", choices=("revenue", "count"), default="revenue")
+    top.add_argument("--limit", type=int, default=10)
+    revenue = commands.add_parser("revenue", help="Total revenue of matching reservations")
+    add_filter_arguments(revenue)
+    revenue.add_argument("--by-date", action="store_true", help="Break the revenue down per date")
+    args = parser.parse_args()
+
+    try:
+        index = ReservationIndex.load(args.detailed, args.dishes or None)
+    except FileNotFoundError as e:
+        print(f"Error: {e.filename} not found. Please run generate_insights.py and extract_dishes.py first.")
+        return
+    except ValueError as e:
+        print(f"Error: Invalid JSON input: {e}")
+        return
+    filters = filters_from_args(args)
+
+    if args.command == "reservations":
+        records = index.reservations(**filters)
+        for record in records:
+            table = f"table {record.table}" if record.table is not None else "no table"
+            needs = f" - {', '.join(record.accommodations)}" if record.accommodations else ""
+            print(f"{record.date}  {table:<9} {record.customer} ({record.party_size} guests, ${record.total_cost:.2f}){needs}")
+        print(f"{len(records)} reservations")
+    elif args.command == "dishes":
+        orders = index.orders(**filters)
+        for order in orders:
+            record = index.records[order.reservation]
+            tags = f" [{', '.join(order.tags)}]" if order.tags else ""
+            print(f"{record.date}  {order.name} (${order.price:.2f}){tags} - {record.customer}")
+        print(f"{len(orders)} dishes")
+    elif args.command == "top-dishes":
+        for rank, (name, count, dish_revenue) in enumerate(index.top_dishes(args.limit, args.by, **filters), 1):
+            print(f"{rank:>3}. {name:<35} {count:>5} orders  ${dish_revenue:>10.2f}")
+    else:
+        if args.by_date:
+            for date, date_revenue in index.revenue_by_date(**filters).items():
+                print(f"{date}  ${date_revenue:.2f}")
+        print(f"Total revenue: ${index.revenue(**filters):.2f}")
+
+
+if __name__ == "__main__":
+    main()
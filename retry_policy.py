@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Retries and Adaptive Concurrency for API Calls
+Shared retry policy for llm_client.py. Transient failures (429 rate limits,
+5xx errors, timeouts, dropped connections) are retried with exponential
+backoff and full jitter, honouring the server's Retry-After header, and a
+per-run retry budget stops an outage from turning into a retry storm. The
+OpenAI clients are created with max_retries=0 so every retry goes through
+here and shows up in the pipeline metrics.
+
+AdaptiveConcurrency is an AIMD window for concurrent callers: it grows by
+about one slot per window of successful calls and halves on 429s, 5xx errors
+and timeouts, so throughput settles just below the provider's limit.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Per-call attempts and the backoff curve (seconds)
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+# Longest Retry-After honoured before the call is given up on
+MAX_RETRY_AFTER = 120.0
+
+# Retries per run may not exceed this fraction of calls (plus a fixed allowance for short runs)
+DEFAULT_RETRY_BUDGET = 0.2
+RETRY_BUDGET_ALLOWANCE = 20
+
+# Per-request timeout for the OpenAI clients; timeouts are retried like 5xx errors
+REQUEST_TIMEOUT = 60.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+OVERLOAD_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Matched by class name so this module does not need the openai package
+TRANSIENT_ERROR_NAMES = {"APITimeoutError", "APIConnectionError", "TimeoutError", "ConnectionError", "TimeoutException"}
+
+
+def _is_transient(error):
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def is_retryable(error):
+    """True for errors worth retrying: rate limits, server errors, timeouts and connection errors."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return _is_transient(error)
+
+
+def is_overload(error):
+    """True for errors that mean the provider is saturated and concurrency should back off."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in OVERLOAD_STATUS_CODES
+    return _is_transient(error)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (retry-after-ms or Retry-After), or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """Caps the retries of a whole run at a fraction of its calls."""
+
+    def __init__(self, ratio=DEFAULT_RETRY_BUDGET, allowance=RETRY_BUDGET_ALLOWANCE):
+        self.ratio = ratio
+        self.allowance = allowance
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_spend(self):
+        """Take one retry from the budget; False once the run has used its share."""
+        with self._lock:
+            if self.retries >= self.allowance + self.ratio * self.calls:
+                self.exhausted += 1
+                if self.exhausted == 1:
+                    print(f"Warning: retry budget exhausted after {self.retries} retries over {self.calls} calls; "
+                          "failing calls are no longer retried")
+                return False
+            self.retries += 1
+            return True
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a failed call."""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, budget=None, seed=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def next_delay(self, retries, error):
+        """Seconds to wait before the next attempt, or None to give up and re-raise."""
+        if retries >= self.max_retries or not is_retryable(error):
+            return None
+
+        requested = retry_after(error)
+        if requested is not None and requested > MAX_RETRY_AFTER:
+            return None
+        if not self.budget.try_spend():
+            return None
+
+        with self._rng_lock:
+            if requested is not None:
+                # A little jitter keeps callers told the same Retry-After from returning in lockstep
+                return requested + self._rng.uniform(0, self.base_delay)
+            return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** retries))
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency window shared by threads or asyncio tasks. acquire() returns
+    a token to hand back to release() with the call's outcome ("success",
+    "overload" or "error"). Only calls started after the last decrease can shrink
+    the window again, so one burst of 429s halves it once rather than to the floor.
+    """
+
+    def __init__(self, maximum, initial=None, minimum=1, decrease=0.5):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.decrease = decrease
+        self.limit = float(initial or max(minimum, self.maximum // 2))
+        self.in_flight = 0
+        self.peak = self.limit
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._async_waiters = []
+
+    def _try_acquire(self):
+        with self._condition:
+            if self.in_flight < max(self.minimum, int(self.limit)):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= max(self.minimum, int(self.limit)):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while not self._try_acquire():
+            waiter = loop.create_future()
+            self._async_waiters.append(waiter)
+            await waiter
+        return time.monotonic()
+
+    def release(self, started, outcome="success"):
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == "success":
+                # Additive increase: about one extra slot per window of successful calls
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+                self.peak = max(self.peak, self.limit)
+            elif outcome == "overload" and started >= self._last_decrease:
+                self.limit = max(float(self.minimum), self.limit * self.decrease)
+                self._last_decrease = time.monotonic()
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    def summary(self):
+        return f"Adaptive concurrency: {int(self.limit)} now, peak {int(self.peak)} of {self.maximum}"
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_policy = RetryPolicy()
+
+
+def configure_retries(max_retries=DEFAULT_MAX_RETRIES, budget=DEFAULT_RETRY_BUDGET, **options):
+    """Replace the process-wide retry policy used by llm_client."""
+    global _policy
+    _policy = RetryPolicy(max_retries=max_retries, budget=RetryBudget(budget), **options)
+    return _policy
+
+
+def get_retry_policy():
+    return _policy
+
+
+def add_retry_arguments(parser):
+    """Register the shared retry flags on an argparse parser."""
+    group = parser.add_argument_group("retries")
+    group.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                       help="Retries per call for 429s, 5xx errors and timeouts (default: %(default)s)")
+    group.add_argument("--retry-budget", type=float, default=DEFAULT_RETRY_BUDGET,
+                       help=f"Retries per run as a fraction of calls, plus {RETRY_BUDGET_ALLOWANCE} (default: %(default)s)")
+
+
+def configure_retries_from_args(args):
+    """Configure the process-wide retry policy from add_retry_arguments() flags."""
+    return configure_retries(max_retries=args.max_retries, budget=args.retry_budget)
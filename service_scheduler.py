@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Deadline-Aware Scheduling
+Orders the diners of a run by how soon they are served instead of by their
+position in the dataset. Diners with a reservation inside the service horizon
+(the service date plus --horizon-days) come first, soonest date first, then
+upcoming reservations beyond the horizon, then past reservations (most recent
+first) and undated ones. Within a date, VIP guests and parties with the most
+special requests go first. Results are put back in dataset order before they
+are written, so party numbering and journal keys do not change.
+
+While a scheduled run is in progress, every date inside the horizon can be
+published as soon as all of its diners are done: its dashboard shard is
+written with insights and tables and added to the manifest, so the kitchen
+sees tonight's service long before a backfill finishes.
+
+Preview the processing order with:
+    python service_scheduler.py src/fine-dining-dataset.json --service-date 2024-05-20
+"""
+
+import argparse
+import re
+from datetime import date, datetime, timedelta
+
+from data_io import iter_records
+from detailed_format import iter_denormalized
+from local_extractor import email_text, find_accommodations
+
+DEFAULT_HORIZON_DAYS = 7
+
+# Buckets in processing order
+IN_HORIZON = 0
+UPCOMING = 1
+PAST = 2
+UNDATED = 3
+BUCKET_NAMES = {IN_HORIZON: "in horizon", UPCOMING: "upcoming", PAST: "past", UNDATED: "undated"}
+
+VIP_PATTERN = re.compile(r"\bVIP\b")
+
+
+def parse_date(text):
+    try:
+        return datetime.strptime(text or "", "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def is_vip(diner):
+    return bool(VIP_PATTERN.search(email_text(diner)))
+
+
+def party_needs(diner, reservation):
+    """Special requests of a party: accommodations in the guest's emails plus dietary tags on its orders."""
+    accommodations = len(find_accommodations(email_text(diner)))
+    return accommodations + sum(len(order.get("dietary_tags") or []) for order in reservation.get("orders", []))
+
+
+class ServiceSchedule:
+    """Processing order for a service date and horizon."""
+
+    def __init__(self, service_date=None, horizon_days=DEFAULT_HORIZON_DAYS, vip_first=True):
+        self.service_date = service_date or date.today()
+        self.horizon_days = horizon_days
+        self.vip_first = vip_first
+
+    @property
+    def horizon_end(self):
+        return self.service_date + timedelta(days=self.horizon_days)
+
+    def urgency(self, date_text):
+        """(bucket, distance in days) of a reservation date; lower sorts first."""
+        day = parse_date(date_text)
+        if day is None:
+            return UNDATED, 0
+        if day < self.service_date:
+            return PAST, (self.service_date - day).days
+        distance = (day - self.service_date).days
+        return (IN_HORIZON if day <= self.horizon_end else UPCOMING), distance
+
+    def in_horizon(self, date_text):
+        return self.urgency(date_text)[0] == IN_HORIZON
+
+    def priority(self, diner):
+        """Sort key of a diner: their most urgent reservation, then VIP status and number of special requests."""
+        diner = next(iter_denormalized([diner]))
+        reservations = diner.get("reservations") or [{}]
+        reservation = min(reservations, key=lambda reservation: self.urgency(reservation.get("date")))
+        bucket, distance = self.urgency(reservation.get("date"))
+        if not self.vip_first:
+            return bucket, distance
+        return bucket, distance, not is_vip(diner), -party_needs(diner, reservation)
+
+    def order(self, diners):
+        """Dataset positions of diners in processing order; ties keep dataset order."""
+        keys = [self.priority(diner) for diner in diners]
+        return sorted(range(len(diners)), key=lambda position: keys[position])
+
+
+def restore_order(results, positions):
+    """Put results produced in the order of positions back into dataset order."""
+    restored = [None] * len(positions)
+    for position, result in zip(positions, results):
+        restored[position] = result
+    return restored
+
+
+class EarlyPublisher:
+    """
+    Tracks which diners of a scheduled run are done and calls publish(diners, date)
+    once every diner with a reservation on a date inside the horizon is done.
+    diners passed to publish are in dataset order, with finished diners replaced
+    by their results.
+    """
+
+    def __init__(self, diners, schedule, publish):
+        self.diners = list(diners)
+        self.publish = publish
+        self.pending = {}
+        self.dates_of = []
+        for diner in iter_denormalized(self.diners):
+            dates = {reservation.get("date") for reservation in diner.get("reservations", [])}
+            dates = sorted(day for day in dates if schedule.in_horizon(day))
+            self.dates_of.append(dates)
+            for day in dates:
+                self.pending[day] = self.pending.get(day, 0) + 1
+        self.published = []
+
+    def done(self, position, result):
+        self.diners[position] = result
+        for day in self.dates_of[position]:
+            self.pending[day] -= 1
+            if self.pending[day] == 0:
+                self.publish(self.diners, day)
+                self.published.append(day)
+
+
+def dashboard_publisher(output_dir):
+    """publish(diners, date) for EarlyPublisher writing the date's dashboard shard with locally assigned tables."""
+    # Imported here so the scheduler itself stays free of the OpenAI dependency
+    from build_dashboard_index import publish_dates
+    from extract_dishes import iter_parties, iter_table_requests
+    from table_assignment import assign_tables
+    from venues import get_venue
+
+    def publish(diners, day):
+        requests = [request for request in iter_table_requests(diners) if request["date"] == day]
+        table_numbers = assign_tables(requests, get_venue().layout)
+        parties = [party for party in iter_parties(diners, table_numbers) if party["date"] == day]
+        on_date = [diner for diner in iter_denormalized(diners)
+                   if any(reservation.get("date") == day for reservation in diner.get("reservations", []))]
+        publish_dates(on_date, parties, [day], output_dir)
+        print(f"✓ Published {day} early ({len(parties)} parties) to {output_dir}")
+
+    return publish
+
+
+class ScheduledRun:
+    """
+    One scheduled pass over a list of diners: process .diners (in schedule
+    order) passing each result to .sink, then take .results() in dataset order.
+    With publish, dates inside the horizon are published as they complete.
+    """
+
+    def __init__(self, diners, schedule, publish=None):
+        diners = list(diners)
+        self.positions = schedule.order(diners)
+        self.diners = [diners[position] for position in self.positions]
+        self.publisher = EarlyPublisher(diners, schedule, publish) if publish else None
+        self.completed = []
+
+    def sink(self, result):
+        if self.publisher:
+            self.publisher.done(self.positions[len(self.completed)], result)
+        self.completed.append(result)
+
+    def results(self):
+        return restore_order(self.completed, self.positions)
+
+
+def add_schedule_arguments(parser):
+    """Register the shared scheduling flags on an argparse parser."""
+    group = parser.add_argument_group("scheduling")
+    group.add_argument("--schedule", action="store_true",
+                       help="Process diners by reservation date relative to the service date instead of dataset order")
+    group.add_argument("--service-date", type=lambda text: datetime.strptime(text, "%Y-%m-%d").date(), default=None,
+                       help="First service date of the horizon, YYYY-MM-DD (default: today)")
+    group.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS,
+                       help="Days after the service date processed first and published early (default: %(default)s)")
+    group.add_argument("--no-vip-first", dest="vip_first", action="store_false",
+                       help="Within a date, keep dataset order instead of putting VIP and high-needs parties first")
+
+
+def schedule_from_args(args):
+    """ServiceSchedule from add_schedule_arguments() flags, or None when --schedule is off."""
+    if not args.schedule:
+        return None
+    return ServiceSchedule(args.service_date, args.horizon_days, args.vip_first)
+
+
+def main():
+    """Print the processing order of a dataset."""
+    parser = argparse.ArgumentParser(description="Preview the deadline-aware processing order of a dataset")
+    parser.add_argument("input", help="Dataset or detailed info, wrapped JSON or .jsonl")
+    parser.add_argument("--limit", type=int, default=20, help="Diners to list (default: %(default)s)")
+    add_schedule_arguments(parser)
+    args = parser.parse_args()
+    args.schedule = True
+    schedule = schedule_from_args(args)
+
+    diners = list(iter_records(args.input, "diners"))
+    positions = schedule.order(diners)
+    print(f"Service date {schedule.service_date}, horizon until {schedule.horizon_end}")
+    counts = {}
+    for diner in diners:
+        bucket = schedule.priority(diner)[0]
+        counts[bucket] = counts.get(bucket, 0) + 1
+    print(", ".join(f"{counts.get(bucket, 0)} {name}" for bucket, name in BUCKET_NAMES.items()))
+
+    for rank, position in enumerate(positions[:args.limit], 1):
+        diner = next(iter_denormalized([diners[position]]))
+        dates = ", ".join(sorted(reservation.get("date") or "undated" for reservation in diner.get("reservations", [])))
+        vip = " VIP" if is_vip(diner) else ""
+        print(f"{rank:>4}. {diner.get('name', 'Unknown')} ({dates}){vip} - dataset position {position + 1}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,45 @@
-import React, { useState, useEffect } from 'react';
-import detailedData from './detailed_info.json';
-import dishesData from './dishes.json';
+import React, { useState, useEffect, useMemo } from 'react';
 import './App.css';
 
+// Dashboard data is sharded by date (see build_dashboard_index.py): the manifest lists
+// the dates, and a date's shard is only fetched when that date is shown. Reservations
+// in the shards are pre-shaped and ranked, and dishes are already grouped.
+const DATA_URL = `${process.env.PUBLIC_URL}/data`;
+
+const fetchJson = (url) => fetch(url).then(response => {
+  if (!response.ok) {
+    throw new Error(`Could not load ${url} (${response.status})`);
+  }
+  return response.json();
+});
+
+// Same Day and Chef views span every date, so combine the per-date dish groups
+const mergeDishes = (shards) => {
+  const dishesMap = new Map();
+  
+  shards.forEach(shard => {
+    shard.dishes.forEach(dish => {
+      if (!dishesMap.has(dish.name)) {
+        dishesMap.set(dish.name, new Map());
+      }
+      const variations = dishesMap.get(dish.name);
+      
+      dish.variations.forEach(variation => {
+        const existingVariation = variations.get(variation.variation);
+        if (existingVariation) {
+          existingVariation.quantity += variation.quantity;
+          existingVariation.orders = existingVariation.orders.concat(variation.orders);
+        } else {
+          variations.set(variation.variation, { ...variation });
+        }
+      });
+    });
+  });
+  
+  return Array.from(dishesMap, ([name, variations]) => ({ name, variations: Array.from(variations.values()) }))
+    .sort((a, b) => a.name.localeCompare(b.name));
+};
+
 function App() {
   const [currentDate, setCurrentDate] = useState('');
   const [availableDates, setAvailableDates] = useState([]);
@@ -16,108 +53,69 @@ function App() {
   const [searchTerm, setSearchTerm] = useState('');
   const [deletedTables, setDeletedTables] = useState(new Set());
 
-  useEffect(() => {
-    // Extract all unique reservation dates and sort them
-    const reservationDates = new Set();
-    
-    detailedData.diners.forEach(diner => {
-      diner.reservations.forEach(reservation => {
-        reservationDates.add(reservation.date);
-      });
-    });
-
-    const sortedDates = Array.from(reservationDates).sort();
-    setAvailableDates(sortedDates);
-    
-    // Set to earliest date
-    if (sortedDates.length > 0) {
-      setCurrentDate(sortedDates[0]);
-    }
-  }, []);
+  const [manifest, setManifest] = useState(null);
+  const [shards, setShards] = useState({});
 
   useEffect(() => {
-    // Get reservations for current date
-    const reservations = [];
-    
-    detailedData.diners.forEach(diner => {
-      diner.reservations.forEach(reservation => {
-        if (reservation.date === currentDate) {
-          reservations.push({
-            ...reservation,
-            guestName: diner.name,
-            guestData: diner
-          });
+    // The manifest lists the reservation dates, already sorted
+    fetchJson(`${DATA_URL}/manifest.json`)
+      .then(data => {
+        setManifest(data);
+        const sortedDates = data.dates.map(entry => entry.date);
+        setAvailableDates(sortedDates);
+        
+        // Set to earliest date
+        if (sortedDates.length > 0) {
+          setCurrentDate(sortedDates[0]);
         }
-      });
-    });
-
-    setReservationsForDate(reservations);
-  }, [currentDate]);
+      })
+      .catch(error => console.error(error));
+  }, []);
 
-  // Calculate priority score for ranking in Same Day View
-  const calculatePriority = (reservation, guestData) => {
-    let score = 0;
-    
-    // Order cost scoring (higher cost = higher priority)
-    const totalOrderCost = reservation.orders.reduce((sum, order) => sum + order.price, 0);
-    score += totalOrderCost * 2; // 2 points per dollar
-    
-    // Special accommodations scoring (high weight for needs)
-    if (reservation.notes?.customer_insights?.special_accommodations) {
-      score += reservation.notes.customer_insights.special_accommodations.length * 50;
+  // Fetch the shards of the given dates that are not loaded yet
+  const loadShards = (dates) => {
+    const missing = manifest.dates.filter(entry => dates.includes(entry.date) && !shards[entry.date]);
+    if (missing.length === 0) {
+      return;
     }
     
-    // Dietary restrictions scoring (high weight for needs)
-    const dietaryTags = reservation.orders.reduce((acc, order) => acc + order.dietary_tags.length, 0);
-    score += dietaryTags * 30;
-    
-    // Email complexity (longer emails indicate more special requests)
-    if (guestData.emails && guestData.emails.length > 0) {
-      const avgEmailLength = guestData.emails.reduce((acc, email) => acc + email.combined_thread.length, 0) / guestData.emails.length;
-      if (avgEmailLength > 200) score += 25;
-      if (avgEmailLength > 400) score += 25; // Extra points for very long emails
+    Promise.all(missing.map(entry => fetchJson(`${DATA_URL}/${entry.file}?v=${manifest.version}`)))
+      .then(loaded => setShards(prev => {
+        const next = { ...prev };
+        loaded.forEach(shard => { next[shard.date] = shard; });
+        return next;
+      }))
+      .catch(error => console.error(error));
+  };
+
+  useEffect(() => {
+    if (manifest && currentDate) {
+      loadShards([currentDate]);
     }
-    
-    // Additional customer values that indicate high maintenance
-    if (reservation.notes?.customer_insights?.customer_values) {
-      const highMaintenanceValues = ['personalized service', 'confidential atmosphere', 'enthusiastic staff'];
-      const matches = reservation.notes.customer_insights.customer_values.filter(value => 
-        highMaintenanceValues.some(hmv => value.toLowerCase().includes(hmv.toLowerCase()))
-      );
-      score += matches.length * 15;
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [manifest, currentDate]);
+
+  useEffect(() => {
+    // Same Day and Chef views cover every date, so they load all shards on first use
+    if (manifest && currentView !== 'different') {
+      loadShards(availableDates);
     }
-    
-    return score;
-  };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [manifest, currentView]);
+
+  useEffect(() => {
+    // Get reservations for current date, highest priority first
+    setReservationsForDate(shards[currentDate]?.reservations || []);
+  }, [shards, currentDate]);
+
+  const loadedShards = useMemo(
+    () => availableDates.map(date => shards[date]).filter(Boolean),
+    [shards, availableDates]
+  );
 
   // Get all reservations for Same Day View
-  const getAllReservations = () => {
-    const allReservations = [];
-    
-    detailedData.diners.forEach(diner => {
-      diner.reservations.forEach(reservation => {
-        // Count only special accommodations as "needs"
-        const specialAccommodationsCount = reservation.notes?.customer_insights?.special_accommodations?.length || 0;
-        
-        // Keep dietary restrictions separate for display purposes
-        const dietaryRestrictionsCount = reservation.orders.reduce((acc, order) => acc + order.dietary_tags.length, 0);
-        
-        // Calculate total order cost
-        const totalOrderCost = reservation.orders.reduce((sum, order) => sum + order.price, 0);
-        
-        allReservations.push({
-          ...reservation,
-          guestName: diner.name,
-          guestData: diner,
-          totalNeeds: specialAccommodationsCount, // Only special accommodations count as "needs"
-          totalCost: totalOrderCost,
-          needsBreakdown: {
-            specialAccommodations: specialAccommodationsCount,
-            dietaryRestrictions: dietaryRestrictionsCount
-          }
-        });
-      });
-    });
+  const allRankedReservations = useMemo(() => {
+    const allReservations = loadedShards.flatMap(shard => shard.reservations);
     
     // Sort by special accommodations (descending), then by price (descending)
     return allReservations.sort((a, b) => {
@@ -126,7 +124,12 @@ function App() {
       }
       return b.totalCost - a.totalCost; // Highest price first if tied
     });
-  };
+  }, [loadedShards]);
+
+  const allParties = useMemo(() => loadedShards.flatMap(shard => shard.parties), [loadedShards]);
+  const allDishes = useMemo(() => mergeDishes(loadedShards), [loadedShards]);
+
+  const getAllReservations = () => allRankedReservations;
 
   const formatDate = (dateString) => {
     const date = new Date(dateString);
@@ -359,7 +362,7 @@ function App() {
 
   // Chef View Functions
   const getGroupsData = () => {
-    return dishesData.parties
+    return allParties
       .filter(party => !deletedTables.has(party.party_id))
       .filter(party => 
         searchTerm === '' || 
@@ -371,57 +374,22 @@ function App() {
   };
 
   const getDishesData = () => {
-    const dishesMap = new Map();
-    
-    // Normalize dish names to group similar dishes
-    const normalizeDishName = (dishName) => {
-      return dishName.replace(/^Boeuf\b/i, 'Beef');
-    };
-    
-    dishesData.parties
-      .filter(party => !deletedTables.has(party.party_id))
-      .forEach(party => {
-        party.dishes.forEach(dish => {
-          const normalizedName = normalizeDishName(dish.name);
-          const dishKey = normalizedName;
-          if (!dishesMap.has(dishKey)) {
-            dishesMap.set(dishKey, {
-              name: normalizedName,
-              variations: []
-            });
-          }
-          
-          // Create variation key based on dietary exceptions
-          const variationKey = dish.dietary_exceptions.length > 0 ? 
-            dish.dietary_exceptions.sort().join(', ') : 'standard';
-          
-          const existingVariation = dishesMap.get(dishKey).variations.find(v => v.variation === variationKey);
-          
-          if (existingVariation) {
-            existingVariation.orders.push({
-              party_id: party.party_id,
-              table_number: party.table_number,
-              customer_name: party.customer_name,
-              price: dish.price
-            });
-            existingVariation.quantity += 1;
-          } else {
-            dishesMap.get(dishKey).variations.push({
-              variation: variationKey,
-              dietary_exceptions: dish.dietary_exceptions,
-              quantity: 1,
-              orders: [{
-                party_id: party.party_id,
-                table_number: party.table_number,
-                customer_name: party.customer_name,
-                price: dish.price
-              }]
-            });
-          }
-        });
-      });
+    // Dishes are grouped by name and dietary exceptions in the shards; only deleted tables are removed here
+    if (deletedTables.size === 0) {
+      return allDishes;
+    }
     
-    return Array.from(dishesMap.values()).sort((a, b) => a.name.localeCompare(b.name));
+    return allDishes
+      .map(dish => ({
+        ...dish,
+        variations: dish.variations
+          .map(variation => {
+            const orders = variation.orders.filter(order => !deletedTables.has(order.party_id));
+            return { ...variation, orders, quantity: orders.length };
+          })
+          .filter(variation => variation.orders.length > 0)
+      }))
+      .filter(dish => dish.variations.length > 0);
   };
 
   const deleteTable = (tableId) => {
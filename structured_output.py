@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Structured Output Schemas, Lenient Parsing and Repair
+JSON schemas for the answers the pipeline parses (customer insights and table
+numbers), sent as the request's response_format so the API enforces them.
+When an answer still does not parse, it is not thrown away: a lenient local
+parser first strips code fences and surrounding chatter and fixes trailing
+commas, and only if that fails is the model asked to repair its own output,
+with a short prompt that carries just the broken answer instead of the
+customer's whole context. Every answer is counted by the path that produced
+it (strict, lenient, repaired or failed) in the pipeline metrics.
+"""
+
+import json
+import re
+
+from pipeline_metrics import get_metrics
+
+# Parse paths recorded in the metrics
+STRICT = "strict"
+LENIENT = "lenient"
+REPAIRED = "repaired"
+FAILED = "failed"
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Every insight field; strict schemas need each listed property to be required, so absent answers are null or []
+INSIGHT_PROPERTIES = {
+    "customer_values": _STRING_LIST,
+    "is_new_customer": {"type": ["boolean", "null"]},
+    "special_accommodations": _STRING_LIST,
+    "taste_preferences": {"type": ["string", "null"]},
+    "staff_interaction_preferences": _STRING_LIST,
+    "personal_interests": _STRING_LIST
+}
+
+TABLE_NUMBER_SCHEMA = {
+    "type": "object",
+    "properties": {"table_number": {"type": "integer"}},
+    "required": ["table_number"],
+    "additionalProperties": False
+}
+
+REPAIR_MARKER = "Broken response:"
+REPAIR_SYSTEM_PROMPT = "You repair malformed JSON. Respond only with the corrected JSON, keeping its content unchanged."
+
+CODE_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)\s*```", re.DOTALL)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+INTEGER = re.compile(r"-?\d+")
+
+
+class StructuredOutputError(ValueError):
+    """Raised when an answer cannot be turned into the expected structure."""
+
+
+def insights_schema(fields):
+    """Strict JSON schema for an insights object with the given fields (in order)."""
+    return {
+        "type": "object",
+        "properties": {field: INSIGHT_PROPERTIES[field] for field in fields},
+        "required": list(fields),
+        "additionalProperties": False
+    }
+
+
+def json_schema_format(name, schema):
+    """response_format value asking the API for output matching schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def _decode_first_object(text):
+    """Decode the first JSON object in text, ignoring anything around it."""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[{\[]", text):
+        try:
+            value, _ = decoder.raw_decode(text, match.start())
+            return value
+        except json.JSONDecodeError:
+            continue
+    raise StructuredOutputError("no JSON value found")
+
+
+def parse_json_lenient(text, expected=dict):
+    """
+    Parse a JSON answer, returning (value, path). Plain JSON is STRICT; answers
+    that needed code fences, surrounding text or trailing commas removed are
+    LENIENT. Raises StructuredOutputError when neither works.
+    """
+    try:
+        value = json.loads(text)
+        if isinstance(value, expected):
+            return value, STRICT
+    except json.JSONDecodeError:
+        pass
+
+    fenced = CODE_FENCE.search(text)
+    candidates = [fenced.group(1)] if fenced else []
+    candidates.append(text)
+    for candidate in candidates:
+        for cleaned in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                value = _decode_first_object(cleaned)
+            except StructuredOutputError:
+                continue
+            if isinstance(value, expected):
+                return value, LENIENT
+    raise StructuredOutputError(f"expected a JSON {expected.__name__}")
+
+
+def parse_table_number(text):
+    """Parse a table number answer ({"table_number": n} or a bare number), returning (number, path)."""
+    stripped = text.strip()
+    if re.fullmatch(r"-?\d+", stripped):
+        return int(stripped), STRICT
+    try:
+        value, path = parse_json_lenient(stripped)
+    except StructuredOutputError:
+        value, path = None, LENIENT
+    if isinstance(value, dict) and isinstance(value.get("table_number"), int):
+        return value["table_number"], path
+
+    # "Table 7." and similar: accept a single number in free text, but not in broken JSON where it may be cut off
+    numbers = INTEGER.findall(stripped)
+    if len(numbers) == 1 and "{" not in stripped:
+        return int(numbers[0]), LENIENT
+    raise StructuredOutputError("expected a table number")
+
+
+def build_repair_request(request, broken_text):
+    """
+    A request asking the model to fix its own malformed answer. It carries only
+    the broken output and the schema, not the original prompt, and keeps the
+    request's model, output budget and response_format.
+    """
+    response_format = request.get("response_format") or {}
+    schema = (response_format.get("json_schema") or {}).get("schema")
+    instruction = "This response should be valid JSON but could not be parsed. Fix it without changing its content."
+    if schema:
+        instruction += f"\nIt must match this JSON schema:\n{json.dumps(schema)}"
+    repair_request = {
+        "model": request["model"],
+        "messages": [
+            {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{instruction}\n\n{REPAIR_MARKER}\n{broken_text}"}
+        ],
+        "temperature": 0,
+        "max_tokens": request.get("max_tokens")
+    }
+    if response_format:
+        repair_request["response_format"] = response_format
+    return repair_request
+
+
+def parse_structured(text, stage, parser=parse_json_lenient, repair=None):
+    """
+    Parse an answer with parser, asking repair(broken_text) -> text for a fixed
+    answer when it cannot be parsed. Records the parse path under stage and
+    raises StructuredOutputError if the answer stays unusable.
+    """
+    metrics = get_metrics()
+    try:
+        value, path = parser(text)
+        metrics.record_parse(stage, path)
+        return value
+    except StructuredOutputError:
+        if repair is None:
+            metrics.record_parse(stage, FAILED)
+            raise
+
+    try:
+        value, _ = parser(repair(text))
+    except Exception as e:
+        metrics.record_parse(stage, FAILED)
+        raise StructuredOutputError(f"repair failed: {e}") from e
+    metrics.record_parse(stage, REPAIRED)
+    return value
+
+
+async def parse_structured_async(text, stage, parser=parse_json_lenient, repair=None):
+    """Async variant of parse_structured() for an async repair(broken_text) coroutine function."""
+    metrics = get_metrics()
+    try:
+        value, path = parser(text)
+        metrics.record_parse(stage, path)
+        return value
+    except StructuredOutputError:
+        if repair is None:
+            metrics.record_parse(stage, FAILED)
+            raise
+
+    try:
+        value, _ = parser(await repair(text))
+    except Exception as e:
+        metrics.record_parse(stage, FAILED)
+        raise StructuredOutputError(f"repair failed: {e}") from e
+    metrics.record_parse(stage, REPAIRED)
+    return value
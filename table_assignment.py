@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Deterministic Table Assignment
+Local replacement for the per-party LLM table assignment. Each party's size
+and special accommodations are matched against the table attributes of the
+floor plan (size bands, wheelchair access, quiet/private, piano area, VIP),
+and every date is solved as a minimum-cost assignment so no table is given to
+two parties on the same date. An LLM can optionally break ties afterwards: a
+party with special accommodations may be moved to another table that is still
+free on the date and exactly as suitable, which never changes the total cost.
+"""
+
+from collections import defaultdict
+
+# French Laudure floor plan, as described to the LLM in create_table_assignment_prompt()
+DEFAULT_LAYOUT = {
+    "venue": "French Laudure",
+    "size_bands": [
+        {"tables": [1, 2, 3, 4, 5], "min_size": 1, "max_size": 2},
+        {"tables": [6, 7, 8, 9, 10, 11, 12], "min_size": 3, "max_size": 4},
+        {"tables": [13, 14, 15, 16, 17, 18], "min_size": 5, "max_size": 6},
+        {"tables": [19, 20], "min_size": 7, "max_size": None}
+    ],
+    "features": {
+        "wheelchair": [3, 7, 11, 15],
+        "quiet": [1, 8, 14, 20],
+        "piano": [5, 12],
+        "vip": [19, 20]
+    }
+}
+
+# Accommodation phrases that call for a table feature
+FEATURE_KEYWORDS = {
+    "wheelchair": ["wheelchair", "accessible", "accessibility", "mobility", "step-free"],
+    "quiet": ["quiet", "private", "intimate", "secluded", "confidential", "away from", "low noise"],
+    "piano": ["piano", "live music"],
+    "vip": ["vip", "private dining", "celebrity"]
+}
+
+# Features that are needs rather than preferences
+REQUIRED_FEATURES = {"wheelchair"}
+
+# Assignment costs; a table that is too small or lacks a required feature is
+# only used when nothing better is free on that date
+COST_TOO_SMALL = 1000
+COST_MISSING_REQUIRED = 500
+COST_MISSING_PREFERRED = 20
+COST_PER_OVERSIZED_BAND = 10
+COST_UNREQUESTED_VIP = 5
+
+
+def build_tables(layout=None):
+    """Expand a layout into {table_number: {"min_size", "max_size", "band", "features"}}."""
+    layout = layout or DEFAULT_LAYOUT
+    tables = {}
+    for band_index, band in enumerate(layout["size_bands"]):
+        for number in band["tables"]:
+            tables[number] = {
+                "min_size": band["min_size"],
+                "max_size": band["max_size"],
+                "band": band_index,
+                "features": set()
+            }
+    for feature, numbers in layout.get("features", {}).items():
+        for number in numbers:
+            if number in tables:
+                tables[number]["features"].add(feature)
+    return tables
+
+
+def requested_features(special_accommodations):
+    """Map free-text accommodations to table features."""
+    text = " ".join(special_accommodations or []).lower()
+    return {
+        feature
+        for feature, keywords in FEATURE_KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    }
+
+
+def size_band(tables, group_size):
+    """Index of the smallest size band that fits the party."""
+    fitting = [
+        table["band"] for table in tables.values()
+        if table["max_size"] is None or table["max_size"] >= group_size
+    ]
+    return min(fitting) if fitting else max(table["band"] for table in tables.values())
+
+
+def table_cost(table, group_size, features, party_band):
+    """Unscaled cost of seating a party at a table."""
+    cost = 0
+    if table["max_size"] is not None and table["max_size"] < group_size:
+        cost += COST_TOO_SMALL
+    for feature in features:
+        if feature not in table["features"]:
+            cost += COST_MISSING_REQUIRED if feature in REQUIRED_FEATURES else COST_MISSING_PREFERRED
+    cost += COST_PER_OVERSIZED_BAND * max(0, table["band"] - party_band)
+    if "vip" in table["features"] and "vip" not in features:
+        cost += COST_UNREQUESTED_VIP
+    return cost
+
+
+def solve_assignment(costs):
+    """
+    Minimum-cost assignment of rows to distinct columns (Hungarian algorithm).
+    Requires len(costs) <= len(costs[0]); returns the column chosen for each row.
+    """
+    rows = len(costs)
+    if rows == 0:
+        return []
+    columns = len(costs[0])
+    infinity = float("inf")
+
+    # Potentials and matching are 1-indexed, with 0 as the virtual start column
+    u = [0] * (rows + 1)
+    v = [0] * (columns + 1)
+    match = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        match[0] = row
+        column = 0
+        min_value = [infinity] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[column] = True
+            current_row = match[column]
+            delta = infinity
+            next_column = 0
+            for candidate in range(1, columns + 1):
+                if used[candidate]:
+                    continue
+                reduced = costs[current_row - 1][candidate - 1] - u[current_row] - v[candidate]
+                if reduced < min_value[candidate]:
+                    min_value[candidate] = reduced
+                    way[candidate] = column
+                if min_value[candidate] < delta:
+                    delta = min_value[candidate]
+                    next_column = candidate
+            for candidate in range(columns + 1):
+                if used[candidate]:
+                    u[match[candidate]] += delta
+                    v[candidate] -= delta
+                else:
+                    min_value[candidate] -= delta
+            column = next_column
+            if match[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    assignment = [None] * rows
+    for column in range(1, columns + 1):
+        if match[column]:
+            assignment[match[column] - 1] = column - 1
+    return assignment
+
+
+def break_ties(parties, chosen, base_costs, numbers, tiebreaker):
+    """
+    Offer each seated party with special accommodations the tables that are
+    free on the date after solving and cost exactly as much as its own, and
+    move it to the tiebreaker's pick. chosen (column per party) is updated in place.
+    """
+    taken = {column for column in chosen if column is not None}
+    for index, (request, column) in enumerate(zip(parties, chosen)):
+        # Without accommodations the tiebreaker has nothing to weigh the tables on
+        if column is None or not request.get("special_accommodations"):
+            continue
+        cost = base_costs[index][column]
+        candidates = [
+            number for candidate, number in enumerate(numbers)
+            if base_costs[index][candidate] == cost and (candidate == column or candidate not in taken)
+        ]
+        if len(candidates) < 2:
+            continue
+        preferred = tiebreaker(request, candidates)
+        if preferred in candidates and preferred != numbers[column]:
+            taken.discard(column)
+            chosen[index] = numbers.index(preferred)
+            taken.add(chosen[index])
+
+
+def assign_tables(requests, layout=None, tiebreaker=None):
+    """
+    Assign tables to parties without double-booking any table on a date.
+
+    requests is a list of dicts with "party_id", "date", "group_size" and
+    "special_accommodations" (plus anything the tiebreaker needs).
+    tiebreaker(request, candidate_tables) may return a preferred table number
+    when a party with special accommodations could equally well sit at
+    another table that is free on its date (see break_ties()).
+    Returns {party_id: table_number}, with None for parties that could not be
+    seated because the date has more parties than tables.
+    """
+    tables = build_tables(layout)
+    numbers = sorted(tables)
+
+    # Costs are scaled so a small per-table term makes ties deterministic (lower
+    # table numbers first) without changing the optimum: at most len(numbers)
+    # parties are seated, each adding less than len(numbers)
+    scale = len(numbers) ** 2 + 1
+    by_date = defaultdict(list)
+    for request in requests:
+        by_date[request.get("date", "")].append(request)
+
+    assignments = {}
+    for date in sorted(by_date):
+        parties = by_date[date]
+        base_costs = []
+        for request in parties:
+            group_size = request.get("group_size") or 0
+            features = requested_features(request.get("special_accommodations"))
+            party_band = size_band(tables, group_size)
+            base_costs.append([table_cost(tables[number], group_size, features, party_band) for number in numbers])
+        costs = [[cost * scale + index for index, cost in enumerate(row)] for row in base_costs]
+
+        if len(parties) <= len(numbers):
+            chosen = solve_assignment(costs)
+        else:
+            # Overbooked date: assign parties to tables instead, leaving the
+            # parties that fit worst unseated
+            transposed = [list(column) for column in zip(*costs)]
+            chosen = [None] * len(parties)
+            for table_index, party_index in enumerate(solve_assignment(transposed)):
+                chosen[party_index] = table_index
+
+        if tiebreaker:
+            break_ties(parties, chosen, base_costs, numbers, tiebreaker)
+
+        for request, column in zip(parties, chosen):
+            assignments[request["party_id"]] = numbers[column] if column is not None else None
+
+    return assignments
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import data_io
+from data_io import RecordWriter, iter_records
+
+DINERS = [
+    {"name": "Jane \"JD\" Doe", "reviews": [{"text": "Lovely [quiet] {table}, \\ back soon"}], "score": 1.5e3},
+    {"name": "Émile", "emails": [], "vip": True, "notes": None},
+    {"name": "Sam", "count": 12345678901234567890}
+]
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(params=[3, 1 << 16], ids=["tiny-chunks", "default-chunks"])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(data_io, "CHUNK_SIZE", request.param)
+
+
+def test_wrapped_json(tmp_path, chunk_size):
+    path = write(tmp_path, "detailed.json", json.dumps({"diners": DINERS}, indent=2, ensure_ascii=False))
+    assert list(iter_records(path, "diners")) == DINERS
+
+
+def test_jsonl(tmp_path):
+    path = write(tmp_path, "detailed.jsonl", "\n".join(json.dumps(diner) for diner in DINERS) + "\n\n")
+    assert list(iter_records(path, "diners")) == DINERS
+
+
+def test_invalid_jsonl_line_names_the_line(tmp_path):
+    path = write(tmp_path, "detailed.jsonl", json.dumps(DINERS[0]) + "\n{not json\n")
+    with pytest.raises(ValueError, match=":2:"):
+        list(iter_records(path, "diners"))
+
+
+def test_key_nested_before_the_wrapper_is_ignored(tmp_path, chunk_size):
+    document = {
+        "meta": {"diners": [{"name": "nested"}], "note": "\"diners\": [1, 2]"},
+        "version": 2,
+        "flags": [True, None, -0.5],
+        "diners": DINERS,
+        "trailer": {"diners": []}
+    }
+    path = write(tmp_path, "detailed.json", json.dumps(document))
+    assert list(iter_records(path, "diners")) == DINERS
+
+
+def test_missing_or_nested_only_key_is_an_error(tmp_path):
+    path = write(tmp_path, "detailed.json", json.dumps({"meta": {"diners": [1]}, "parties": []}))
+    with pytest.raises(ValueError, match="no top-level 'diners' array"):
+        list(iter_records(path, "diners"))
+
+
+def test_record_writer_round_trips_both_formats(tmp_path, chunk_size):
+    for name in ("out.json", "out.jsonl"):
+        path = str(tmp_path / name)
+        with RecordWriter(path, "parties") as writer:
+            for diner in DINERS:
+                writer.write(diner)
+        assert list(iter_records(path, "parties")) == DINERS
+    assert json.loads((tmp_path / "out.json").read_text(encoding="utf-8")) == {"parties": DINERS}
@@ -0,0 +1,55 @@
+from dedup import dedupe_customer, split_thread
+
+ALLERGY = "My mother uses a wheelchair and is allergic to shellfish, so please seat us accordingly."
+
+
+def customer(*threads):
+    return {"name": "Jane Doe", "reviews": [], "emails": [{"combined_thread": thread} for thread in threads]}
+
+
+def test_unique_quoted_text_is_kept():
+    thread = f"Thanks, see you then!\n\nOn Mon, Jan 6, 2025 Jane wrote:\n> {ALLERGY}"
+    deduped, stats = dedupe_customer(customer(thread))
+    assert ALLERGY in deduped["emails"][0]["combined_thread"]
+    assert not stats.changed
+
+
+def test_quoted_copy_of_an_earlier_email_is_dropped():
+    reply = f"Thanks, see you then!\n\nOn Mon, Jan 6, 2025 Jane wrote:\n> {ALLERGY}"
+    deduped, stats = dedupe_customer(customer(ALLERGY, reply))
+    assert deduped["emails"][0]["combined_thread"] == ALLERGY
+    assert deduped["emails"][1]["combined_thread"] == "Thanks, see you then!"
+    assert stats.paragraphs_dropped == 1
+
+
+def test_quoted_copy_of_the_emails_own_text_is_dropped():
+    thread = f"{ALLERGY}\n-----Original Message-----\n{ALLERGY}"
+    deduped, _ = dedupe_customer(customer(thread))
+    assert deduped["emails"][0]["combined_thread"] == ALLERGY
+
+
+def test_only_the_repeated_part_of_a_quote_is_dropped():
+    earlier = "We would love a table by the window for our anniversary dinner."
+    reply = f"Looking forward to it.\nOn Tue, Jane wrote:\n> {earlier}\n> {ALLERGY}"
+    deduped, _ = dedupe_customer(customer(earlier, reply))
+    kept = deduped["emails"][1]["combined_thread"]
+    assert ALLERGY in kept and earlier not in kept
+
+
+def test_repeated_email_is_dropped():
+    deduped, stats = dedupe_customer(customer(ALLERGY, "Hi,\n" + ALLERGY))
+    assert len(deduped["emails"]) == 1
+    assert stats.emails_dropped == 1
+
+
+def test_customers_without_repeats_are_returned_unchanged():
+    original = customer("Table for two please, we are celebrating a birthday this year.")
+    deduped, stats = dedupe_customer(original)
+    assert deduped is original
+    assert not stats.changed
+
+
+def test_split_thread_marks_quoted_lines():
+    parts = split_thread("Hello\n> > Earlier text\nOn Mon Jane wrote:\nOlder message")
+    assert parts == [(False, "Hello", "Hello"), (True, "Earlier text", "> > Earlier text"),
+                     (True, "Older message", "Older message")]
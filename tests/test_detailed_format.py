@@ -0,0 +1,44 @@
+import copy
+import json
+
+from detailed_format import build_notes, denormalize_diner, normalize_diner
+
+INSIGHTS = {"customer_values": ["quality"], "is_new_customer": False}
+
+
+def legacy_diner(*timestamps, insights=INSIGHTS):
+    return {
+        "name": "Jane Doe",
+        "reservations": [
+            {"date": f"2024-05-{20 + index}", "number_of_people": 2, "orders": [],
+             "notes": build_notes(copy.deepcopy(insights), generated_at)}
+            for index, generated_at in enumerate(timestamps)
+        ]
+    }
+
+
+def round_trip(diner):
+    return denormalize_diner(normalize_diner(diner))
+
+
+def test_identical_notes_are_stored_once():
+    diner = legacy_diner("2024-05-01T10:00:00", "2024-05-01T10:00:00")
+    normalized = normalize_diner(diner)
+    assert all(set(reservation) == {"date", "number_of_people", "orders"} for reservation in normalized["reservations"])
+    assert json.dumps(round_trip(diner)) == json.dumps(diner)
+
+
+def test_per_reservation_timestamps_round_trip():
+    diner = legacy_diner("2024-05-01T10:00:00.000001", "2024-05-01T10:00:00.000042", "2024-05-01T10:00:00.000001")
+    normalized = normalize_diner(diner)
+    assert normalized["reservations"][1]["notes_generated_at"] == "2024-05-01T10:00:00.000042"
+    assert "notes_generated_at" not in normalized["reservations"][2]
+    assert json.dumps(round_trip(diner)) == json.dumps(diner)
+
+
+def test_differing_notes_keep_an_override():
+    diner = legacy_diner("2024-05-01T10:00:00", "2024-05-01T10:00:00")
+    diner["reservations"][1]["notes"] = build_notes({"customer_values": ["speed"]}, "2024-05-02T10:00:00")
+    normalized = normalize_diner(diner)
+    assert normalized["reservations"][1]["notes"]["customer_insights"] == {"customer_values": ["speed"]}
+    assert json.dumps(round_trip(diner)) == json.dumps(diner)
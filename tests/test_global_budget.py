@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from global_budget import BudgetExceededError, GlobalBudget
+
+
+def budget(max_cost_usd):
+    return GlobalBudget(requests_per_minute=None, tokens_per_minute=None, max_cost_usd=max_cost_usd)
+
+
+def test_call_that_cannot_fit_is_refused():
+    limited = budget(0.01)
+    limited.acquire(cost=0.008)
+    limited.record_spend(0.008, 0.008)
+    with pytest.raises(BudgetExceededError):
+        limited.acquire(cost=0.003)
+    limited.acquire(cost=0.002)
+
+
+def test_reservation_is_replaced_by_actual_cost():
+    limited = budget(0.01)
+    limited.acquire(cost=0.006)
+    limited.record_spend(0.001, 0.006)
+    limited.acquire(cost=0.008)
+    assert limited.spent == pytest.approx(0.001)
+
+
+def test_call_waits_for_calls_in_flight_to_settle():
+    limited = budget(0.01)
+    limited.acquire(cost=0.006)
+    settled = threading.Timer(0.1, limited.record_spend, (0.001, 0.006))
+    settled.start()
+    # Only fits once the first call's reservation is replaced by its actual cost
+    limited.acquire(cost=0.006)
+    settled.join()
+    assert limited.spent == pytest.approx(0.001)
+
+
+def test_concurrent_calls_never_exceed_the_limit():
+    limited = budget(0.05)
+
+    def worker():
+        while True:
+            try:
+                limited.acquire(cost=0.004)
+            except BudgetExceededError:
+                return
+            limited.record_spend(0.003, 0.004)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 0.05 - 0.004 < limited.spent <= 0.05
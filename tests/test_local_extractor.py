@@ -0,0 +1,39 @@
+from local_extractor import LocalExtraction, accommodation_categories, find_accommodations
+
+
+def diner(emails=(), reviews=()):
+    return {"name": "Jane Doe",
+            "emails": [{"subject": "Reservation", "combined_thread": text} for text in emails],
+            "reviews": [{"restaurant_name": "Elsewhere", "content": text} for text in reviews]}
+
+
+def test_negated_mentions_are_not_requests():
+    assert find_accommodations("No wheelchair needed, thanks. No nut allergies either.") == []
+    assert find_accommodations("We don't need a high chair, but my father uses a wheelchair.") == ["wheelchair access"]
+
+
+def test_one_accommodation_per_category():
+    assert find_accommodations("He uses a wheelchair and needs step-free access.") == ["wheelchair access"]
+
+
+def test_llm_wording_of_the_same_need_is_not_duplicated():
+    extraction = LocalExtraction(diner(emails=["My mother uses a wheelchair and has a shellfish allergy."]))
+    merged = extraction.merge({"special_accommodations": ["Accessible seating"]})
+    assert merged["special_accommodations"] == ["Accessible seating", "shellfish allergy"]
+
+
+def test_missed_need_is_added():
+    extraction = LocalExtraction(diner(emails=["It's our anniversary; please seat us somewhere quiet corner table."]))
+    merged = extraction.merge({"special_accommodations": ["anniversary dessert"]})
+    assert merged["special_accommodations"] == ["anniversary dessert", "quiet table"]
+
+
+def test_review_only_accommodations_are_left_to_the_llm():
+    extraction = LocalExtraction(diner(reviews=["Lovely food, but they had no wheelchair ramp at all."]))
+    assert "special_accommodations" in extraction.unresolved
+    assert extraction.merge({}) == {}
+
+
+def test_categories_of_llm_wording():
+    assert accommodation_categories("Wheelchair-accessible table") == {"mobility"}
+    assert "nut allergy" in accommodation_categories("nut-free desserts")
@@ -0,0 +1,99 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from build_dashboard_index import normalize_dish_name
+from prep_forecast import OrderColumns, daily_mix, forecast, variant_name
+
+DISHES = ["Coq au Vin", "Bouillabaisse", "Crème Brûlée", "Ratatouille"]
+TAGS = [[], ["vegetarian"], ["gluten-free"], ["gluten-free", "vegetarian"]]
+
+
+def make_diners(seed=5, count=60):
+    rng = random.Random(seed)
+    first = date(2025, 1, 1)
+    diners = []
+    for index in range(count):
+        reservations = []
+        for _ in range(rng.randint(1, 3)):
+            party_size = rng.randint(1, 6)
+            reservations.append({
+                "date": "" if rng.random() < 0.05 else str(first + timedelta(days=rng.randint(0, 40))),
+                "number_of_people": party_size,
+                "orders": [{"item": rng.choice(DISHES), "price": rng.choice([18.5, 32.0, 45.25]),
+                            "dietary_tags": rng.choice(TAGS)} for _ in range(rng.randint(0, party_size))]
+            })
+        diners.append({"name": f"Guest {index}", "reservations": reservations})
+    return diners
+
+
+def dated_reservations(diners):
+    for diner in diners:
+        for reservation in diner["reservations"]:
+            if reservation["date"]:
+                yield reservation
+
+
+def test_daily_mix_matches_a_plain_loop():
+    diners = make_diners()
+    orders = defaultdict(lambda: defaultdict(int))
+    revenue = defaultdict(lambda: defaultdict(float))
+    guests = defaultdict(int)
+    for reservation in dated_reservations(diners):
+        guests[reservation["date"]] += reservation["number_of_people"]
+        for order in reservation["orders"]:
+            item = (normalize_dish_name(order["item"]), variant_name(order["dietary_tags"]))
+            orders[reservation["date"]][item] += 1
+            revenue[reservation["date"]][item] += order["price"]
+
+    mix = daily_mix(OrderColumns(diners))
+    assert [day["date"] for day in mix] == sorted(day for day in orders if orders[day])
+    for day in mix:
+        assert day["guests"] == guests[day["date"]]
+        assert day["orders"] == sum(orders[day["date"]].values())
+        assert day["revenue"] == pytest.approx(sum(revenue[day["date"]].values()))
+        assert {(dish["name"], dish["variant"]): dish["orders"] for dish in day["dishes"]} == orders[day["date"]]
+        for dish in day["dishes"]:
+            assert dish["revenue"] == pytest.approx(revenue[day["date"]][(dish["name"], dish["variant"])])
+        counts = [dish["orders"] for dish in day["dishes"]]
+        assert counts == sorted(counts, reverse=True)
+
+
+def test_forecast_matches_a_plain_loop():
+    diners = make_diners()
+    service_date, days, window_days = date(2025, 1, 29), 7, 14
+    window_start = service_date - timedelta(days=window_days)
+    window_orders = defaultdict(int)
+    window_guests = 0
+    booked = defaultdict(int)
+    for reservation in dated_reservations(diners):
+        day = date.fromisoformat(reservation["date"])
+        if window_start <= day < service_date:
+            window_guests += reservation["number_of_people"]
+            for order in reservation["orders"]:
+                window_orders[(normalize_dish_name(order["item"]), variant_name(order["dietary_tags"]))] += 1
+        elif service_date <= day < service_date + timedelta(days=days):
+            booked[day] += reservation["number_of_people"]
+
+    result = forecast(OrderColumns(diners), str(service_date), days, window_days)
+    assert len(result) == days
+    for offset, entry in enumerate(result):
+        day = service_date + timedelta(days=offset)
+        expected_guests = booked[day] or window_guests / window_days
+        assert entry["date"] == str(day)
+        assert entry["booked_guests"] == booked[day]
+        assert entry["expected_guests"] == pytest.approx(round(expected_guests, 1))
+        items = {(item["name"], item["variant"]): item for item in entry["items"]}
+        assert set(items) == set(window_orders)
+        for key, count in window_orders.items():
+            assert items[key]["expected"] == pytest.approx(round(count / window_guests * expected_guests, 1))
+        assert sum(item["expected"] for item in entry["items"]) == pytest.approx(
+            sum(window_orders.values()) / window_guests * expected_guests, abs=0.05 * len(items))
+
+
+def test_no_orders():
+    columns = OrderColumns([{"name": "Guest", "reservations": [{"date": "2025-01-02", "number_of_people": 2}]}])
+    assert daily_mix(columns) == []
+    assert all(entry["items"] == [] for entry in forecast(columns, "2025-01-03", days=2))
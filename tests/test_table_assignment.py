@@ -0,0 +1,112 @@
+import itertools
+import random
+
+from table_assignment import (DEFAULT_LAYOUT, assign_tables, build_tables, requested_features, size_band,
+                              solve_assignment, table_cost)
+
+SMALL_LAYOUT = {
+    "size_bands": [
+        {"tables": [1, 2], "min_size": 1, "max_size": 2},
+        {"tables": [3, 4], "min_size": 3, "max_size": None}
+    ],
+    "features": {"wheelchair": [2, 4], "quiet": [1]}
+}
+
+
+def party(party_id, group_size, accommodations=(), date="2025-01-06"):
+    return {"party_id": party_id, "date": date, "group_size": group_size,
+            "special_accommodations": list(accommodations)}
+
+
+def brute_force(costs):
+    rows, columns = len(costs), len(costs[0])
+    return min(sum(costs[row][column] for row, column in enumerate(choice))
+               for choice in itertools.permutations(range(columns), rows))
+
+
+def test_solve_assignment_is_optimal():
+    rng = random.Random(7)
+    for _ in range(200):
+        rows = rng.randint(1, 5)
+        columns = rng.randint(rows, 6)
+        costs = [[rng.randint(0, 30) for _ in range(columns)] for _ in range(rows)]
+        chosen = solve_assignment(costs)
+        assert len(set(chosen)) == rows
+        assert sum(costs[row][column] for row, column in enumerate(chosen)) == brute_force(costs)
+
+
+def test_parties_are_seated_by_size_and_needs():
+    assignments = assign_tables([party("a", 2, ["wheelchair user"]), party("b", 4), party("c", 2, ["quiet corner"])],
+                                SMALL_LAYOUT)
+    assert assignments == {"a": 2, "b": 3, "c": 1}
+
+
+def test_no_table_is_double_booked():
+    rng = random.Random(3)
+    requests = [party(i, rng.randint(1, 9), rng.choice([[], ["wheelchair"], ["quiet"], ["piano"]]),
+                      date=f"2025-01-0{rng.randint(1, 3)}") for i in range(45)]
+    assignments = assign_tables(requests)
+    for date in {request["date"] for request in requests}:
+        tables = [assignments[request["party_id"]] for request in requests if request["date"] == date]
+        assert None not in tables
+        assert len(tables) == len(set(tables))
+
+
+def test_overbooked_date_seats_the_best_fitting_parties():
+    requests = [party("wheelchair", 2, ["wheelchair"]), party("pair", 2), party("big", 6), party("extra", 2),
+                party("four", 4), party("another", 2)]
+    assignments = assign_tables(requests, SMALL_LAYOUT)
+    seated = [table for table in assignments.values() if table is not None]
+    assert sorted(seated) == [1, 2, 3, 4]
+    assert assignments["wheelchair"] in (2, 4)
+    assert assignments["big"] in (3, 4) and assignments["four"] in (3, 4)
+    assert list(assignments.values()).count(None) == 2
+
+
+def test_overbooked_date_is_optimal():
+    tables = build_tables(SMALL_LAYOUT)
+    rng = random.Random(11)
+    for _ in range(50):
+        requests = [party(i, rng.randint(1, 6), rng.choice([[], ["wheelchair"], ["quiet"]])) for i in range(6)]
+        costs = [[table_cost(tables[number], request["group_size"],
+                             requested_features(request["special_accommodations"]),
+                             size_band(tables, request["group_size"])) for number in sorted(tables)]
+                 for request in requests]
+        assignments = assign_tables(requests, SMALL_LAYOUT)
+        total = sum(costs[request["party_id"]][assignments[request["party_id"]] - 1]
+                    for request in requests if assignments[request["party_id"]] is not None)
+        transposed = [list(column) for column in zip(*costs)]
+        assert total == brute_force(transposed)
+
+
+def test_large_overbooked_date_fills_every_table():
+    total_tables = sum(len(band["tables"]) for band in DEFAULT_LAYOUT["size_bands"])
+    requests = [party(i, 1 + i % 8, ["wheelchair"] if i % 5 == 0 else []) for i in range(total_tables + 4)]
+    assignments = assign_tables(requests)
+    seated = [table for table in assignments.values() if table is not None]
+    assert len(seated) == total_tables == len(set(seated))
+
+
+def test_tiebreaker_is_offered_only_tied_free_tables():
+    offered = []
+
+    def tiebreaker(request, candidates):
+        offered.append((request["party_id"], candidates))
+        return candidates[-1]
+
+    # Tables 2 and 4 both have wheelchair access, but the group of four takes table 4
+    requests = [party("a", 2, ["wheelchair"]), party("b", 4, ["wheelchair"])]
+    assert assign_tables(requests, SMALL_LAYOUT, tiebreaker) == {"a": 2, "b": 4}
+    assert offered == []
+
+    # Two free small tables tie for a party asking for nothing the layout has
+    offered.clear()
+    assignments = assign_tables([party("a", 2, ["birthday cake"])], SMALL_LAYOUT, tiebreaker)
+    assert offered == [("a", [1, 2])]
+    assert assignments == {"a": 2}
+
+
+def test_tiebreaker_cannot_double_book():
+    requests = [party("a", 2, ["birthday"]), party("b", 2, ["anniversary"])]
+    assignments = assign_tables(requests, SMALL_LAYOUT, lambda request, candidates: 1)
+    assert sorted(assignments.values()) == [1, 2]
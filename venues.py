@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Venue Configuration
+The restaurant a run is for: its name (used in prompts, to recognise guests
+who reviewed the venue before, and to rank its reviews above other
+restaurants' in trimmed prompt context) and its floor plan (table size bands
+and the tables with accommodation features such as wheelchair access). The
+default is French Laudure with the layout in table_assignment.py. Other
+venues are described by a JSON file passed with --venue-config, for example:
+    {"name": "Le Petit Bistro",
+     "layout": {"size_bands": [{"tables": [1, 2, 3], "min_size": 1, "max_size": 2},
+                               {"tables": [4, 5], "min_size": 3, "max_size": null}],
+                "features": {"wheelchair": [1, 4], "quiet": [3]}}}
+
+Check a config and show the table map the LLM is given with:
+    python venues.py --venue-config venues/le-petit-bistro/venue.json
+"""
+
+import argparse
+import json
+
+from table_assignment import DEFAULT_LAYOUT
+
+# How features are described in the table assignment prompt; VIP tables get their own line
+FEATURE_LABELS = {
+    "wheelchair": "wheelchair access",
+    "quiet": "quiet/private",
+    "piano": "piano area"
+}
+VIP_FEATURE = "vip"
+
+
+class Venue:
+    """A restaurant's name and floor plan."""
+
+    def __init__(self, name, layout=None):
+        self.name = name
+        self.layout = layout or DEFAULT_LAYOUT
+        validate_layout(self.layout)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if not config.get("name"):
+            raise ValueError(f"{path}: venue config needs a name")
+        return cls(config["name"], config.get("layout"))
+
+    @property
+    def table_numbers(self):
+        return sorted(number for band in self.layout["size_bands"] for number in band["tables"])
+
+
+def validate_layout(layout):
+    """Raise ValueError for layouts the table engine cannot use."""
+    bands = layout.get("size_bands")
+    if not bands:
+        raise ValueError("layout needs at least one size band")
+    seen = set()
+    for band in bands:
+        if not band.get("tables") or "min_size" not in band or "max_size" not in band:
+            raise ValueError(f"size band {band} needs tables, min_size and max_size")
+        repeated = seen & set(band["tables"])
+        if repeated:
+            raise ValueError(f"tables {sorted(repeated)} appear in more than one size band")
+        seen |= set(band["tables"])
+    for feature, numbers in layout.get("features", {}).items():
+        unknown = set(numbers) - seen
+        if unknown:
+            raise ValueError(f"feature '{feature}' lists tables {sorted(unknown)} that are in no size band")
+
+
+def _table_range(numbers):
+    """'1-5' for a consecutive run of tables, otherwise the numbers joined by commas."""
+    numbers = sorted(numbers)
+    if len(numbers) > 1 and numbers == list(range(numbers[0], numbers[-1] + 1)):
+        return f"{numbers[0]}-{numbers[-1]}"
+    return ",".join(str(number) for number in numbers)
+
+
+def _band_size(band):
+    if band["max_size"] is None:
+        return f"{band['min_size']}+ people"
+    if band["min_size"] in (1, band["max_size"]):
+        return f"{band['max_size']} people"
+    return f"{band['min_size']}-{band['max_size']} people"
+
+
+def describe_layout(venue):
+    """The table map paragraph of the table assignment prompt."""
+    numbers = venue.table_numbers
+    bands = ", ".join(f"{_table_range(band['tables'])} for {_band_size(band)}" for band in venue.layout["size_bands"])
+    lines = [
+        f"Based on this information, assign an appropriate table number ({numbers[0]}-{numbers[-1]}) considering:",
+        f"- Party size (tables {bands})"
+    ]
+    features = venue.layout.get("features", {})
+    needs = [f"{FEATURE_LABELS.get(feature, feature)}: tables {','.join(str(number) for number in tables)}"
+             for feature, tables in features.items() if feature != VIP_FEATURE and tables]
+    if needs:
+        lines.append(f"- Special needs ({'; '.join(needs)})")
+    if features.get(VIP_FEATURE):
+        lines.append(f"- VIP/private dining: tables {','.join(str(number) for number in features[VIP_FEATURE])}")
+    return "\n".join(lines)
+
+
+DEFAULT_VENUE = Venue(DEFAULT_LAYOUT["venue"])
+
+_venue = DEFAULT_VENUE
+
+
+def configure_venue(venue=None):
+    """Replace the process-wide venue (None restores the default)."""
+    global _venue
+    _venue = venue or DEFAULT_VENUE
+    return _venue
+
+
+def get_venue():
+    return _venue
+
+
+def add_venue_arguments(parser):
+    """Register the shared venue flag on an argparse parser."""
+    group = parser.add_argument_group("venue")
+    group.add_argument("--venue-config", default=None,
+                       help=f"JSON file with the venue's name and table layout (default: {DEFAULT_VENUE.name})")
+
+
+def configure_venue_from_args(args):
+    """Configure the process-wide venue from add_venue_arguments() flags."""
+    return configure_venue(Venue.from_file(args.venue_config) if args.venue_config else None)
+
+
+def main():
+    """Validate a venue config and print its table map."""
+    parser = argparse.ArgumentParser(description="Check a venue config and show its table map")
+    add_venue_arguments(parser)
+    args = parser.parse_args()
+    try:
+        venue = configure_venue_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    print(f"Venue: {venue.name} ({len(venue.table_numbers)} tables)")
+    print(describe_layout(venue))
+
+
+if __name__ == "__main__":
+    main()
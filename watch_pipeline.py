@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Watch Mode
+Long-running process that keeps detailed_info.json, dishes.json and the
+dashboard data up to date while the source dataset changes. It polls the
+dataset (and optionally a drop directory of new diner files) and waits until
+the files have stopped changing for a debounce interval. Then it diffs every
+diner against the last processed version and runs insights -> justifications
+for the changed diners only. Tables are re-solved only for the dates those
+diners' reservations are (or were) on. The outputs are patched in place with
+atomic writes, so LLM work and table solving grow with the size of the change,
+not the size of the dataset.
+
+Files dropped into --drop-dir (wrapped JSON or .jsonl diners) are merged into
+the dataset by name, replacing a diner with the same name or adding a new one,
+and then moved to the directory's processed/ folder.
+
+Usage:
+    python watch_pipeline.py                        # watch src/fine-dining-dataset.json
+    python watch_pipeline.py --drop-dir incoming    # also accept dropped diner files
+    python watch_pipeline.py --once                 # apply pending changes and exit
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from dotenv import load_dotenv
+
+from add_justifications import DETAILED_INFO_PATH, JUSTIFICATION_REQUESTS_PER_MINUTE, justify_diners
+from build_dashboard_index import OUTPUT_DIR as DASHBOARD_DIR, write_dashboard_data
+from checkpoint import fingerprint, iter_keyed_diners
+from data_io import iter_records, write_json_atomic
+from detailed_format import is_normalized, iter_denormalized
+from extract_dishes import build_metadata, iter_parties, iter_table_requests
+from generate_insights import DATASET_PATH, enhance_diners, get_client
+from llm_cache import add_cache_arguments, configure_cache_from_args
+from model_routing import add_routing_arguments, configure_routing_from_args
+from pipeline_metrics import add_metrics_arguments, write_metrics_from_args
+from rate_limiter import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, RateLimiter
+from reservation_query import DISHES_PATH, total_revenue
+from retry_policy import add_retry_arguments, configure_retries_from_args
+from table_assignment import assign_tables
+from venues import add_venue_arguments, configure_venue_from_args, get_venue
+
+# Load environment variables
+load_dotenv()
+
+# Seconds between checks of the watched files
+DEFAULT_POLL_INTERVAL = 2.0
+# Seconds before diners whose insight call failed are tried again
+RETRY_DELAY = 60.0
+# Seconds the files must stay unchanged before a change is processed
+DEFAULT_DEBOUNCE = 1.5
+
+PROCESSED_DIR = "processed"
+DROP_EXTENSIONS = (".json", ".jsonl")
+
+
+def source_fingerprint(diner):
+    """
+    Fingerprint of a diner's source data. Raw dataset diners and processed
+    diners (with notes, normalized or not) of the same source data match.
+    """
+    reservations = [
+        {
+            "date": reservation.get("date"),
+            "number_of_people": reservation.get("number_of_people"),
+            "orders": reservation.get("orders", [])
+        }
+        for reservation in diner.get("reservations", [])
+    ]
+    return fingerprint(diner.get("reviews", []), diner.get("emails", []), reservations)
+
+
+def reservation_dates(diner):
+    return {reservation.get("date", "") for reservation in diner.get("reservations", [])}
+
+
+def drop_files(drop_dir):
+    if not drop_dir or not os.path.isdir(drop_dir):
+        return []
+    return sorted(
+        os.path.join(drop_dir, name) for name in os.listdir(drop_dir)
+        if name.endswith(DROP_EXTENSIONS) and os.path.isfile(os.path.join(drop_dir, name))
+    )
+
+
+class ChangeDetector:
+    """
+    Polls file sizes and modification times. ready() is True once the watched
+    files differ from the last processed state and have been stable for the
+    debounce interval, so half-written files and bursts of saves are handled once.
+    """
+
+    def __init__(self, dataset_path, drop_dir=None, debounce=DEFAULT_DEBOUNCE):
+        self.dataset_path = dataset_path
+        self.drop_dir = drop_dir
+        self.debounce = debounce
+        self.processed = None
+        self.last_seen = None
+        self.stable_since = None
+
+    def snapshot(self):
+        paths = [self.dataset_path] + drop_files(self.drop_dir)
+        state = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                state.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                state.append((path, None, None))
+        return tuple(state)
+
+    def ready(self):
+        current = self.snapshot()
+        if current != self.last_seen:
+            self.last_seen = current
+            self.stable_since = time.monotonic()
+        return current != self.processed and time.monotonic() - self.stable_since >= self.debounce
+
+    def mark_processed(self):
+        # Processing may rewrite the dataset (merged drop files), so take a fresh snapshot
+        self.processed = self.last_seen = self.snapshot()
+
+
+def merge_drop_files(drop_dir, dataset_path):
+    """
+    Merge dropped diner files into the dataset by name and move them to
+    processed/. Returns the number of diners merged.
+    """
+    paths = drop_files(drop_dir)
+    if not paths:
+        return 0
+
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    diners = data.setdefault("diners", [])
+    positions = {diner.get("name"): index for index, diner in reversed(list(enumerate(diners)))}
+
+    merged = 0
+    for path in paths:
+        for diner in iter_records(path, "diners"):
+            index = positions.get(diner.get("name"))
+            if index is None:
+                positions[diner.get("name")] = len(diners)
+                diners.append(diner)
+            else:
+                diners[index] = diner
+            merged += 1
+    write_json_atomic(dataset_path, data)
+
+    processed_dir = os.path.join(drop_dir, PROCESSED_DIR)
+    os.makedirs(processed_dir, exist_ok=True)
+    for path in paths:
+        shutil.move(path, os.path.join(processed_dir, os.path.basename(path)))
+    print(f"✓ Merged {merged} diners from {len(paths)} dropped files into {dataset_path}")
+    return merged
+
+
+class WatchState:
+    """
+    The last written outputs, keyed by diner, and the source fingerprints they
+    were produced from. Diners whose insight call failed have no fingerprint,
+    so they count as changed until a pass succeeds for them.
+    """
+
+    def __init__(self, detailed, parties):
+        self.detailed = dict(iter_keyed_diners(detailed))
+        self.fingerprints = {key: source_fingerprint(diner) for key, diner in
+                             zip(self.detailed, iter_denormalized(self.detailed.values()))}
+        self.parties = parties
+        self.retry_at = None
+
+    def retry_due(self):
+        """Whether diners failed on an earlier pass and are due to be tried again."""
+        return self.retry_at is not None and time.monotonic() >= self.retry_at
+
+    @classmethod
+    def load(cls, detailed_path, dishes_path):
+        detailed = list(iter_records(detailed_path, "diners")) if os.path.exists(detailed_path) else []
+        parties = list(iter_records(dishes_path, "parties")) if os.path.exists(dishes_path) else []
+        return cls(detailed, parties)
+
+    def diff(self, dataset):
+        """(changed keys, removed keys) of the dataset's diners against the processed state."""
+        changed = [key for key, diner in dataset.items() if self.fingerprints.get(key) != source_fingerprint(diner)]
+        removed = [key for key in self.detailed if key not in dataset]
+        return changed, removed
+
+    def table_numbers(self, requests, affected_dates):
+        """
+        Keep the stored table of every party on an unaffected date; dates where
+        a party has no stored table are added to affected_dates.
+        """
+        stored = {}
+        for party in self.parties:
+            stored.setdefault((party.get("customer_name"), party.get("date")), []).append(party.get("table_number"))
+
+        table_numbers = {}
+        for request in requests:
+            if request["date"] in affected_dates:
+                continue
+            tables = stored.get((request["customer_name"], request["date"]))
+            if tables:
+                table_numbers[request["party_id"]] = tables.pop(0)
+            else:
+                affected_dates.add(request["date"])
+        return table_numbers
+
+
+def apply_changes(args, state):
+    """Process the diners that changed since the last pass and patch the outputs; returns the number changed."""
+    with open(args.input, "r", encoding="utf-8") as f:
+        dataset = dict(iter_keyed_diners(json.load(f).get("diners", [])))
+    changed, removed = state.diff(dataset)
+    if not changed and not removed:
+        state.retry_at = None
+        print("No diner changes")
+        return 0
+
+    start = time.perf_counter()
+    print(f"\n▶ {len(changed)} changed and {len(removed)} removed diners")
+    normalized = args.normalized or any(is_normalized(diner) for diner in state.detailed.values())
+
+    enhanced = []
+    failed_diners = set()
+    enhance_diners(
+        [dataset[key] for key in changed], enhanced.append,
+        limiter=RateLimiter(args.rpm, args.tpm), total_diners=len(changed),
+        normalized=normalized, fast_path=args.fast_path, on_failure=lambda diner: failed_diners.add(id(diner))
+    )
+    failed = {key for key in changed if id(dataset[key]) in failed_diners}
+    justified = []
+    justify_diners(
+        enhanced, justified.append, get_client(),
+        RateLimiter(requests_per_minute=JUSTIFICATION_REQUESTS_PER_MINUTE, tokens_per_minute=None),
+        args.batched, total=len(enhanced)
+    )
+    updated = dict(zip(changed, justified))
+
+    # Tables only move on dates a changed or removed diner is, or was, booked on
+    affected_dates = set()
+    for key in changed + removed:
+        if key in state.detailed:
+            affected_dates |= reservation_dates(state.detailed[key])
+        if key in updated:
+            affected_dates |= reservation_dates(updated[key])
+
+    detailed = [updated.get(key) or state.detailed[key] for key in dataset]
+    requests = list(iter_table_requests(detailed))
+    table_numbers = state.table_numbers(requests, affected_dates)
+    table_numbers.update(assign_tables([request for request in requests if request["date"] in affected_dates],
+                                        get_venue().layout))
+    parties = list(iter_parties(detailed, table_numbers))
+
+    write_json_atomic(args.detailed_output, {"diners": detailed})
+    write_json_atomic(args.dishes_output, {
+        "parties": parties,
+        "metadata": build_metadata(len(parties), total_revenue(parties), args.detailed_output)
+    })
+    if args.dashboard_dir:
+        write_dashboard_data(detailed, parties, args.dashboard_dir)
+
+    state.detailed = dict(zip(dataset, detailed))
+    state.fingerprints = {key: source_fingerprint(diner) for key, diner in dataset.items() if key not in failed}
+    state.parties = parties
+    state.retry_at = time.monotonic() + RETRY_DELAY if failed else None
+    print(f"✓ Patched {args.detailed_output} and {args.dishes_output}: {len(changed)} diners reprocessed, "
+          f"{len(affected_dates)} dates re-seated ({time.perf_counter() - start:.1f}s)")
+    if failed:
+        print(f"⚠ Insights failed for {len(failed)} diners; retrying them in {RETRY_DELAY:.0f}s")
+    return len(changed) + len(removed)
+
+
+def main():
+    """Command line entry point for watch mode."""
+    parser = argparse.ArgumentParser(description="Reprocess only changed diners whenever the dataset changes")
+    parser.add_argument("--input", default=DATASET_PATH,
+                        help="Dataset to watch (default: %(default)s)")
+    parser.add_argument("--drop-dir", default=None,
+                        help="Directory watched for diner files to merge into the dataset")
+    parser.add_argument("--detailed-output", default=DETAILED_INFO_PATH,
+                        help="Detailed info to patch (default: %(default)s)")
+    parser.add_argument("--dishes-output", default=DISHES_PATH,
+                        help="Dishes to patch (default: %(default)s)")
+    parser.add_argument("--dashboard-dir", default=DASHBOARD_DIR,
+                        help="Dashboard data to update; '' to skip (default: %(default)s)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between checks (default: %(default)s)")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help="Seconds the files must stay unchanged before processing (default: %(default)s)")
+    parser.add_argument("--once", action="store_true",
+                        help="Apply pending changes once and exit")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="Requests-per-minute limit for insights (default: %(default)s)")
+    parser.add_argument("--tpm", type=int, default=DEFAULT_TOKENS_PER_MINUTE,
+                        help="Tokens-per-minute limit for insights (default: %(default)s)")
+    parser.add_argument("--normalized", action="store_true",
+                        help="Store insights once per diner (kept automatically if the detailed info already does)")
+    parser.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+                        help="Send every field of every diner to the LLM instead of settling clear-cut ones locally")
+    parser.add_argument("--batched", action="store_true",
+                        help="Request all justifications of a diner in a single JSON call")
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_routing_arguments(parser)
+    add_venue_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_cache_from_args(args)
+    configure_retries_from_args(args)
+    configure_routing_from_args(args)
+    configure_venue_from_args(args)
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Error: OPENAI_API_KEY not found in environment variables.")
+        print("Please create a .env file with your OpenAI API key.")
+        return
+
+    try:
+        state = WatchState.load(args.detailed_output, args.dishes_output)
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error: Invalid JSON in the current outputs: {e}")
+        return
+    print(f"Loaded {len(state.detailed)} processed diners and {len(state.parties)} parties")
+
+    detector = ChangeDetector(args.input, args.drop_dir, 0 if args.once else args.debounce)
+    if not args.once:
+        print(f"Watching {args.input}" + (f" and {args.drop_dir}" if args.drop_dir else "") + " (Ctrl+C to stop)")
+    try:
+        while True:
+            if detector.ready() or state.retry_due():
+                try:
+                    merge_drop_files(args.drop_dir, args.input)
+                    apply_changes(args, state)
+                    write_metrics_from_args(args)
+                except FileNotFoundError as e:
+                    print(f"Error: {e.filename} not found")
+                except (json.JSONDecodeError, ValueError) as e:
+                    # Usually a file saved mid-write; it is retried on its next change
+                    print(f"Error: Invalid JSON input: {e}")
+                detector.mark_processed()
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+
+if __name__ == "__main__":
+    main()